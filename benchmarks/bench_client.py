@@ -0,0 +1,95 @@
+"""
+Measure the throughput (records per second) and the peak memory of the client against a local fake Trengo API (see
+``fake_server.py``), for pagination, bulk writes and message fan-out.
+
+The server runs in a separate process so that its work and its memory don't count. Each scenario runs twice: once to
+measure the time, and once to measure the memory.
+
+Usage: python benchmarks/bench_client.py [--latency SECONDS] [--rate-limit REQUESTS_PER_SECOND] [--tickets N]
+                                         [--json PATH]
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_server import FakeTrengo, make_server  # noqa: E402
+
+from trengo import RateLimiter, Trengo  # noqa: E402
+
+
+def serve(port_queue, latency: float, rate_limit: int | None, tickets: int):
+    server = make_server(FakeTrengo(tickets=tickets, latency=latency, rate_limit=rate_limit))
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def measure(name: str, func: Callable[[], int]) -> dict:
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+
+    # Measure the memory separately, because tracemalloc slows down the allocations
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {"name": name, "records": count, "seconds": elapsed, "records_per_second": count / elapsed,
+              "peak_memory": peak}
+    print(f"{name:<40} {count:>8} {elapsed:>8.2f}s {count / elapsed:>12,.0f}/s {peak / 1e6:>9.1f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.01, help="Delay of each response, in seconds.")
+    parser.add_argument("--rate-limit", type=int, help="Maximum number of requests per second of the server.")
+    parser.add_argument("--tickets", type=int, default=5000, help="Number of tickets.")
+    parser.add_argument("--json", help="Write the results to this file, to compare them between versions.")
+    args = parser.parse_args()
+
+    port_queue: multiprocessing.Queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(port_queue, args.latency, args.rate_limit, args.tickets),
+                                     daemon=True)
+    server.start()
+    port = port_queue.get(timeout=10)
+
+    def make_client() -> Trengo:
+        rate_limiter = RateLimiter(limit=args.rate_limit, period=1) if args.rate_limit else None
+        return Trengo(token="benchmark", base_url=f"http://127.0.0.1:{port}/api/v2", rate_limiter=rate_limiter)
+
+    client = make_client()
+    # The fan-out and bulk scenarios work on a subset of the tickets
+    ticket_ids = list(range(1, min(args.tickets, 1000) + 1))
+
+    print(f"{'scenario':<40} {'records':>8} {'time':>9} {'throughput':>14} {'peak memory':>12}")
+    results = [
+        measure("get_tickets", lambda: sum(1 for _ in client.get_tickets())),
+        measure("get_tickets(prefetch=4)", lambda: sum(1 for _ in client.get_tickets(prefetch=4))),
+        measure("get_tickets(stream=True)", lambda: sum(1 for _ in client.get_tickets(stream=True))),
+        measure("get_tickets(as_model=True)", lambda: sum(1 for _ in client.get_tickets(as_model=True))),
+        measure("get_messages_for_tickets(max_workers=8)",
+                lambda: sum(1 for _ in client.get_messages_for_tickets(ticket_ids))),
+        measure("bulk_close_tickets(max_workers=8)",
+                lambda: len(client.bulk_close_tickets(ticket_ids, max_workers=8))),
+    ]
+    client.close()
+
+    server.terminate()
+    server.join()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare the memory footprint and the construction time of `trengo.models` objects with plain dicts.
+
+Usage: python benchmarks/bench_models.py [count]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from trengo.models import Ticket
+
+
+def make_ticket_json(ticket_id: int) -> str:
+    return json.dumps({
+        "id": ticket_id,
+        "status": "CLOSED",
+        "subject": f"Order #{ticket_id}",
+        "channel": {"id": 7, "name": "Email", "type": "EMAIL"},
+        "contact": {"id": ticket_id * 3, "name": f"Customer {ticket_id}", "email": f"c{ticket_id}@example.com"},
+        "contact_id": ticket_id * 3,
+        "user_id": 12,
+        "team_id": None,
+        "assigned_at": "2024-09-12 10:23:00",
+        "created_at": "2024-09-12 10:22:33",
+        "updated_at": "2024-09-13 08:00:00",
+        "closed_at": "2024-09-13 08:00:00",
+        "labels": [{"id": 1, "name": "VIP", "color": "#ff0000"}],
+        "is_spam": False,
+        "favorited": False,
+        "unread": False,
+    })
+
+
+def measure(label: str, payloads: list[str], func):
+    gc.collect()
+    start = time.perf_counter()
+    records = [func(json.loads(payload)) for payload in payloads]
+    elapsed = time.perf_counter() - start
+    del records
+
+    # Measure the memory separately, because tracemalloc slows down the allocations
+    gc.collect()
+    tracemalloc.start()
+    records = [func(json.loads(payload)) for payload in payloads]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:>8}: {size / len(records):7.0f} bytes/record, {elapsed / len(records) * 1e6:6.2f} µs/record "
+          "(JSON decoding included)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    payloads = [make_ticket_json(ticket_id) for ticket_id in range(count)]
+
+    measure("dict", payloads, lambda record: record)
+    measure("Ticket", payloads, Ticket.from_dict)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare the transport options of the client (compression, keep-alive, connection pool, ``httpx`` adapter) against a
+local fake Trengo API (see ``fake_server.py``): mean latency per request and bytes on the wire, for ``get_tickets``
+pagination and for ``get_messages`` over many tickets.
+
+The server simulates the bandwidth and the cost of opening a connection, which are what compression and keep-alive
+save; on a real network, use the numbers of the defaults as a guide rather than as absolute values. It only speaks
+HTTP/1.1, so the ``httpx`` scenario measures the overhead of the adapter, not the gains of HTTP/2.
+
+Usage: python benchmarks/bench_transport.py [--latency SECONDS] [--bandwidth BYTES_PER_SECOND]
+                                            [--connect-latency SECONDS] [--tickets N] [--json PATH]
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_server import FakeTrengo, make_server  # noqa: E402
+
+from trengo import Trengo  # noqa: E402
+from trengo.transport import HTTPXAdapter  # noqa: E402
+
+
+def serve(port_queue, latency: float, bandwidth: float | None, connect_latency: float, tickets: int):
+    server = make_server(FakeTrengo(tickets=tickets, latency=latency, bandwidth=bandwidth,
+                                    connect_latency=connect_latency))
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.01, help="Delay of each response, in seconds.")
+    parser.add_argument("--bandwidth", type=float, default=2_000_000,
+                        help="Simulated bandwidth, in bytes per second.")
+    parser.add_argument("--connect-latency", type=float, default=0.05,
+                        help="Simulated cost of opening a connection, in seconds.")
+    parser.add_argument("--tickets", type=int, default=2500, help="Number of tickets.")
+    parser.add_argument("--json", help="Write the results to this file, to compare them between versions.")
+    args = parser.parse_args()
+
+    port_queue: multiprocessing.Queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, daemon=True, args=(
+        port_queue, args.latency, args.bandwidth, args.connect_latency, args.tickets))
+    server.start()
+    port = port_queue.get(timeout=10)
+    stats_url = f"http://127.0.0.1:{port}/_stats"
+
+    # The fan-out scenarios work on a subset of the tickets
+    ticket_ids = list(range(1, min(args.tickets, 500) + 1))
+
+    def measure(name: str, make_client: Callable[[], Trengo], func: Callable[[Trengo], int]) -> dict:
+        client = make_client()
+        before = requests.get(stats_url).json()
+        start = time.perf_counter()
+        count = func(client)
+        elapsed = time.perf_counter() - start
+        after = requests.get(stats_url).json()
+        client.close()
+
+        request_count = after["requests"] - before["requests"]
+        bytes_sent = after["bytes_sent"] - before["bytes_sent"]
+        # Don't count the connection of the stats request
+        connections = after["connections"] - before["connections"] - 1
+        result = {"name": name, "records": count, "seconds": elapsed, "requests": request_count,
+                  "latency": elapsed / request_count, "bytes": bytes_sent, "connections": connections}
+        print(f"{name:<50} {request_count:>8} {elapsed / request_count * 1000:>9.1f}ms "
+              f"{bytes_sent / 1e6:>9.2f} MB {connections:>11}")
+        return result
+
+    clients: dict[str, Callable[[], Trengo]] = {}
+    base_url = f"http://127.0.0.1:{port}/api/v2"
+    for label, options in [
+        ("defaults", {}),
+        ("compression=False", {"compression": False}),
+        ("keep_alive=False", {"keep_alive": False}),
+        ("keep_alive=False, compression=False", {"keep_alive": False, "compression": False}),
+    ]:
+        clients[label] = lambda options=options: Trengo(token="benchmark", base_url=base_url, **options)
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        print("httpx is not installed: skipping the httpx adapter")
+    else:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+        else:
+            http2 = True
+
+        def make_httpx_client() -> Trengo:
+            client = Trengo(token="benchmark", base_url=base_url)
+            client.mount("http://", HTTPXAdapter(http2=http2))
+            return client
+
+        clients["httpx adapter"] = make_httpx_client
+
+    print(f"{'scenario':<50} {'requests':>8} {'latency':>11} {'bytes':>12} {'connections':>11}")
+    results = []
+    for label, make_client in clients.items():
+        results.append(measure(f"get_tickets, {label}", make_client,
+                               lambda client: sum(1 for _ in client.get_tickets())))
+    for label, make_client in clients.items():
+        results.append(measure(f"get_messages, {label}", make_client,
+                               lambda client: sum(1 for ticket_id in ticket_ids
+                                                  for _ in client.get_messages(ticket_id))))
+
+    server.terminate()
+    server.join()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measure how many webhook events per second `trengo.webhooks` can receive, verify, parse and dispatch.
+
+The WSGI application is called directly, without the HTTP server, so this measures the cost of the library itself.
+
+Usage: python benchmarks/bench_webhooks.py [count]
+"""
+import hashlib
+import hmac
+import io
+import sys
+import threading
+import time
+
+from trengo.webhooks import WebhookApp, WebhookDispatcher
+
+SECRET = "benchmark"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    body = (b"message_id=123456&ticket_id=98765&contact_id=4321&channel_id=12&user_id=&"
+            b"contact_identifier=%2B33600000000&contact_name=Jane+Doe&message=Hello%2C+where+is+my+order%3F")
+    timestamp = str(int(time.time()))
+    signature = hmac.new(SECRET.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+
+    done = threading.Event()
+    handled = 0
+
+    def handler(event):
+        nonlocal handled
+        handled += 1
+        if handled == count:
+            done.set()
+
+    dispatcher = WebhookDispatcher(handler, workers=1, queue_size=count)
+    app = WebhookApp(dispatcher, secret=SECRET)
+
+    def start_response(status, headers):
+        pass
+
+    with dispatcher:
+        start = time.perf_counter()
+        for _ in range(count):
+            app({
+                "REQUEST_METHOD": "POST",
+                "PATH_INFO": "/trengo/INBOUND",
+                "CONTENT_TYPE": "application/x-www-form-urlencoded",
+                "CONTENT_LENGTH": str(len(body)),
+                "HTTP_TRENGO_SIGNATURE": f"{timestamp};{signature}",
+                "wsgi.input": io.BytesIO(body),
+            }, start_response)
+        done.wait()
+        elapsed = time.perf_counter() - start
+
+    print(f"{count} events in {elapsed:.2f}s: {count / elapsed:,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
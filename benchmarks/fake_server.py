@@ -0,0 +1,274 @@
+"""
+Local stand-in for the Trengo API, for the benchmarks.
+
+It serves paginated ``data``/``meta`` responses for the tickets, the messages of each ticket and the contacts, and
+accepts the write endpoints used by the bulk methods. Every response can be delayed, and requests over a rate limit get
+a ``429`` response with Trengo's rate-limit headers. Responses are gzipped for clients that accept it, and the bandwidth
+and the cost of opening a connection can be simulated. ``GET /_stats`` returns the counters of the server.
+
+Usage: python benchmarks/fake_server.py [--port PORT] [--latency SECONDS] [--rate-limit REQUESTS_PER_SECOND]
+"""
+import argparse
+import gzip
+import json
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+TICKETS_RE = re.compile(r"^/tickets/?$")
+MESSAGES_RE = re.compile(r"^/tickets/(\d+)/messages/?$")
+CONTACTS_RE = re.compile(r"^/contacts/?$")
+
+
+def make_ticket(ticket_id: int) -> dict:
+    return {
+        "id": ticket_id,
+        "status": "CLOSED",
+        "subject": f"Order #{ticket_id}",
+        "channel": {"id": 7, "name": "Email", "type": "EMAIL"},
+        "contact": {"id": ticket_id * 3, "name": f"Customer {ticket_id}", "email": f"c{ticket_id}@example.com"},
+        "contact_id": ticket_id * 3,
+        "user_id": 12,
+        "team_id": None,
+        "created_at": "2024-09-12 10:22:33",
+        "updated_at": "2024-09-13 08:00:00",
+        "closed_at": "2024-09-13 08:00:00",
+        "labels": [{"id": 1, "name": "VIP", "color": "#ff0000"}],
+        "is_spam": False,
+        "latest_message": {"id": ticket_id * 10, "message": "Thank you!", "created_at": "2024-09-13 07:59:00"},
+    }
+
+
+def make_message(ticket_id: int, message_id: int) -> dict:
+    return {
+        "id": message_id,
+        "ticket_id": ticket_id,
+        "type": "INBOUND",
+        "message": "Hello, where is my order? " * 4,
+        "created_at": "2024-09-12 10:22:33",
+        "contact": {"id": ticket_id * 3, "name": f"Customer {ticket_id}"},
+        "attachments": [],
+    }
+
+
+def make_contact(contact_id: int) -> dict:
+    return {
+        "id": contact_id,
+        "name": f"Customer {contact_id}",
+        "email": f"c{contact_id}@example.com",
+        "phone": None,
+        "identifier": f"c{contact_id}@example.com",
+        "created_at": "2024-09-12 10:22:33",
+        "custom_field_data": {},
+    }
+
+
+class FakeTrengo:
+    """
+    State and configuration of the fake API.
+    """
+
+    def __init__(self, *, tickets=10_000, messages_per_ticket=5, contacts=10_000, per_page=25,
+                 latency: float = 0.0,
+                 rate_limit: int | None = None,
+                 compression=True,
+                 bandwidth: float | None = None,
+                 connect_latency: float = 0.0):
+        """
+        :param tickets: number of tickets.
+        :param messages_per_ticket: number of messages of each ticket.
+        :param contacts: number of contacts.
+        :param per_page: number of records per page.
+        :param latency: delay of each response, in seconds.
+        :param rate_limit: maximum number of requests per second. Requests over it get a 429 response.
+        :param compression: if True, gzip the responses for clients that accept it.
+        :param bandwidth: if set, delay each response by the time it takes to send its body at this many bytes per
+          second.
+        :param connect_latency: delay of the first response on each connection, in seconds, to simulate the cost of
+          opening a connection (TCP and TLS handshakes).
+        """
+        self.tickets = tickets
+        self.messages_per_ticket = messages_per_ticket
+        self.contacts = contacts
+        self.per_page = per_page
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.compression = compression
+        self.bandwidth = bandwidth
+        self.connect_latency = connect_latency
+
+        self.requests = 0
+        self.throttled = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self._window_start = 0
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def _page(self, make, first_id: int, count: int, page: int) -> bytes:
+        last_page = max(1, -(-count // self.per_page))
+        start = (page - 1) * self.per_page
+        ids = range(first_id + start, first_id + min(start + self.per_page, count)) if page <= last_page else ()
+        return json.dumps({
+            "data": [make(id_) for id_ in ids],
+            "meta": {"current_page": page, "last_page": last_page, "per_page": self.per_page, "total": count},
+        }).encode()
+
+    @lru_cache(maxsize=4096)
+    def tickets_page(self, page: int) -> bytes:
+        return self._page(make_ticket, 1, self.tickets, page)
+
+    def messages_page(self, ticket_id: int, page: int) -> bytes:
+        first_id = ticket_id * 1000
+        return self._page(lambda id_: make_message(ticket_id, id_), first_id, self.messages_per_ticket, page)
+
+    @lru_cache(maxsize=4096)
+    def contacts_page(self, page: int) -> bytes:
+        return self._page(make_contact, 1, self.contacts, page)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def compress(body: bytes) -> bytes:
+        return gzip.compress(body, compresslevel=6)
+
+    def stats(self) -> bytes:
+        with self._lock:
+            return json.dumps({"requests": self.requests, "throttled": self.throttled,
+                               "connections": self.connections, "bytes_sent": self.bytes_sent}).encode()
+
+    def count_sent(self, size: int):
+        with self._lock:
+            self.bytes_sent += size
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def check_rate_limit(self) -> dict[str, str] | None:
+        """Count the request; return the headers of a 429 response if it's over the rate limit."""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit is None:
+                return None
+
+            now = int(time.time())
+            if now != self._window_start:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            remaining = self.rate_limit - self._window_count
+            headers = {"X-RateLimit-Limit": str(self.rate_limit), "X-RateLimit-Remaining": str(max(0, remaining))}
+            if remaining >= 0:
+                return None
+            self.throttled += 1
+            return {**headers, "Retry-After": "1"}
+
+
+def make_handler(api: FakeTrengo):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # The headers and the body are written separately: don't wait for the ACK of the headers
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            api.count_connection()
+            self.new_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, headers: dict[str, str] | None = None):
+            headers = dict(headers or {})
+            if api.compression and len(body) > 256 and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = api.compress(body)
+                headers["Content-Encoding"] = "gzip"
+
+            if self.close_connection:
+                headers["Connection"] = "close"
+
+            delay = len(body) / api.bandwidth if api.bandwidth else 0.0
+            if self.new_connection:
+                delay += api.connect_latency
+                self.new_connection = False
+            if delay:
+                time.sleep(delay)
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+            if self.path != "/_stats":
+                api.count_sent(len(body))
+
+        def _handle(self) -> tuple[int, bytes, dict[str, str] | None]:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+
+            if api.latency:
+                time.sleep(api.latency)
+            throttled_headers = api.check_rate_limit()
+            if throttled_headers is not None:
+                return 429, b'{"message": "Too Many Attempts."}', throttled_headers
+
+            url = urlsplit(self.path)
+            path = url.path.removeprefix("/api/v2")
+            if self.command != "GET":
+                return 200, b"{}", None
+
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            if TICKETS_RE.match(path):
+                return 200, api.tickets_page(page), None
+            if m := MESSAGES_RE.match(path):
+                return 200, api.messages_page(int(m.group(1)), page), None
+            if CONTACTS_RE.match(path):
+                return 200, api.contacts_page(page), None
+            return 404, b'{"message": "Not found"}', None
+
+        def _dispatch(self):
+            if self.path == "/_stats":
+                self._send(200, api.stats())
+            else:
+                self._send(*self._handle())
+
+        do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    return Handler
+
+
+def make_server(api: FakeTrengo, host="127.0.0.1", port=0) -> ThreadingHTTPServer:
+    """Create the server. Use ``server.server_address`` to get the port if it's 0."""
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Trengo API for benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay of each response, in seconds.")
+    parser.add_argument("--rate-limit", type=int, help="Maximum number of requests per second.")
+    parser.add_argument("--tickets", type=int, default=10_000)
+    parser.add_argument("--no-compression", action="store_true", help="Never gzip the responses.")
+    parser.add_argument("--bandwidth", type=float, help="Simulated bandwidth, in bytes per second.")
+    parser.add_argument("--connect-latency", type=float, default=0.0,
+                        help="Simulated cost of opening a connection, in seconds.")
+    args = parser.parse_args()
+
+    server = make_server(FakeTrengo(tickets=args.tickets, latency=args.latency, rate_limit=args.rate_limit,
+                                    compression=not args.no_compression, bandwidth=args.bandwidth,
+                                    connect_latency=args.connect_latency),
+                         port=args.port)
+    print(f"Listening on http://127.0.0.1:{server.server_address[1]}/api/v2")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
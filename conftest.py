@@ -0,0 +1,66 @@
+import threading
+from typing import Any, Callable
+
+import pytest
+import requests
+
+from trengo import Trengo
+from trengo.instrumentation import normalize_endpoint
+
+Records = list[dict[str, Any]] | Callable[[str, dict[str, Any]], Any]
+
+
+class FakeTrengo(Trengo):
+    """
+    Client that answers the GET requests from records in memory instead of calling the API, paginated like the API.
+
+    ``records`` maps paths to lists of records. Paths can use the ``{id}`` placeholder of `normalize_endpoint`, and
+    records can be a function called with the path and the parameters of each request: it returns the list of records
+    to paginate, or the response itself if it's not a list, or raises an exception.
+    """
+
+    def __init__(self, records: dict[str, Records] | None = None, *, per_page=3, **kwargs):
+        super().__init__(token="test", **kwargs)
+        self.records = records if records is not None else {}
+        self.per_page = per_page
+        # Path and page of each request
+        self.requests: list[str] = []
+        self.requested_pages: list[int | None] = []
+        self._lock = threading.Lock()
+
+    def get_json_api(self, path, params=None, **kwargs):
+        params = params or {}
+        page = params.get("page")
+        with self._lock:
+            self.requests.append(path)
+            self.requested_pages.append(page)
+
+        records = self.records[path if path in self.records else normalize_endpoint(path)]
+        if callable(records):
+            records = records(path, params)
+            if not isinstance(records, list):
+                return records
+
+        page = page or 1
+        return {
+            "data": records[(page - 1) * self.per_page:page * self.per_page],
+            "meta": {"current_page": page, "last_page": max(1, -(-len(records) // self.per_page))},
+        }
+
+
+@pytest.fixture
+def fake_trengo() -> type[FakeTrengo]:
+    """`FakeTrengo` class, to create fake clients."""
+    return FakeTrengo
+
+
+@pytest.fixture
+def http_error() -> Callable[[int], requests.HTTPError]:
+    """Function that returns an ``HTTPError`` with the given status code."""
+
+    def make_http_error(status_code: int) -> requests.HTTPError:
+        response = requests.Response()
+        response.status_code = status_code
+        return requests.HTTPError(f"{status_code} error", response=response)
+
+    return make_http_error
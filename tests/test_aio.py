@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+
+from trengo.aio import AsyncTrengo
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    assert request.headers["Authorization"] == "Bearer test"
+
+    if request.url.path == "/api/v2/tickets":
+        page = int(request.url.params["page"])
+        assert request.url.params.get_list("users[]") == ["1", "2"]
+        return httpx.Response(200, json={
+            "data": [{"id": page * 10 + i} for i in range(2)],
+            "meta": {"current_page": page, "last_page": 3},
+        })
+
+    if request.url.path == "/api/v2/reporting/metrics":
+        assert request.url.params.get_list("metric[]") == ["new_tickets"]
+        return httpx.Response(200, json={"aggregates": {"new_tickets": 42}})
+
+    if request.url.path == "/api/v2/tickets/123/close":
+        return httpx.Response(200, json={"id": 123, "status": "CLOSED"})
+
+    return httpx.Response(404, json={"message": "Not Found"})
+
+
+def make_client():
+    return AsyncTrengo(token="test", transport=httpx.MockTransport(handler))
+
+
+def test_async_pagination():
+    async def run(prefetch: int):
+        async with make_client() as client:
+            return [ticket["id"] async for ticket in client.get_tickets(users=[1, 2], prefetch=prefetch)]
+
+    assert asyncio.run(run(0)) == [10, 11, 20, 21, 30, 31]
+    assert asyncio.run(run(2)) == [10, 11, 20, 21, 30, 31]
+
+
+def test_async_pagination_controls():
+    async def run(**kwargs):
+        async with make_client() as client:
+            return [ticket["id"] async for ticket in client.get_tickets(users=[1, 2], **kwargs)]
+
+    assert asyncio.run(run(start_page=2, max_pages=1)) == [20, 21]
+    assert asyncio.run(run(limit=3, prefetch=2)) == [10, 11, 20]
+    assert asyncio.run(run(stop_when=lambda ticket: ticket["id"] == 30)) == [10, 11, 20, 21]
+
+
+def test_async_calls():
+    async def run():
+        async with make_client() as client:
+            return (
+                await client.get_reporting_metrics(["new_tickets"]),
+                await client.close_ticket(123),
+                await client.get_contact(1),
+            )
+
+    assert asyncio.run(run()) == ({"new_tickets": 42}, {"id": 123, "status": "CLOSED"}, None)
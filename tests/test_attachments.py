@@ -0,0 +1,78 @@
+import hashlib
+import io
+
+import pytest
+from requests import Response
+
+from trengo import Trengo
+from trengo.attachments import AttachmentDownloader, attachment_filename, download_attachment
+
+FILES = {
+    "https://files.example.com/a.pdf": b"a" * 100_000,
+    "https://app.trengo.eu/media/b.png": b"b" * 10,
+}
+
+
+class FakeTrengo(Trengo):
+    def __init__(self):
+        super().__init__(token="test")
+        self.downloads: list[tuple[str, object]] = []
+
+    def request(self, method, url, *args, **kwargs):
+        assert kwargs["stream"]
+        self.downloads.append((url, kwargs["headers"].get("Authorization", "session")))
+        r = Response()
+        r.status_code = 200
+        r.raw = io.BytesIO(FILES[url])
+        return r
+
+
+def test_attachment_filename():
+    assert attachment_filename({"client_name": "../../etc/passwd", "url": "https://x/y"}) == "passwd"
+    assert attachment_filename({"url": "https://x/path/report%20final.pdf?sig=1"}) == "report final.pdf"
+    assert attachment_filename({"url": "https://x/"}) == "attachment"
+
+
+def test_download_attachment(tmp_path):
+    client = FakeTrengo()
+    sink = io.BytesIO()
+    assert download_attachment(client, "https://files.example.com/a.pdf", sink, chunk_size=4096) == 100_000
+    assert sink.getvalue() == FILES["https://files.example.com/a.pdf"]
+
+    path = tmp_path / "b.png"
+    sha256 = hashlib.sha256(b"b" * 10).hexdigest()
+    assert download_attachment(client, "https://app.trengo.eu/media/b.png", path, sha256=sha256) == 10
+    assert path.read_bytes() == b"b" * 10
+    assert download_attachment(client, "https://app.trengo.eu/media/b.png", path, sha256=sha256) == 0
+
+    # The token is only sent to Trengo
+    assert client.downloads == [
+        ("https://files.example.com/a.pdf", None),
+        ("https://app.trengo.eu/media/b.png", "session"),
+    ]
+
+    with pytest.raises(ValueError):
+        download_attachment(client, "https://app.trengo.eu/media/b.png", tmp_path / "c.png", sha256="0" * 64)
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_attachment_downloader(tmp_path):
+    client = FakeTrengo()
+    downloader = AttachmentDownloader(client, tmp_path)
+    messages = [
+        {"id": 1, "ticket_id": 7, "attachments": [
+            {"full_url": "https://files.example.com/a.pdf", "client_name": "a.pdf", "size": 100_000},
+        ]},
+        {"id": 2, "ticket_id": 7, "attachments": [
+            {"url": "https://app.trengo.eu/media/b.png", "client_name": "b.png", "size": "10 B"},
+        ]},
+        {"id": 3, "ticket_id": 7, "attachments": []},
+    ]
+
+    report = downloader.download_messages(messages)
+    assert report.ok
+    assert report.succeeded == {str(tmp_path / "7" / "1-a.pdf"): 100_000, str(tmp_path / "7" / "2-b.png"): 10}
+
+    report = downloader.download_messages(messages)
+    assert set(report.succeeded.values()) == {0}
+    assert len(client.downloads) == 2
@@ -0,0 +1,24 @@
+from trengo.bulk import run_bulk
+
+
+def test_run_bulk(http_error):
+    attempts: dict[int, int] = {}
+
+    def func(item: int):
+        attempts[item] = attempts.get(item, 0) + 1
+        if item == 2 and attempts[item] == 1:
+            raise http_error(503)
+        if item == 3:
+            raise http_error(422)
+        if item == 4:
+            raise http_error(500)
+        return item * 10
+
+    report = run_bulk(func, range(5), max_workers=3, retries=2, backoff=0)
+
+    assert report.succeeded == {0: 0, 1: 10, 2: 20}
+    assert set(report.failed) == {3, 4}
+    assert not report.ok
+    assert len(report) == 5
+    # retried once; not retried; retried twice
+    assert (attempts[2], attempts[3], attempts[4]) == (2, 1, 3)
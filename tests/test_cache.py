@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from trengo.cache import SingleFlight, TTLCache
+
+
+def test_ttl_cache(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("trengo.cache.time.monotonic", lambda: now[0])
+
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=100)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    now[0] = 20
+    assert cache.get("a") is None
+    assert cache.get("c", "expired") == "expired"
+
+    cache.set("d", 4)
+    cache.invalidate("d")
+    assert cache.get("d") is None
+
+
+@pytest.fixture
+def make_client(fake_trengo):
+    def make(**kwargs):
+        records = [{"id": 1, "name": "Support", "email": "Jane@example.com"},
+                   {"id": 2, "name": "Sales", "email": "john@example.com"}]
+        return fake_trengo({path: records for path in ["/teams", "/users", "/labels", "/tickets"]}, **kwargs)
+
+    return make
+
+
+def test_reference_cache(make_client):
+    client = make_client(cache_reference_data=True)
+
+    assert len(list(client.get_teams())) == 2
+    assert len(list(client.get_teams())) == 2
+    assert client.team_by_name("Sales") == {"id": 2, "name": "Sales", "email": "john@example.com"}
+    assert client.team_by_id(3) is None
+    assert client.requests == ["/teams"]
+
+    assert client.user_by_email("jane@EXAMPLE.com") is not None
+    assert client.requests == ["/teams", "/users"]
+
+    client.invalidate_cache("/teams")
+    client.team_by_id(1)
+    client.get_users()
+    assert client.requests == ["/teams", "/users", "/teams"]
+
+    # not cached
+    list(client.get_tickets())
+    list(client.get_tickets())
+    assert client.requests[-2:] == ["/tickets", "/tickets"]
+
+
+def test_reference_cache_copies(make_client):
+    client = make_client(cache_reference_data=True)
+
+    team = next(client.get_teams())
+    team["name"] = "Changed"
+    client.team_by_id(2)["name"] = "Changed"
+
+    assert [team["name"] for team in client.get_teams()] == ["Support", "Sales"]
+    assert client.team_by_id(2) == {"id": 2, "name": "Sales", "email": "john@example.com"}
+    assert client.requests == ["/teams"]
+
+
+def test_reference_lookups_without_cache(make_client):
+    client = make_client()
+    assert client.label_by_id(1) is not None
+    assert client.label_by_id(1) is not None
+    assert client.requests == ["/labels", "/labels"]
+
+
+def test_single_flight():
+    single_flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(5)
+
+    def func():
+        calls.append(1)
+        time.sleep(0.05)
+        return "result"
+
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(single_flight.do("key", func))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", lambda: int("x"))
+    assert single_flight.do("key", lambda: 2) == 2
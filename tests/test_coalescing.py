@@ -0,0 +1,80 @@
+import io
+import json
+import threading
+import time
+
+from requests import Response
+
+from trengo import Trengo
+
+
+class FakeTrengo(Trengo):
+    def __init__(self, **kwargs):
+        super().__init__(token="test", **kwargs)
+        self.requests: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, *args, **kwargs):
+        path = url.removeprefix(self.base_url)
+        with self._lock:
+            self.requests.append((method.upper(), path))
+        time.sleep(0.05)
+
+        r = Response()
+        r.status_code = 200
+        r.raw = io.BytesIO(json.dumps({"id": path.rsplit("/", 1)[1]}).encode())
+        return r
+
+
+def get_concurrently(client: Trengo, contact_ids: list[int]) -> list:
+    results: list = [None] * len(contact_ids)
+
+    def get(i: int):
+        results[i] = client.get_contact(contact_ids[i])
+
+    threads = [threading.Thread(target=get, args=(i,)) for i in range(len(contact_ids))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_coalesce_requests():
+    client = FakeTrengo(coalesce_requests=True)
+    results = get_concurrently(client, [1, 1, 1, 2, 2])
+    assert results == [{"id": "1"}] * 3 + [{"id": "2"}] * 2
+    assert sorted(client.requests) == [("GET", "/contacts/1"), ("GET", "/contacts/2")]
+
+    # Without micro-cache, sequential calls are not coalesced
+    client.get_contact(1)
+    assert len(client.requests) == 3
+
+
+def test_coalesce_ttl():
+    client = FakeTrengo(coalesce_requests=True, coalesce_ttl=60)
+    get_concurrently(client, [1, 1])
+    client.get_contact(1)
+    assert client.requests == [("GET", "/contacts/1")]
+
+    client.delete_contact(1)
+    client.get_contact(1)
+    assert client.requests == [("GET", "/contacts/1"), ("DELETE", "/contacts/1"), ("GET", "/contacts/1")]
+
+
+def test_coalesced_results_are_copies():
+    client = FakeTrengo(coalesce_requests=True, coalesce_ttl=60)
+    results = get_concurrently(client, [1, 1])
+    results.append(client.get_contact(1))
+    assert client.requests == [("GET", "/contacts/1")]
+
+    results[0]["id"] = "modified"
+    results[2]["id"] = "modified"
+    assert results[1] == {"id": "1"}
+    assert client.get_contact(1) == {"id": "1"}
+
+
+def test_no_coalescing():
+    client = FakeTrengo()
+    get_concurrently(client, [1, 1])
+    assert len(client.requests) == 2
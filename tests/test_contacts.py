@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from trengo.contacts import ContactResolver
+
+
+@pytest.fixture
+def client(fake_trengo):
+    class ContactsTrengo(fake_trengo):
+        def __init__(self):
+            super().__init__({"/contacts": [{"id": 1, "identifier": "jane@example.com"},
+                                            {"id": 2, "identifier": "+33600000000"}]})
+            self.created: list[str] = []
+
+        def create_contact(self, channel_id, identifier, *, full_name=None, **kwargs):
+            time.sleep(0.02)
+            with self._lock:
+                self.created.append(identifier)
+            return {"id": 100 + len(self.created), "identifier": identifier, "name": full_name}
+
+    return ContactsTrengo()
+
+
+def test_contact_resolver(client):
+    resolver = ContactResolver(client)
+    assert resolver.warm() == 2
+
+    assert resolver.resolve_id(1, " Jane@Example.com") == 1
+    assert client.created == []
+
+    threads = [threading.Thread(target=resolver.resolve, args=(1, "john@example.com")) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.created == ["john@example.com"]
+    assert resolver.get("john@example.com") == {"id": 101, "identifier": "john@example.com", "name": None}
+    assert resolver.misses == 1
+    assert resolver.hits == 1
+
+
+def test_upsert_contacts(client):
+    resolver = ContactResolver(client, maxsize=10)
+    resolver.warm()
+
+    report = resolver.upsert_contacts(1, {"jane@example.com": "Jane", "john@example.com": "John", "+33600000000": None})
+    assert report.ok
+    assert client.created == ["john@example.com"]
+    assert report.succeeded["john@example.com"]["name"] == "John"
+    assert report.succeeded["+33600000000"]["id"] == 2
+
+    resolver.invalidate("jane@example.com")
+    resolver.upsert_contacts(1, ["jane@example.com", "john@example.com"])
+    assert client.created == ["john@example.com", "jane@example.com"]
@@ -0,0 +1,88 @@
+import csv
+import json
+
+import pytest
+
+from trengo import Trengo
+from trengo.export import Exporter
+
+
+class FakeTrengo(Trengo):
+    def __init__(self, fail_on_ticket: int | None = None, removed_tickets=()):
+        super().__init__(token="test")
+        self.fail_on_ticket = fail_on_ticket
+        self.ticket_ids = [ticket_id for ticket_id in range(12) if ticket_id not in removed_tickets]
+
+    def get_json_api(self, path, params=None, **kwargs):
+        page = params["page"]
+        if path == "/tickets":
+            data = [{"id": ticket_id, "subject": f"Ticket {ticket_id % 3}", "labels": [{"id": 1}]}
+                    for ticket_id in self.ticket_ids[(page - 1) * 3:page * 3]]
+            return {"data": data, "meta": {"last_page": -(-len(self.ticket_ids) // 3)}}
+        elif path == "/contacts":
+            return {"data": [{"id": page, "name": "Jane"}], "meta": {"last_page": 4}}
+        else:
+            ticket_id = int(path.split("/")[2])
+            if ticket_id == self.fail_on_ticket:
+                raise ConnectionError("interrupted")
+            # The first messages have no body, and the others a body that's sometimes not a string
+            body = None if ticket_id < 3 else ticket_id if ticket_id % 2 else f"Message {ticket_id}"
+            return {"data": [{"id": ticket_id * 10 + i, "ticket_id": ticket_id, "body": body} for i in range(2)],
+                    "meta": {"last_page": 1}}
+
+
+def read_ndjson(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_export_resume(tmp_path):
+    with pytest.raises(ConnectionError):
+        Exporter(FakeTrengo(fail_on_ticket=7), tmp_path, batch_size=2).export_tickets()
+
+    exporter = Exporter(FakeTrengo(), tmp_path, batch_size=2)
+    assert exporter.export_tickets() == 12 - 6
+    assert exporter.export_contacts() == 4
+    assert exporter.export_tickets() == 0
+
+    assert [ticket["id"] for ticket in read_ndjson(tmp_path / "tickets.ndjson")] == list(range(12))
+    assert [message["id"] for message in read_ndjson(tmp_path / "messages.ndjson")] == \
+           [ticket_id * 10 + i for ticket_id in range(12) for i in range(2)]
+    assert len(read_ndjson(tmp_path / "contacts.ndjson")) == 4
+
+
+def test_export_resume_after_removals(tmp_path):
+    with pytest.raises(ConnectionError):
+        Exporter(FakeTrengo(fail_on_ticket=7), tmp_path, batch_size=2).export_tickets()
+
+    # Tickets 0 to 5 were exported; removing two of them moves the others to an earlier page
+    assert Exporter(FakeTrengo(removed_tickets={1, 2}), tmp_path, batch_size=2).export_tickets() == 6
+    assert [ticket["id"] for ticket in read_ndjson(tmp_path / "tickets.ndjson")] == list(range(12))
+
+
+def test_export_csv(tmp_path):
+    with pytest.raises(ConnectionError):
+        Exporter(FakeTrengo(fail_on_ticket=4), tmp_path, format="csv", batch_size=2).export_tickets(messages=True)
+    Exporter(FakeTrengo(), tmp_path, format="csv", batch_size=2).export_tickets()
+
+    with open(tmp_path / "tickets.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row["id"]) for row in rows] == list(range(12))
+    assert rows[0] == {"id": "0", "subject": "Ticket 0", "labels": '[{"id": 1}]'}
+
+
+def test_export_parquet(tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+
+    with pytest.raises(ConnectionError):
+        Exporter(FakeTrengo(fail_on_ticket=7), tmp_path, format="parquet", batch_size=5).export_tickets()
+    Exporter(FakeTrengo(), tmp_path, format="parquet", batch_size=5).export_tickets()
+
+    tickets = pyarrow_parquet.read_table([str(path) for path in sorted(tmp_path.glob("tickets-*.parquet"))])
+    assert tickets.column("id").to_pylist() == list(range(12))
+
+    # The messages of several tickets are written together, in one file per batch
+    paths = sorted(tmp_path.glob("messages-*.parquet"))
+    assert len(paths) == 5
+    messages = pyarrow_parquet.read_table([str(path) for path in paths])
+    assert messages.column("id").to_pylist() == [ticket_id * 10 + i for ticket_id in range(12) for i in range(2)]
+    assert messages.column("body").to_pylist()[4:10] == [None, None, "3", "3", "Message 4", "Message 4"]
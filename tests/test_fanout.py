@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from trengo.models import Message
+
+
+@pytest.fixture
+def client(fake_trengo):
+    def get_messages(path, params):
+        ticket_id = int(path.split("/")[2])
+        if ticket_id == 13:
+            raise RuntimeError("boom")
+        # Make later tickets faster so that they come back first
+        time.sleep(0.001 * (20 - ticket_id))
+        return [{"id": message_id} for message_id in expected_messages(ticket_id)]
+
+    return fake_trengo({"/tickets/{id}/messages": get_messages}, per_page=2)
+
+
+def expected_messages(ticket_id: int):
+    return [ticket_id * 100 + page * 10 + i for page in range(1, ticket_id % 3 + 2) for i in range(2)]
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_get_messages_for_tickets(ordered, client):
+    results = list(client.get_messages_for_tickets(range(10), max_workers=4, ordered=ordered))
+
+    by_ticket: dict[int, list[int]] = {}
+    for ticket_id, message in results:
+        by_ticket.setdefault(ticket_id, []).append(message["id"])
+    assert by_ticket == {ticket_id: expected_messages(ticket_id) for ticket_id in range(10)}
+
+    if ordered:
+        assert [ticket_id for ticket_id, _ in results] == sorted(ticket_id for ticket_id, _ in results)
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_get_messages_for_tickets_error(ordered, client):
+    with pytest.raises(RuntimeError):
+        list(client.get_messages_for_tickets([1, 13, 2], max_workers=2, ordered=ordered))
+
+
+def test_get_messages_for_tickets_close(client):
+    messages = client.get_messages_for_tickets(range(1000), max_workers=2)
+    next(messages)
+    messages.close()
+    time.sleep(0.1)
+    assert len(client.requests) < 20
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_get_messages_for_tickets_options(ordered, client):
+    results = list(client.get_messages_for_tickets(range(10), max_workers=4, ordered=ordered, as_model=True, limit=3))
+
+    by_ticket: dict[int, list[int]] = {}
+    for ticket_id, message in results:
+        assert isinstance(message, Message)
+        by_ticket.setdefault(ticket_id, []).append(message.id)
+    assert by_ticket == {ticket_id: expected_messages(ticket_id)[:3] for ticket_id in range(10)}
+
+    results = list(client.get_messages_for_tickets(range(10), max_workers=4, ordered=ordered,
+                                                   stop_when=lambda message: message["id"] % 100 >= 21))
+    assert sorted(message["id"] for _, message in results) == sorted(
+        message_id for ticket_id in range(10) for message_id in expected_messages(ticket_id) if message_id % 100 < 21)
@@ -0,0 +1,64 @@
+import threading
+
+from trengo import Trengo
+from trengo.fieldsync import FieldSync
+
+
+class FakeTrengo(Trengo):
+    def __init__(self, http_error):
+        super().__init__(token="test")
+        self.http_error = http_error
+        self.writes: list[tuple] = []
+        self._lock = threading.Lock()
+
+    def set_contact_custom_field(self, contact_id, custom_field_id, value, **kwargs):
+        if value == "error":
+            raise self.http_error(422)
+        with self._lock:
+            self.writes.append(("contact", contact_id, custom_field_id, value))
+
+    def set_custom_data(self, ticket_id, custom_field_id, value, **kwargs):
+        with self._lock:
+            self.writes.append(("ticket", ticket_id, custom_field_id, value))
+
+    def update_contact(self, contact_id, *, full_name=None, contact_group_ids, **kwargs):
+        with self._lock:
+            self.writes.append(("update", contact_id, full_name, contact_group_ids))
+
+
+def test_push_custom_fields(tmp_path, http_error):
+    client = FakeTrengo(http_error)
+    with FieldSync(client, tmp_path / "pushed.sqlite", batch_size=2) as field_sync:
+        report = field_sync.push_contact_custom_fields({1: {10: "Gold", 11: "NL"}, 2: {10: "Silver"}})
+        assert (report.sent, report.skipped) == (3, 0)
+
+        client.writes.clear()
+        report = field_sync.push_contact_custom_fields([(1, {10: "Gold", 11: "BE"}), (2, {10: "Silver"}),
+                                                        (3, {10: "error"})])
+        assert (report.sent, report.skipped) == (1, 2)
+        assert list(report.failed) == [("contact", 3, "10")]
+        assert client.writes == [("contact", 1, 11, "BE")]
+
+        # Tickets have their own snapshot
+        assert field_sync.push_ticket_custom_fields({1: {10: "Gold"}}).sent == 1
+
+        client.writes.clear()
+        assert field_sync.push_contact_custom_fields({1: {10: "Gold"}}, force=True).sent == 1
+        field_sync.forget("contact", 2)
+        assert field_sync.push_contact_custom_fields({2: {10: "Silver"}}).sent == 1
+        assert client.writes == [("contact", 1, 10, "Gold"), ("contact", 2, 10, "Silver")]
+
+    # The snapshot is persistent
+    with FieldSync(client, tmp_path / "pushed.sqlite") as field_sync:
+        assert field_sync.push_contact_custom_fields({1: {10: "Gold", 11: "BE"}}).skipped == 2
+
+
+def test_push_contacts(tmp_path, http_error):
+    client = FakeTrengo(http_error)
+    with FieldSync(client, tmp_path / "pushed.sqlite") as field_sync:
+        assert field_sync.push_contacts({1: {"full_name": "Jane", "contact_group_ids": [2, 3]}}).sent == 1
+        report = field_sync.push_contacts({1: {"full_name": "Jane", "contact_group_ids": [2, 3]},
+                                           2: {"full_name": "John"}})
+        assert (report.sent, report.skipped) == (1, 1)
+
+    assert client.writes == [("update", 1, "Jane", [2, 3]), ("update", 2, "John", None)]
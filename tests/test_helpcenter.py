@@ -0,0 +1,57 @@
+import pytest
+
+from trengo.helpcenter import HelpCenterMirror
+
+
+def fetched_articles(client) -> list[int]:
+    return [int(path.rsplit("/", 1)[1]) for path in client.requests if path.startswith("/help_center/5/articles/")]
+
+
+@pytest.mark.parametrize("full_text", [True, False])
+def test_help_center_mirror(tmp_path, monkeypatch, fake_trengo, full_text):
+    if not full_text:
+        monkeypatch.setattr("trengo.helpcenter._FTS_SCHEMA", "CREATE VIRTUAL TABLE articles_text USING missing(a);")
+
+    articles = {
+        1: {"id": 1, "category_id": 10, "updated_at": "2024-01-01", "translations": [
+            {"locale": "en", "title": "Refund policy", "content": "<p>You can get a <b>refund</b> within 30 days.</p>"},
+            {"locale": "fr", "title": "Remboursements", "content": "<p>Vous pouvez être remboursé.</p>"},
+        ]},
+        2: {"id": 2, "category_id": 11, "updated_at": "2024-01-01", "translations": [
+            {"locale": "en", "title": "Shipping", "content": "We ship worldwide. Refunds of shipping costs..."},
+        ]},
+    }
+    client = fake_trengo({
+        "/help_center": [{"id": 5, "name": "Help"}],
+        "/help_center/5/categories": [{"id": 10}, {"id": 11}],
+        "/help_center/5/blocks": [],
+        "/help_center/5/articles": lambda path, params: [
+            {"id": id_, "updated_at": article["updated_at"]} for id_, article in articles.items()],
+        "/help_center/{id}/articles/{id}": lambda path, params: articles.get(int(path.rsplit("/", 1)[1])),
+    })
+    with HelpCenterMirror(client, tmp_path / "help_center.sqlite") as mirror:
+        assert mirror.full_text == full_text
+        assert mirror.sync() == {"fetched": 2, "unchanged": 0, "deleted": 0}
+        assert mirror.get_help_centers() == [{"id": 5, "name": "Help"}]
+        assert [category["id"] for category in mirror.get_categories(5)] == [10, 11]
+        assert [article["id"] for article in mirror.get_articles(category_id=11)] == [2]
+
+        assert {article["id"] for article in mirror.search("refund")} == {1, 2}
+        assert [article["id"] for article in mirror.search("refund 30 days")] == [1]
+        assert [article["id"] for article in mirror.search("rembours", locale="fr")] == [1]
+        assert mirror.search("rembours", locale="en") == []
+        assert mirror.search("?!") == []
+
+        articles[2]["updated_at"] = "2024-02-01"
+        articles[2]["translations"] = [{"locale": "en", "title": "Delivery", "content": "We deliver."}]
+        del articles[1]
+        client.requests.clear()
+        assert mirror.sync() == {"fetched": 1, "unchanged": 0, "deleted": 1}
+        assert fetched_articles(client) == [2]
+        assert mirror.get_article(1) is None
+        assert [article["id"] for article in mirror.search("deliver")] == [2]
+        assert mirror.search("refund") == []
+
+        client.requests.clear()
+        assert mirror.sync([5]) == {"fetched": 0, "unchanged": 1, "deleted": 0}
+        assert fetched_articles(client) == []
@@ -0,0 +1,92 @@
+import io
+import json
+
+import pytest
+import requests
+from requests import Response
+
+from trengo import RateLimiter, Trengo
+from trengo.instrumentation import Instrumentation, MetricsCollector, PageEvent, RequestEvent, normalize_endpoint
+
+
+def test_normalize_endpoint():
+    assert normalize_endpoint("/tickets") == "/tickets"
+    assert normalize_endpoint("/tickets/123/messages") == "/tickets/{id}/messages"
+    assert normalize_endpoint("/tickets/123/messages/45") == "/tickets/{id}/messages/{id}"
+    assert normalize_endpoint("/tickets/123?page=2") == "/tickets/{id}"
+    assert normalize_endpoint("/wa_sessions") == "/wa_sessions"
+
+
+def make_client(statuses: list[int], last_page=2, **kwargs) -> Trengo:
+    client = Trengo(token="test", **kwargs)
+
+    def request(method, url, *args, **kwargs_):
+        r = Response()
+        r.status_code = statuses.pop(0)
+        r.request = requests.Request(method, url, params=kwargs_.get("params")).prepare()
+        r.raw = io.BytesIO(json.dumps({"data": [{"id": 1}, {"id": 2}], "meta": {"last_page": last_page}}).encode())
+        return r
+
+    client.request = request  # type: ignore[method-assign]
+    return client
+
+
+def test_metrics_collector():
+    metrics = MetricsCollector()
+    client = make_client([200, 200, 200], instrumentation=metrics)
+
+    assert len(list(client.get_messages(123))) == 4
+    client.get_contact(456)
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {"GET /tickets/{id}/messages", "GET /contacts/{id}"}
+    messages = snapshot["GET /tickets/{id}/messages"]
+    assert messages["requests"] == 2
+    assert messages["pages"] == 2
+    assert messages["records"] == 4
+    assert messages["errors"] == 0
+    assert messages["response_bytes"] > 0
+    assert sum(messages["latency_buckets"].values()) == 2
+
+    assert metrics.endpoints[("GET", "/contacts/{id}")].quantile(0.5) is not None
+    assert "GET /tickets/{id}/messages" in metrics.summary()
+
+
+def test_instrumentation_retries_and_errors(monkeypatch):
+    monkeypatch.setattr("trengo.ratelimit.time.sleep", lambda seconds: None)
+    events: list[RequestEvent] = []
+
+    class Recorder(Instrumentation):
+        def on_request(self, event: RequestEvent):
+            events.append(event)
+
+    client = make_client([429, 200, 500], rate_limiter=RateLimiter(limit=100, period=1), instrumentation=Recorder())
+    client.get_contact(1)
+    with pytest.raises(requests.HTTPError):
+        client.get_contact(2)
+
+    assert [(event.endpoint, event.status_code, event.retries) for event in events] == [
+        ("/contacts/{id}", 200, 1),
+        ("/contacts/{id}", 500, 0),
+    ]
+
+
+def test_instrumentation_stream_pages():
+    pages: list[PageEvent] = []
+
+    class Recorder(Instrumentation):
+        def on_page(self, event: PageEvent):
+            pages.append(event)
+
+    client = Trengo(token="test", instrumentation=Recorder())
+
+    def request(method, url, *args, **kwargs):
+        r = Response()
+        r.status_code = 200
+        r.request = requests.Request(method, url).prepare()
+        r.raw = io.BytesIO(b'{"data": [{"id": 1}, {"id": 2}, {"id": 3}], "meta": {"last_page": 1}}')
+        return r
+
+    client.request = request  # type: ignore[method-assign]
+    assert len(list(client._fetch_paginated("/contacts", stream=True))) == 3
+    assert pages == [PageEvent("/contacts", 1, 3)]
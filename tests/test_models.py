@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from trengo.models import Contact, Message, Ticket, parse_datetime
+
+TICKET = {
+    "id": 42,
+    "status": "OPEN",
+    "subject": "Where is my order?",
+    "channel": {"id": 7, "name": "Email"},
+    "contact": {"id": 12, "name": "Jane", "email": "jane@example.com", "created_at": "2024-01-02 03:04:05"},
+    "user_id": None,
+    "created_at": "2024-09-12 10:22:33",
+    "updated_at": "2024-09-12T11:00:00+02:00",
+    "closed_at": None,
+    "labels": [{"id": 1, "name": "VIP"}, {"id": 3, "name": "Order"}],
+    "latest_message": {"id": 99, "ticket_id": 42, "type": "INBOUND", "message": "Hello"},
+}
+
+
+def test_ticket_model():
+    ticket = Ticket.from_dict(TICKET)
+    assert ticket.id == 42
+    assert ticket.channel_id == 7
+    assert ticket.contact_id == 12
+    assert ticket.created_at == datetime(2024, 9, 12, 10, 22, 33)
+    assert ticket.updated_at == datetime(2024, 9, 12, 11, tzinfo=timezone(timedelta(hours=2)))
+    assert ticket.closed_at is None
+    assert ticket.label_ids == (1, 3)
+
+    assert ticket.contact == Contact(id=12, name="Jane", email="jane@example.com",
+                                     created_at=datetime(2024, 1, 2, 3, 4, 5))
+    assert ticket.contact is ticket.contact
+    assert isinstance(ticket.latest_message, Message)
+    assert ticket.latest_message.message == "Hello"
+    assert not hasattr(ticket, "__dict__")
+
+
+def test_get_tickets_as_model():
+    from trengo import Trengo
+
+    class FakeTrengo(Trengo):
+        def get_json_api(self, path, params=None, **kwargs):
+            if path == "/tickets":
+                return {"data": [TICKET], "meta": {"last_page": 1}}
+            return None
+
+    client = FakeTrengo(token="test")
+    assert [ticket.id for ticket in client.get_tickets(as_model=True)] == [42]
+    assert client.get_contact(12, as_model=True) is None
+
+
+def test_parse_datetime_utc_suffix():
+    expected = datetime(2024, 9, 12, 10, 22, 33, tzinfo=timezone.utc)
+    assert parse_datetime("2024-09-12T10:22:33Z") == expected
+    assert parse_datetime("2024-09-12T10:22:33.000000Z") == expected
+    assert Message.from_dict({"id": 1, "created_at": "2024-09-12T10:22:33Z"}).created_at == expected
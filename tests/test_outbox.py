@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from trengo import Trengo
+from trengo.outbox import FAILED, PENDING, SENDING, SENT, Outbox
+
+
+class FakeTrengo(Trengo):
+    def __init__(self, errors: dict[str, list[Exception]] | None = None):
+        super().__init__(token="test")
+        self.errors = errors or {}
+        self.sent: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def send_whatsapp_template(self, recipient_phone_number, *, hsm_id, **kwargs):
+        with self._lock:
+            errors = self.errors.get(recipient_phone_number)
+            if errors:
+                raise errors.pop(0)
+            self.sent.append((recipient_phone_number, hsm_id))
+        return {"id": len(self.sent)}
+
+
+def test_outbox(tmp_path, http_error):
+    client = FakeTrengo(errors={"+2": [http_error(429), http_error(503)], "+3": [http_error(422)]})
+    with Outbox(client, tmp_path / "outbox.sqlite", workers=2, backoff=0, poll_interval=0.01) as outbox:
+        handles = [outbox.send_whatsapp_template(f"+{i}", hsm_id=7, idempotency_key=f"key-{i}") for i in range(1, 5)]
+        # Same key: not sent twice
+        outbox.send_whatsapp_template("+1", hsm_id=7, idempotency_key="key-1")
+
+        items = [handle.wait(timeout=5) for handle in handles]
+
+    assert [item.status for item in items] == [SENT, SENT, FAILED, SENT]
+    assert items[1].attempts == 3
+    assert items[2].attempts == 1 and "422" in (items[2].error or "")
+    assert sorted(client.sent) == [("+1", 7), ("+2", 7), ("+4", 7)]
+    assert items[0].result is not None and "id" in items[0].result
+
+
+def test_outbox_resume(tmp_path):
+    path = tmp_path / "outbox.sqlite"
+    client = FakeTrengo()
+
+    outbox = Outbox(client, path)
+    handle = outbox.send_whatsapp_template("+1", hsm_id=7, idempotency_key="key")
+    # Simulate a crash during the send
+    assert outbox._claim() is not None
+    outbox.connection.close()
+
+    # The send is resumed once its lease expires
+    outbox = Outbox(client, path, poll_interval=0.01, lease_timeout=0.05)
+    assert outbox.counts() == {SENDING: 1}
+    time.sleep(0.06)
+    assert outbox.process_one()
+    assert not outbox.process_one()
+    assert outbox.get(handle.idempotency_key).status == SENT  # type: ignore[union-attr]
+    outbox.close()
+
+
+def test_outbox_recover(tmp_path):
+    path = tmp_path / "outbox.sqlite"
+    outbox = Outbox(FakeTrengo(), path)
+    outbox.send_whatsapp_template("+1", hsm_id=7)
+    assert outbox._claim() is not None
+    assert outbox.recover() == 0
+    assert outbox.recover(all_sends=True) == 1
+    assert outbox.counts() == {PENDING: 1}
+    outbox.close()
+
+
+def test_outbox_concurrent_processes(tmp_path):
+    path = tmp_path / "outbox.sqlite"
+    client = FakeTrengo()
+
+    first = Outbox(client, path)
+    first.send_whatsapp_template("+1", hsm_id=7, idempotency_key="key")
+    # The first process is sending it when a second one opens the database
+    claimed = first._claim()
+    assert claimed is not None
+
+    second = Outbox(client, path)
+    assert second.counts() == {SENDING: 1}
+    assert not second.process_one()
+
+    # Only one of two concurrent claims gets the send
+    second.send_whatsapp_template("+2", hsm_id=7)
+    claims = [first._claim(), second._claim()]
+    assert sum(claim is not None for claim in claims) == 1
+
+    first.close()
+    second.close()
+    assert client.sent == []
+
+
+def test_outbox_unsupported_method(tmp_path):
+    with Outbox(FakeTrengo(), tmp_path / "outbox.sqlite") as outbox:
+        with pytest.raises(ValueError):
+            outbox.enqueue("delete_contact", contact_id=1)
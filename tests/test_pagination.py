@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.fixture
+def make_client(fake_trengo):
+    def make(pages: int):
+        records = [{"id": i} for i in range(pages * 3)]
+        return fake_trengo({"/tickets": records, "/contacts": records})
+
+    return make
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 4, 20])
+def test_get_paginated_order(prefetch, make_client):
+    client = make_client(pages=10)
+    ids = [record["id"] for record in client.get_tickets(prefetch=prefetch)]
+    assert ids == list(range(30))
+    assert sorted(client.requested_pages) == list(range(1, 11))
+
+
+def test_get_paginated_prefetch_window(make_client):
+    client = make_client(pages=100)
+    tickets = client.get_tickets(prefetch=3)
+    for _ in range(4):
+        next(tickets)
+    tickets.close()
+
+    # page 1 + at most the 3 pages of the window + the one submitted when page 2 was consumed
+    assert len(client.requested_pages) <= 5
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_get_paginated_max_pages(prefetch, make_client):
+    client = make_client(pages=10)
+    ids = [record["id"] for record in client.get_tickets(start_page=3, max_pages=2, prefetch=prefetch)]
+    assert ids == list(range(6, 12))
+    assert sorted(client.requested_pages) == [3, 4]
+
+
+def test_get_paginated_limit_and_stop_when(make_client):
+    client = make_client(pages=10)
+    assert [record["id"] for record in client.get_tickets(limit=4)] == [0, 1, 2, 3]
+    assert client.requested_pages == [1, 2]
+
+    client = make_client(pages=10)
+    assert [record["id"] for record in client.get_contacts(stop_when=lambda record: record["id"] >= 5)] == \
+           [0, 1, 2, 3, 4]
+    assert client.requested_pages == [1, 2]
+
+    client = make_client(pages=10)
+    assert [ticket.id for ticket in client.get_tickets(limit=2, as_model=True)] == [0, 1]
+    assert list(client.get_tickets(limit=0)) == []
+    assert client.requested_pages == [1]
@@ -0,0 +1,94 @@
+import threading
+
+from trengo.poller import TicketPoller
+
+
+def make_client(fake_trengo, tickets: list[dict]):
+    def get_aggregates(path, params):
+        counts: dict[str, dict[str, int]] = {}
+        for ticket in tickets:
+            counts.setdefault(ticket["status"], {"count": 0})["count"] += 1
+        return counts
+
+    def get_tickets(path, params):
+        assert params["sort"] == "-updated_at"
+        return sorted(tickets, key=lambda ticket: (ticket["updated_at"], ticket["id"]), reverse=True)
+
+    return fake_trengo({"/ticket_aggregates": get_aggregates, "/tickets": get_tickets}, per_page=5)
+
+
+def make_tickets(count: int) -> list[dict]:
+    return [{"id": i, "status": "OPEN", "updated_at": f"2024-09-01 10:00:{i:02}"} for i in range(count)]
+
+
+def test_poll(fake_trengo):
+    tickets = make_tickets(20)
+    client = make_client(fake_trengo, tickets)
+    emitted: list[dict] = []
+    poller = TicketPoller(client, callback=emitted.append, min_interval=10, max_interval=60)
+
+    # The first round records the current state
+    assert poller.poll() == []
+    assert client.requests == ["/ticket_aggregates", "/tickets"]
+
+    # Quiet rounds only check the aggregates, and the interval grows
+    client.requests.clear()
+    for _ in range(5):
+        assert poller.poll() == []
+    assert client.requests == ["/ticket_aggregates"] * 5
+    assert poller.interval == 60
+
+    # A new ticket changes the counts
+    client.requests.clear()
+    tickets.append({"id": 20, "status": "NEW", "updated_at": "2024-09-01 10:01:00"})
+    assert [ticket["id"] for ticket in poller.poll()] == [20]
+    assert client.requests == ["/ticket_aggregates", "/tickets"]
+    assert poller.interval == 10
+    assert [ticket["id"] for ticket in emitted] == [20]
+
+    # Nothing new since
+    assert poller.poll() == []
+    assert poller.high_water_mark == "2024-09-01 10:01:00"
+
+
+def test_poll_without_aggregates(fake_trengo):
+    tickets = make_tickets(20)
+    client = make_client(fake_trengo, tickets)
+    poller = TicketPoller(client, use_aggregates=False)
+    poller.poll()
+
+    client.requests.clear()
+    assert poller.poll() == []
+    assert client.requests == ["/tickets"]
+
+    # Updates that don't change the counts, including several at the same second
+    tickets[3]["updated_at"] = "2024-09-01 10:02:00"
+    tickets[4]["updated_at"] = "2024-09-01 10:02:00"
+    assert sorted(ticket["id"] for ticket in poller.poll()) == [3, 4]
+
+    tickets[5]["updated_at"] = "2024-09-01 10:02:00"
+    assert [ticket["id"] for ticket in poller.poll()] == [5]
+    assert poller.poll() == []
+
+
+def test_poll_since(fake_trengo):
+    tickets = make_tickets(20)
+    client = make_client(fake_trengo, tickets)
+    poller = TicketPoller(client, since="2024-09-01 10:00:12", use_aggregates=False)
+    assert [ticket["id"] for ticket in poller.poll()] == list(range(19, 11, -1))
+    assert client.requests == ["/tickets", "/tickets"]
+
+
+def test_iterate(fake_trengo):
+    tickets = make_tickets(3)
+    client = make_client(fake_trengo, tickets)
+    poller = TicketPoller(client, min_interval=0.01, max_interval=0.01, use_aggregates=False)
+
+    def add_ticket():
+        tickets.append({"id": 3, "status": "OPEN", "updated_at": "2024-09-02 00:00:00"})
+
+    threading.Timer(0.05, add_ticket).start()
+    for ticket in poller:
+        assert ticket["id"] == 3
+        poller.stop()
+    assert poller.rounds >= 2
@@ -0,0 +1,101 @@
+import io
+import threading
+import time
+
+import pytest
+import requests
+from requests import Response
+
+from trengo import RateLimiter, Trengo
+from trengo.instrumentation import MetricsCollector
+from trengo.pool import TrengoPool
+
+
+class FakeTrengo(Trengo):
+    def __init__(self, name: str, statuses: list[int] | None = None, **kwargs):
+        super().__init__(token=name, rate_limit_retries=0, **kwargs)
+        self.name = name
+        self.statuses = statuses or []
+        self.requests: list[tuple[str, str]] = []
+        self.timeouts_used: list = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, *args, **kwargs):
+        with self._lock:
+            self.requests.append((method.upper(), url.removeprefix(self.base_url)))
+            self.timeouts_used.append(kwargs.get("timeout"))
+            status_code = self.statuses.pop(0) if self.statuses else 200
+        time.sleep(0.01)
+
+        r = Response()
+        r.status_code = status_code
+        r.request = requests.Request(method, url).prepare()
+        if status_code == 429:
+            r.headers["Retry-After"] = "30"
+        r.raw = io.BytesIO(b'{"data": [{"id": 1}], "meta": {"last_page": 1}}')
+        return r
+
+
+def test_pool_balances_reads():
+    clients = [FakeTrengo("a"), FakeTrengo("b"), FakeTrengo("c")]
+    pool = TrengoPool(clients)
+
+    threads = [threading.Thread(target=lambda: list(pool.get_labels())) for _ in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(len(client.requests) for client in clients) == 30
+    assert all(len(client.requests) >= 5 for client in clients)
+
+    pool.delete_contact(1)
+    assert clients[0].requests[-1] == ("DELETE", "/contacts/1")
+
+
+def test_pool_rate_limiters():
+    clients = [FakeTrengo(name, rate_limiter=RateLimiter(limit=10, period=60)) for name in "ab"]
+    pool = TrengoPool(clients)
+    for _ in range(10):
+        list(pool.get_labels())
+    # Each client takes the requests while it has more remaining quota than the other
+    assert [len(client.requests) for client in clients] == [5, 5]
+
+
+def test_pool_fails_over_on_429():
+    clients = [FakeTrengo("a", statuses=[429]), FakeTrengo("b", statuses=[429]), FakeTrengo("c")]
+    pool = TrengoPool(clients)
+    assert list(pool.get_labels()) == [{"id": 1}]
+    assert [len(client.requests) for client in clients] == [1, 1, 1]
+
+    # a and b are blocked for 30s
+    list(pool.get_labels())
+    assert [len(client.requests) for client in clients] == [1, 1, 2]
+
+    # Writes are not sent twice
+    clients[0].statuses = [429]
+    with pytest.raises(requests.HTTPError):
+        pool.delete_contact(1)
+    assert [len(client.requests) for client in clients] == [2, 1, 2]
+
+
+def test_pool_options():
+    clients = [FakeTrengo("a", statuses=[429]), FakeTrengo("b")]
+    metrics = MetricsCollector()
+    pool = TrengoPool(clients, instrumentation=metrics, timeout=5, timeouts={"/contacts": (1, 2)}, read_only=True)
+
+    list(pool.get_labels())
+    pool.get_contact(1)
+    assert clients[0].timeouts_used == [5]
+    assert clients[1].timeouts_used == [5, (1, 2)]
+
+    snapshot = metrics.snapshot()
+    assert snapshot["GET /labels"]["requests"] == 1
+    assert snapshot["GET /labels"]["retries"] == 1
+    assert snapshot["GET /contacts/{id}"]["requests"] == 1
+
+    with pytest.raises(AssertionError):
+        pool.delete_contact(1)
+
+    with pytest.raises(ValueError):
+        TrengoPool(clients, rate_limiter=RateLimiter())
@@ -0,0 +1,66 @@
+import io
+
+import pytest
+from requests import Response
+
+from trengo import RateLimiter, Trengo
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr("trengo.ratelimit.time.monotonic", fake_clock.monotonic)
+    monkeypatch.setattr("trengo.ratelimit.time.sleep", fake_clock.sleep)
+    return fake_clock
+
+
+def test_rate_limiter_bucket(clock):
+    limiter = RateLimiter(limit=2, period=10)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(5)
+    assert limiter.reserve() == pytest.approx(10)
+    assert limiter.throttled_requests == 2
+    assert limiter.throttled_time == pytest.approx(15)
+
+    clock.now += 15
+    assert limiter.remaining == pytest.approx(1)
+
+
+def test_rate_limiter_headers(clock):
+    limiter = RateLimiter(limit=100, period=60)
+    limiter.update(200, {"X-RateLimit-Limit": "60", "X-RateLimit-Remaining": "0"})
+    assert limiter.limit == 60
+    assert limiter.reserve() == pytest.approx(1)
+
+    limiter.update(429, {"Retry-After": "30"})
+    assert limiter.reserve() == pytest.approx(30)
+
+
+def test_trengo_retries_429(clock):
+    client = Trengo(token="test", rate_limiter=RateLimiter(limit=10, period=1))
+    statuses = [429, 429, 200]
+
+    def request(method, url, *args, **kwargs):
+        r = Response()
+        r.status_code = statuses.pop(0)
+        r.headers["Retry-After"] = "2"
+        r.raw = io.BytesIO(b'{"data": [], "meta": {"last_page": 1}}')
+        return r
+
+    client.request = request  # type: ignore[method-assign]
+    assert list(client.get_labels()) == []
+    assert statuses == []
+    assert client.rate_limiter is not None
+    assert client.rate_limiter.throttled_time == pytest.approx(4)
@@ -0,0 +1,49 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from trengo.reporting import get_reporting_table, split_windows
+
+
+def test_split_windows():
+    windows = split_windows(datetime(2024, 1, 1), datetime(2024, 1, 3, 12), timedelta(days=1))
+    assert windows == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 2)),
+        (datetime(2024, 1, 2), datetime(2024, 1, 3)),
+        (datetime(2024, 1, 3), datetime(2024, 1, 3, 12)),
+    ]
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_reporting_metrics(self, metrics, *, start_date, end_date, **kwargs):
+        with self._lock:
+            self.calls.append((start_date, kwargs))
+        return {"new_tickets": start_date.day * 10 + kwargs["team_ids"][0]}
+
+
+def test_get_reporting_table(tmp_path):
+    client = FakeClient()
+    kwargs = dict(
+        start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 4),
+        split_by={"team_ids": [1, 2]},
+        cache=tmp_path,
+        now=datetime(2024, 1, 3, 12),
+        direction="INBOUND",
+    )
+
+    rows = get_reporting_table(client, ["new_tickets"], **kwargs)  # type: ignore[arg-type]
+    assert len(client.calls) == 6
+    assert rows[0] == {"start_date": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                       "end_date": datetime(2024, 1, 2, tzinfo=timezone.utc),
+                       "team_id": 1, "new_tickets": 11}
+    assert [row["new_tickets"] for row in rows] == [11, 12, 21, 22, 31, 32]
+    assert client.calls[0][1] == {"direction": "INBOUND", "team_ids": [1]}
+
+    # Only the current window is queried again
+    client.calls.clear()
+    assert get_reporting_table(client, ["new_tickets"], **kwargs) == rows  # type: ignore[arg-type]
+    assert sorted(call[1]["team_ids"][0] for call in client.calls) == [1, 2]
+    assert all(call[0].day == 3 for call in client.calls)
@@ -0,0 +1,63 @@
+import io
+import json
+
+import pytest
+import requests
+
+from trengo import Trengo
+from trengo.streaming import PageStream
+
+
+def chunked(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+PAYLOAD = {
+    "data": [
+        {"id": 1, "message": "<p>Bonjour, ça va ?</p> " * 20, "nested": {"list": [1, 2.5, None, True]}},
+        {"id": 12345, "message": "}]\\"},
+        {"id": 3, "attachments": []},
+    ],
+    "links": {"next": None},
+    "meta": {"current_page": 1, "last_page": 12},
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 100_000])
+def test_page_stream(chunk_size):
+    body = json.dumps(PAYLOAD, indent=2, ensure_ascii=False).encode("utf-8")
+    page = PageStream(chunked(body, chunk_size))
+
+    assert list(page) == PAYLOAD["data"]
+    assert page.meta == {"current_page": 1, "last_page": 12}
+    assert page.fields["links"] == {"next": None}
+
+
+def test_page_stream_meta_first():
+    body = b'{"meta": {"last_page": 1}, "data": [1, 23, 456]}'
+    page = PageStream(chunked(body, 1))
+    assert list(page) == [1, 23, 456]
+    assert page.meta == {"last_page": 1}
+
+
+def test_page_stream_truncated():
+    with pytest.raises(json.JSONDecodeError):
+        list(PageStream([b'{"data": [{"id": 1}, {"id"']))
+
+
+class FakeTrengo(Trengo):
+    def get_api(self, path, params=None, *, throw=None, **kwargs):
+        assert kwargs["stream"] is True
+        page = params["page"]
+        r = requests.Response()
+        r.status_code = 200
+        r.raw = io.BytesIO(json.dumps({"data": [{"id": page}], "meta": {"last_page": 3}}).encode())
+        return r
+
+
+def test_stream_paginated():
+    client = FakeTrengo(token="test")
+    assert [message["id"] for message in client.get_messages(1, stream=True)] == [1, 2, 3]
+
+    with pytest.raises(ValueError):
+        list(client.get_messages(1, stream=True, prefetch=2))
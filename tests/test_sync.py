@@ -0,0 +1,40 @@
+from trengo.sync import TicketSync
+
+
+class FakeClient:
+    def __init__(self):
+        self.tickets: list[dict] = []
+        self.fetched_tickets = 0
+        self.fetched_messages: list[int] = []
+
+    def get_tickets(self, sort=None, **kwargs):
+        assert sort == "-updated_at"
+        for ticket in sorted(self.tickets, key=lambda t: t["updated_at"], reverse=True):
+            self.fetched_tickets += 1
+            yield ticket
+
+    def get_messages(self, ticket_id):
+        self.fetched_messages.append(ticket_id)
+        return iter([{"id": ticket_id * 100 + 1, "message": "hello"}])
+
+
+def test_ticket_sync(tmp_path):
+    client = FakeClient()
+    client.tickets = [{"id": i, "updated_at": f"2024-01-{i:02d} 00:00:00"} for i in range(1, 11)]
+
+    with TicketSync(client, tmp_path / "tickets.sqlite") as ticket_sync:  # type: ignore[arg-type]
+        assert ticket_sync.sync() == 10
+        assert ticket_sync.high_water_mark == "2024-01-10 00:00:00"
+        assert list(ticket_sync.get_messages(3)) == [{"id": 301, "message": "hello"}]
+
+    client.tickets[2] = {"id": 3, "updated_at": "2024-02-01 00:00:00", "status": "CLOSED"}
+    client.fetched_tickets = 0
+    client.fetched_messages = []
+
+    with TicketSync(client, tmp_path / "tickets.sqlite") as ticket_sync:  # type: ignore[arg-type]
+        # the updated ticket, the one at the previous high-water mark, then the first older one stops the sync
+        assert ticket_sync.sync() == 2
+        assert client.fetched_tickets == 3
+        assert client.fetched_messages == [3, 10]
+        assert ticket_sync.get_ticket(3) == {"id": 3, "updated_at": "2024-02-01 00:00:00", "status": "CLOSED"}
+        assert [ticket["id"] for ticket in ticket_sync.get_tickets()][:2] == [3, 10]
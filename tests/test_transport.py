@@ -0,0 +1,86 @@
+import gzip
+import io
+import json
+
+import httpx
+import pytest
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+from trengo import Trengo
+from trengo.transport import HTTPXAdapter, endpoint_timeout
+
+
+def test_endpoint_timeout():
+    timeouts = {"/tickets": 10, "/tickets/{id}/messages": (3, 60), "/reporting/": 120}
+
+    assert endpoint_timeout(timeouts, "/tickets") == 10
+    assert endpoint_timeout(timeouts, "/tickets/42") == 10
+    assert endpoint_timeout(timeouts, "/tickets/42/messages") == (3, 60)
+    assert endpoint_timeout(timeouts, "/reporting/tickets") == 120
+    assert endpoint_timeout(timeouts, "/ticketsx") is None
+    assert endpoint_timeout(timeouts, "/contacts") is None
+
+
+def test_timeouts():
+    timeouts: list = []
+
+    class FakeTrengo(Trengo):
+        def request(self, method, url, *args, **kwargs):
+            timeouts.append(kwargs.get("timeout"))
+            r = Response()
+            r.status_code = 200
+            r.raw = io.BytesIO(b"{}")
+            return r
+
+    client = FakeTrengo(token="test", timeouts={"/tickets": (3, 30)})
+    client.get_json_api("/tickets/1")
+    client.get_json_api("/contacts/1")
+    client.get_json_api("/tickets/1", timeout=5)
+    assert timeouts == [(3, 30), None, 5]
+
+
+def test_transport_options():
+    client = Trengo(token="test", pool_maxsize=32, keep_alive=False, compression=False, max_retries=2)
+    adapter = client.get_adapter(client.base_url)
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_maxsize == 32  # type: ignore[attr-defined]
+    assert adapter.max_retries.total == 2
+    assert client.headers["Connection"] == "close"
+    assert client.headers["Accept-Encoding"] == "identity"
+
+    client = Trengo(token="test")
+    assert "gzip" in client.headers["Accept-Encoding"]
+
+
+def make_httpx_client(requests_: list[httpx.Request]) -> httpx.Client:
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests_.append(request)
+        if request.url.path.endswith("/down"):
+            raise httpx.ConnectError("Connection refused", request=request)
+        body = gzip.compress(json.dumps({"id": 1, "path": request.url.path}).encode())
+        return httpx.Response(200, content=body, headers={"Content-Type": "application/json",
+                                                          "Content-Encoding": "gzip"})
+
+    return httpx.Client(transport=httpx.MockTransport(handle))
+
+
+def test_httpx_adapter():
+    sent: list[httpx.Request] = []
+    client = Trengo(token="test")
+    client.mount("https://", HTTPXAdapter(make_httpx_client(sent)))
+
+    assert client.get_json_api("/contacts/1", params={"a": "b"}) == {"id": 1, "path": "/api/v2/contacts/1"}
+    assert client.post_json_api("/tickets/1/close", json={"x": 1}) == {"id": 1, "path": "/api/v2/tickets/1/close"}
+
+    assert sent[0].url.params["a"] == "b"
+    assert sent[0].headers["Authorization"] == "Bearer test"
+    assert sent[1].method == "POST"
+    assert json.loads(sent[1].content) == {"x": 1}
+
+    with client.get(f"{client.base_url}/contacts/1", stream=True) as r:
+        assert json.loads(b"".join(r.iter_content(3))) == {"id": 1, "path": "/api/v2/contacts/1"}
+
+    with pytest.raises(requests.ConnectionError):
+        client.get_json_api("/down")
@@ -0,0 +1,88 @@
+import hashlib
+import hmac
+import io
+import threading
+import time
+
+import pytest
+
+from trengo.webhooks import WebhookApp, WebhookDispatcher, parse_event, verify_signature
+
+SECRET = "s3cr3t"
+
+
+def sign(body: bytes, timestamp: int | None = None) -> str:
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(SECRET.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"{timestamp};{signature}"
+
+
+def test_verify_signature():
+    body = b"ticket_id=1"
+    assert verify_signature(body, sign(body), SECRET)
+    assert not verify_signature(body + b"2", sign(body), SECRET)
+    assert not verify_signature(body, sign(body, timestamp=1000), SECRET)
+    assert verify_signature(body, sign(body, timestamp=1000), SECRET, tolerance=None)
+    assert not verify_signature(body, "", SECRET)
+
+
+def test_parse_event():
+    event = parse_event(b"ticket_id=12&message_id=34&contact_id=&message=Hello+world", type_="INBOUND")
+    assert (event.type, event.ticket_id, event.message_id, event.contact_id) == ("INBOUND", 12, 34, None)
+    assert event.payload["message"] == "Hello world"
+
+    event = parse_event(b'{"type": "TICKET_CLOSED", "ticket_id": 5}', "application/json")
+    assert (event.type, event.ticket_id) == ("TICKET_CLOSED", 5)
+
+    for body in (b"[]", b'"x"', b"12"):
+        with pytest.raises(ValueError):
+            parse_event(body, "application/json")
+
+
+def call(app, body: bytes, *, path="/trengo/INBOUND", signature: str | None = None,
+         content_type="application/x-www-form-urlencoded"):
+    statuses = []
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": path,
+        "CONTENT_TYPE": content_type,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "HTTP_TRENGO_SIGNATURE": sign(body) if signature is None else signature,
+    }
+    app(environ, lambda status, headers: statuses.append(status))
+    return statuses[0]
+
+
+def test_webhook_app():
+    events = []
+    done = threading.Event()
+
+    def handler(event):
+        events.append(event)
+        if len(events) == 2:
+            done.set()
+
+    with WebhookDispatcher(handler, workers=2) as dispatcher:
+        app = WebhookApp(dispatcher, secret=SECRET)
+        assert call(app, b"ticket_id=1") == "200 OK"
+        assert call(app, b"ticket_id=2", path="/trengo/OUTBOUND") == "200 OK"
+        assert call(app, b"ticket_id=3", signature="123;abc") == "401 Unauthorized"
+        assert call(app, b"[1, 2]", content_type="application/json") == "400 Bad Request"
+        assert call(app, b"{", content_type="application/json") == "400 Bad Request"
+        assert done.wait(5)
+
+    assert sorted((event.type, event.ticket_id) for event in events) == [("INBOUND", 1), ("OUTBOUND", 2)]
+    assert dispatcher.processed == 2
+
+
+def test_webhook_app_backpressure():
+    release = threading.Event()
+    dispatcher = WebhookDispatcher(lambda event: release.wait(5), workers=1, queue_size=1, put_timeout=0)
+    app = WebhookApp(dispatcher)
+    with dispatcher:
+        statuses = [call(app, b"ticket_id=1") for _ in range(5)]
+        release.set()
+
+    assert "503 Service Unavailable" in statuses
+    assert dispatcher.rejected == statuses.count("503 Service Unavailable")
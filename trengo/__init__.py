@@ -1,36 +1,57 @@
+import copy
+import json
 import os
-from collections.abc import Iterator
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Generator, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime, timezone
-from typing import Any, Iterable
+from typing import TYPE_CHECKING, Any, Callable, Iterable
 
 from api_session import APISession, JSONDict, escape_path
-
-__all__ = ["Trengo", "__version__"]
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from trengo.bulk import BulkReport, run_bulk
+from trengo.cache import CachedRecords, SingleFlight, TTLCache
+from trengo.instrumentation import Instrumentation, PageEvent, RequestEvent, normalize_endpoint
+from trengo.models import Contact, Message, Profile, Ticket, map_records
+from trengo.ratelimit import RateLimiter
+from trengo.streaming import PageStream
+from trengo.transport import HTTPXAdapter, endpoint_timeout
+
+__all__ = ["Trengo", "BulkReport", "RateLimiter", "__version__"]
 __version__ = "0.1.4"
 
 
-class Trengo(APISession):
-    def __init__(self, *, token: str | None = None, base_url="https://app.trengo.eu/api/v2", **kwargs):
-        if token is None:
-            token = os.environ.get("TRENGO_TOKEN")
-            if token is None:
-                raise RuntimeError("No Trengo token provided, and the environment variable TRENGO_TOKEN is not set")
+class BaseTrengo:
+    """
+    Endpoint methods shared by `Trengo` and `trengo.aio.AsyncTrengo`.
 
-        super().__init__(base_url=base_url, **kwargs)
-        self.headers["Authorization"] = f"Bearer {token}"
+    Subclasses provide the ``*_json_api`` methods as well as ``_get_paginated`` and ``_map_result``.
+    """
 
-    def _get_paginated(self, endpoint: str, params: dict[str, Any] | None = None, **kwargs) -> Iterator[JSONDict]:
-        if params is None:
-            params = {}
+    if TYPE_CHECKING:
+        def get_json_api(self, path: str, params: dict | None = None, **kwargs) -> Any: ...
 
-        page = 1
-        last_page: int | None = None
-        while last_page is None or page <= last_page:
-            payload = self.get_json_api(endpoint, params={**params, "page": page}, **kwargs)
-            yield from payload["data"]
+        def post_json_api(self, path: str, *args, **kwargs) -> Any: ...
 
-            last_page = payload["meta"]["last_page"]
-            page += 1
+        def put_json_api(self, path: str, *args, **kwargs) -> Any: ...
+
+        def delete_json_api(self, path: str, **kwargs) -> Any: ...
+
+        def _get_paginated(self, endpoint: str, params: dict[str, Any] | None = None, **kwargs) -> Any: ...
+
+        def _map_result(self, result: Any, func: Callable[[Any], Any]) -> Any: ...
+
+    def _map_model(self, result: Any, model: Any) -> Any:
+        """Decode the result of a call that returns a single record into ``model``, unless it's None."""
+        if model is None:
+            return result
+        return self._map_result(result, lambda record: None if record is None else model.from_dict(record))
 
     # == Tickets ==
 
@@ -42,8 +63,14 @@ class Trengo(APISession):
             channels: list[int] | None = None,
             last_message_type: str | None = None,
             sort: str | None = None,
+            as_model=False,
             **kwargs,
     ):
+        """
+        Yield all tickets.
+
+        :param as_model: if True, yield `trengo.models.Ticket` objects instead of dicts.
+        """
         return self._get_paginated(
             "/tickets",
             params=make_params({
@@ -54,6 +81,7 @@ class Trengo(APISession):
                 "last_message_type": last_message_type,
                 "sort": sort,
             }),
+            model=Ticket if as_model else None,
             **kwargs,
         )
 
@@ -232,9 +260,16 @@ class Trengo(APISession):
             **kwargs,
         )
 
-    def get_messages(self, ticket_id: int, **kwargs):
-        """Yield all messages from a ticket."""
-        return self._get_paginated(f"/tickets/{escape_path(ticket_id)}/messages", **kwargs)
+    def get_messages(self, ticket_id: int, *, as_model=False, **kwargs):
+        """
+        Yield all messages from a ticket.
+
+        :param ticket_id:
+        :param as_model: if True, yield `trengo.models.Message` objects instead of dicts.
+        """
+        return self._get_paginated(f"/tickets/{escape_path(ticket_id)}/messages",
+                                   model=Message if as_model else None,
+                                   **kwargs)
 
     def mark_ticket_as_favorite(self, ticket_id: int, **kwargs):
         """Mark a ticket as favorite"""
@@ -244,9 +279,16 @@ class Trengo(APISession):
         """Unmark a ticket as favorite"""
         return self.delete_json_api(f"/tickets/{escape_path(ticket_id)}/favorited/0", **kwargs)
 
-    def get_message(self, ticket_id: int, message_id: int, **kwargs) -> JSONDict | None:
-        """Get a single message."""
-        return self.get_json_api(f"/tickets/{escape_path(ticket_id)}/messages/{escape_path(message_id)}", **kwargs)
+    def get_message(self, ticket_id: int, message_id: int, *, as_model=False, **kwargs) -> JSONDict | None:
+        """
+        Get a single message.
+
+        :param ticket_id:
+        :param message_id:
+        :param as_model: if True, return a `trengo.models.Message` object instead of a dict.
+        """
+        result = self.get_json_api(f"/tickets/{escape_path(ticket_id)}/messages/{escape_path(message_id)}", **kwargs)
+        return self._map_model(result, Message if as_model else None)
 
     def store_custom_channel_message(self, channel: str, *,
                                      contact: dict[str, Any] | None = None,
@@ -291,25 +333,33 @@ class Trengo(APISession):
 
     # == Contacts ==
 
-    def get_contacts(self, term: str | None = None, **kwargs):
-        """Yield all contacts."""
+    def get_contacts(self, term: str | None = None, *, as_model=False, **kwargs):
+        """
+        Yield all contacts.
+
+        :param term:
+        :param as_model: if True, yield `trengo.models.Contact` objects instead of dicts.
+        """
         return self._get_paginated("/contacts",
                                    params={"term": term},
+                                   model=Contact if as_model else None,
                                    **kwargs)
 
-    def get_contact(self, contact_id: int, include: list[str] | None = None, **kwargs) -> JSONDict | None:
+    def get_contact(self, contact_id: int, include: list[str] | None = None, *, as_model=False,
+                    **kwargs) -> JSONDict | None:
         """
         Get a single contact.
 
         :param contact_id:
         :param include: Eager load relations (available: "notes")
+        :param as_model: if True, return a `trengo.models.Contact` object instead of a dict.
         :return:
         """
-        return self.get_json_api(
+        return self._map_model(self.get_json_api(
             f"/contacts/{escape_path(contact_id)}",
             params={"include": ",".join(include) if include else None},
             **kwargs,
-        )
+        ), Contact if as_model else None)
 
     def create_contact(self, channel_id: int, identifier: str, *, full_name: str | None = None, **kwargs) -> JSONDict:
         """
@@ -369,28 +419,36 @@ class Trengo(APISession):
 
     # == Profiles ==
 
-    def get_profiles(self, term: str | None = None, **kwargs):
-        """Yield all profiles."""
+    def get_profiles(self, term: str | None = None, *, as_model=False, **kwargs):
+        """
+        Yield all profiles.
+
+        :param term:
+        :param as_model: if True, yield `trengo.models.Profile` objects instead of dicts.
+        """
         return self._get_paginated("/profiles",
                                    params={"term": term},
+                                   model=Profile if as_model else None,
                                    **kwargs)
 
-    def get_profile(self, profile_id: int, include: list[str] | None = None, **kwargs) -> JSONDict | None:
+    def get_profile(self, profile_id: int, include: list[str] | None = None, *, as_model=False,
+                    **kwargs) -> JSONDict | None:
         """
         Get a single profile.
 
         :param profile_id:
         :param include: Eager load relations (available: "user", "notes").
           Note using both "user" and "notes" is untested.
+        :param as_model: if True, return a `trengo.models.Profile` object instead of a dict.
         """
-        return self.get_json_api(
+        return self._map_model(self.get_json_api(
             f"/profiles/{escape_path(profile_id)}",
             # NOTE: it’s not clear how to combine "user" and "notes" here;
             #   the documentation only seems to allow "user" OR "notes" and the API doesn't enforce the value:
             #   we can use "foo" with no error.
             params={"with": ",".join(include) if include else None},
             **kwargs,
-        )
+        ), Profile if as_model else None)
 
     # == SMS Messages ==
 
@@ -416,6 +474,10 @@ class Trengo(APISession):
         """Yield all help center blocks."""
         return self._get_paginated(f"/help_center/{escape_path(help_center_id)}/blocks", **kwargs)
 
+    def get_help_center_articles(self, help_center_id: int, **kwargs):
+        """Yield all help center articles."""
+        return self._get_paginated(f"/help_center/{escape_path(help_center_id)}/articles", **kwargs)
+
     def get_help_center(self, help_center_id: int, **kwargs) -> JSONDict | None:
         """Get a help center."""
         return self.get_json_api(f"/help_center/{escape_path(help_center_id)}", **kwargs)
@@ -490,7 +552,7 @@ class Trengo(APISession):
 
     def get_custom_fields(self, **kwargs):
         """Yield all custom fields."""
-        return self._get_paginated("/webhcustom_fieldsooks", **kwargs)
+        return self._get_paginated("/custom_fields", **kwargs)
 
     # == Webhooks ==
 
@@ -554,7 +616,7 @@ class Trengo(APISession):
                        'average_first_response_time', 'created_tickets', 'closed_tickets',
                        'reopened_tickets']
 
-        return self.get_json_api(
+        return self._map_result(self.get_json_api(
             "/reporting/metrics",
             params=make_params({
                 "metric[]": metrics,
@@ -566,7 +628,632 @@ class Trengo(APISession):
                 "direction": direction,
             }),
             **kwargs,
-        )["aggregates"]
+        ), lambda payload: payload["aggregates"])
+
+
+_MISSING = object()
+
+DEFAULT_BASE_URL = "https://app.trengo.eu/api/v2"
+
+# Time-to-live, in seconds, of the cached reference data, by endpoint
+DEFAULT_CACHE_TTLS: dict[str, float] = {
+    "/labels": 300,
+    "/teams": 300,
+    "/users": 300,
+    "/ticket_results": 3600,
+    "/contact_groups": 300,
+    "/custom_fields": 3600,
+    "/webhooks": 300,
+}
+
+
+class Trengo(APISession, BaseTrengo):
+    def __init__(self, *, token: str | None = None, base_url=DEFAULT_BASE_URL,
+                 rate_limiter: RateLimiter | None = None,
+                 rate_limit_retries=3,
+                 cache_reference_data=False,
+                 cache_ttls: dict[str, float] | None = None,
+                 cache_maxsize=128,
+                 instrumentation: Instrumentation | None = None,
+                 coalesce_requests=False,
+                 coalesce_ttl: float = 0,
+                 coalesce_maxsize=1024,
+                 pool_maxsize: int | None = None,
+                 keep_alive=True,
+                 compression=True,
+                 timeouts: dict[str, float | tuple[float, float] | None] | None = None,
+                 http2=False,
+                 **kwargs):
+        """
+        :param token: API token. If it's not given, it's read from the ``TRENGO_TOKEN`` environment variable.
+        :param base_url: Base URL of the API.
+        :param rate_limiter: optional `RateLimiter` to throttle all the requests. It can be shared between clients
+          that use the same token.
+        :param rate_limit_retries: when using a rate limiter, number of times a request that got a 429 response is
+          retried once the rate limiter allows it.
+        :param cache_reference_data: if True, cache the results of the list methods of small, slow-changing
+          collections: labels, teams, users, ticket results, contact groups, custom fields and webhooks.
+        :param cache_ttls: time-to-live of the cached results, in seconds, by endpoint (e.g. ``{"/users": 60}``).
+          This overrides the defaults in ``DEFAULT_CACHE_TTLS``.
+        :param cache_maxsize: maximum number of cached results.
+        :param instrumentation: optional `trengo.instrumentation.Instrumentation` called after each request and each
+          page, e.g. a `trengo.instrumentation.MetricsCollector`.
+        :param coalesce_requests: if True, identical concurrent GET requests (same path and parameters) are sent only
+          once: while a request is in flight, the other callers wait for it and get the same result. Each caller gets
+          its own copy of the result, so modifying it doesn't affect the others.
+        :param coalesce_ttl: when coalescing requests, also keep their results for this many seconds, so that
+          identical GET requests sent shortly after are not sent again. This should be short, e.g. 1 second.
+        :param coalesce_maxsize: maximum number of results kept for ``coalesce_ttl``.
+        :param pool_maxsize: maximum number of connections kept open to the API. The default of ``requests`` is 10; use
+          at least the number of threads that send requests concurrently, e.g. ``prefetch`` or ``max_workers``.
+        :param keep_alive: if False, open a new connection for each request.
+        :param compression: if True (the default), ask for compressed responses: gzip and deflate, plus brotli and
+          zstd if the ``brotli`` and ``zstandard`` packages are installed. If False, ask for uncompressed responses.
+        :param timeouts: timeout of the requests by endpoint prefix, e.g. ``{"/tickets": 10, "/reporting": (3, 60)}``.
+          The longest matching prefix wins; other requests use the ``timeout`` of the ``APISession`` constructor. See
+          `trengo.transport.endpoint_timeout`.
+        :param http2: if True, send the requests with ``httpx`` over HTTP/2 instead of ``requests``' own transport.
+          This needs the ``http2`` extra. See `trengo.transport.HTTPXAdapter`.
+        :param kwargs: keyword arguments passed to the ``APISession`` constructor.
+        """
+        token = get_token(token)
+
+        super().__init__(base_url=base_url, **kwargs)
+        self.headers["Authorization"] = f"Bearer {token}"
+        self.rate_limiter = rate_limiter
+        self.rate_limit_retries = rate_limit_retries
+        self.cache_ttls = {**DEFAULT_CACHE_TTLS, **(cache_ttls or {})}
+        self.reference_cache = TTLCache(maxsize=cache_maxsize) if cache_reference_data else None
+        self.instrumentation = instrumentation
+        self.coalescer = SingleFlight() if coalesce_requests else None
+        self.coalesce_ttl = coalesce_ttl
+        self.coalesce_cache = TTLCache(maxsize=coalesce_maxsize, ttl=coalesce_ttl) \
+            if coalesce_requests and coalesce_ttl > 0 else None
+        self.timeouts = timeouts or {}
+
+        adapter: BaseAdapter | None = None
+        if http2:
+            adapter = HTTPXAdapter(http2=True, pool_maxsize=pool_maxsize or 10, keep_alive=keep_alive)
+        elif pool_maxsize is not None:
+            # Keep the retries of the adapter mounted by APISession, if any
+            current_adapter = self.get_adapter(self.base_url)
+            max_retries = current_adapter.max_retries if isinstance(current_adapter, HTTPAdapter) else 0
+            adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=max_retries)
+        if adapter is not None:
+            self.mount("https://", adapter)
+            # noinspection HttpUrlsUsage
+            self.mount("http://", adapter)
+
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+        if not compression:
+            self.headers["Accept-Encoding"] = "identity"
+
+    def get_json_api(self, path: str, params: dict | None = None, **kwargs):
+        if self.coalescer is None:
+            return super().get_json_api(path, params, **kwargs)
+
+        key = (path, json.dumps([params, kwargs], sort_keys=True, default=str))
+        if self.coalesce_cache is not None:
+            result = self.coalesce_cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return copy.deepcopy(result)
+
+        def get():
+            result_ = super(Trengo, self).get_json_api(path, params, **kwargs)
+            if self.coalesce_cache is not None:
+                self.coalesce_cache.set(key, result_)
+            return result_
+
+        # The result is shared between the callers and with the micro-cache: give each caller its own copy
+        return copy.deepcopy(self.coalescer.do(key, get))
+
+    def request_api(self, method: str, path: str, *args, throw: bool | None = None, **kwargs):
+        if self.coalesce_cache is not None and method.upper() != "GET":
+            # Don't return results cached before a write
+            self.coalesce_cache.invalidate()
+
+        if "timeout" not in kwargs:
+            timeout = self._default_timeout(path)
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+
+        if self.rate_limiter is None and self.instrumentation is None:
+            return super().request_api(method, path, *args, throw=throw, **kwargs)
+
+        start_time = time.time()
+        start = time.perf_counter()
+        retries = 0
+        try:
+            while True:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                r = super().request_api(method, path, *args, throw=False, **kwargs)
+                if self.rate_limiter is None:
+                    break
+
+                self.rate_limiter.update(r.status_code, r.headers)
+                if r.status_code != 429 or retries >= self.rate_limit_retries:
+                    break
+                r.close()
+                retries += 1
+        except Exception as ex:
+            self._record_request(method, path, None, start=start, start_time=start_time, retries=retries, error=ex)
+            raise
+
+        self._record_request(method, path, r, start=start, start_time=start_time, retries=retries,
+                             stream=bool(kwargs.get("stream")))
+        if throw:
+            self.raise_for_response(r)
+        return r
+
+    def _default_timeout(self, path: str) -> Any:
+        """Return the timeout of a request to ``path`` that doesn't set one: from ``timeouts``, else ``None``."""
+        return endpoint_timeout(self.timeouts, path) if self.timeouts else None
+
+    def _record_request(self, method: str, path: str, r: Response | None, *,
+                        start: float,
+                        start_time: float,
+                        retries: int,
+                        error: BaseException | None = None,
+                        stream=False):
+        """Send a `RequestEvent` to the instrumentation, if any. ``r`` is None if the request failed with ``error``."""
+        if self.instrumentation is None:
+            return
+
+        if r is None:
+            self.instrumentation.on_request(RequestEvent(
+                method.upper(), normalize_endpoint(path), path, None, time.perf_counter() - start,
+                retries=retries, error=error, start_time=start_time,
+            ))
+            return
+
+        # Don't read the body of streamed responses to measure them
+        content_length = r.headers.get("Content-Length")
+        if content_length is not None:
+            response_bytes: int | None = int(content_length)
+        else:
+            response_bytes = None if stream else len(r.content)
+        body = r.request.body
+        self.instrumentation.on_request(RequestEvent(
+            method.upper(), normalize_endpoint(path), path, r.status_code, time.perf_counter() - start,
+            request_bytes=len(body) if isinstance(body, (bytes, str)) else 0,
+            response_bytes=response_bytes,
+            retries=retries,
+            start_time=start_time,
+        ))
+
+    def _get_paginated(self, endpoint: str, params: dict[str, Any] | None = None, *,
+                       model: Any = None,
+                       limit: int | None = None,
+                       stop_when: Callable[[JSONDict], bool] | None = None,
+                       **kwargs) -> Iterator[Any]:
+        """
+        Yield all the records of a paginated endpoint, from the cache if it's enabled for this endpoint.
+
+        Use ``limit`` or ``stop_when`` to stop early: no further page is requested once they stop the iteration. For
+        example, to get the tickets updated in the last hour, in two requests instead of fetching all the tickets:
+
+            since = (datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+            client.get_tickets(sort="-updated_at", stop_when=lambda ticket: ticket["updated_at"] < since)
+
+        :param endpoint:
+        :param params:
+        :param model: optional model class from `trengo.models` to decode the records into.
+        :param limit: maximum number of records to yield.
+        :param stop_when: function called with each record, as a dict; stop before the first record for which it
+          returns True.
+        :param kwargs: keyword arguments passed to ``_fetch_paginated``, e.g. ``start_page`` or ``max_pages``.
+        """
+        records: Iterator[JSONDict]
+        if self.reference_cache is not None and endpoint in self.cache_ttls:
+            # Shallow copies, so that modifying a record doesn't modify the cache
+            records = (dict(record) for record in self._get_cached_records(endpoint, params, **kwargs).records)
+        else:
+            records = self._fetch_paginated(endpoint, params, **kwargs)
+
+        if limit is not None or stop_when is not None:
+            records = take_records(records, limit=limit, stop_when=stop_when)
+        if model is not None:
+            return map_records(model.from_dict, records)
+        return records
+
+    def _fetch_paginated(self, endpoint: str, params: dict[str, Any] | None = None, **kwargs) -> Iterator[JSONDict]:
+        """
+        Yield all the records of a paginated endpoint.
+
+        :param endpoint:
+        :param params:
+        :param kwargs: keyword arguments passed to ``_fetch_pages``.
+        """
+        with closing(self._fetch_pages(endpoint, params, **kwargs)) as pages:
+            for _, records in pages:
+                yield from records
+
+    def _fetch_pages(self, endpoint: str, params: dict[str, Any] | None = None, *,
+                     start_page: int = 1,
+                     max_pages: int | None = None,
+                     prefetch: int = 0,
+                     stream=False,
+                     **kwargs) -> Generator[tuple[int, Iterable[JSONDict]], None, None]:
+        """
+        Yield ``(page number, records)`` tuples for all the pages of a paginated endpoint.
+
+        :param endpoint:
+        :param params:
+        :param start_page: first page to fetch.
+        :param max_pages: maximum number of pages to fetch.
+        :param prefetch: if positive, fetch up to this many pages ahead in background threads once the first page told
+          us how many pages there are. Pages are still yielded in order. Closing the generator cancels the pending
+          requests.
+        :param stream: if True, decode each page incrementally and yield each record as soon as it's decoded instead
+          of loading the whole page in memory. The records of each page must be consumed before getting the next page.
+          This can't be combined with ``prefetch``.
+        :param kwargs: keyword arguments passed to ``get_json_api``, or to ``get_api`` when streaming.
+        """
+        if params is None:
+            params = {}
+        if max_pages is not None and max_pages <= 0:
+            return
+        end_page = start_page + max_pages - 1 if max_pages is not None else None
+
+        def get_page(page_: int) -> JSONDict:
+            payload_ = self.get_json_api(endpoint, params={**params, "page": page_}, **kwargs)
+            if self.instrumentation is not None:
+                self.instrumentation.on_page(PageEvent(normalize_endpoint(endpoint), page_, len(payload_["data"])))
+            return payload_
+
+        if stream:
+            if prefetch > 0:
+                raise ValueError("stream and prefetch can't be used together")
+            yield from self._stream_pages(endpoint, params, start_page=start_page, end_page=end_page, **kwargs)
+            return
+
+        if prefetch <= 0:
+            page = start_page
+            last_page: int | None = None
+            while last_page is None or page <= last_page:
+                payload = get_page(page)
+                yield page, payload["data"]
+
+                last_page = get_last_page(payload["meta"], end_page)
+                page += 1
+            return
+
+        payload = get_page(start_page)
+        yield start_page, payload["data"]
+
+        pages = iter(range(start_page + 1, get_last_page(payload["meta"], end_page) + 1))
+        executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="trengo-prefetch")
+        futures: deque[tuple[int, Future[JSONDict]]] = deque()
+        try:
+            for page in pages:
+                futures.append((page, executor.submit(get_page, page)))
+                if len(futures) == prefetch:
+                    break
+
+            while futures:
+                page, future = futures.popleft()
+                payload = future.result()
+                # Keep the window full while the caller consumes this page
+                next_page = next(pages, None)
+                if next_page is not None:
+                    futures.append((next_page, executor.submit(get_page, next_page)))
+
+                yield page, payload["data"]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _stream_pages(self, endpoint: str, params: dict[str, Any], *,
+                      start_page: int = 1,
+                      end_page: int | None = None,
+                      chunk_size=65536,
+                      **kwargs) -> Iterator[tuple[int, Iterable[JSONDict]]]:
+        page = start_page
+        last_page: int | None = None
+        while last_page is None or page <= last_page:
+            with self.get_api(endpoint, params={**params, "page": page}, throw=True, stream=True, **kwargs) as r:
+                page_stream = PageStream(r.iter_content(chunk_size), encoding=r.encoding or "utf-8")
+                yield page, page_stream
+
+            if self.instrumentation is not None:
+                self.instrumentation.on_page(PageEvent(normalize_endpoint(endpoint), page, page_stream.count))
+            last_page = get_last_page(page_stream.meta, end_page)
+            page += 1
+
+    def _map_result(self, result: Any, func: Callable[[Any], Any]) -> Any:
+        return func(result)
+
+    # == Concurrent fetching ==
+
+    def get_messages_for_tickets(self, ticket_ids: Iterable[int], *,
+                                 max_workers=8,
+                                 ordered=False,
+                                 **kwargs) -> Iterator[tuple[int, Any]]:
+        """
+        Yield ``(ticket_id, message)`` tuples for all the messages of many tickets, fetched concurrently.
+
+        The messages of each ticket are always yielded in order. If ``ordered`` is False (the default), pages of
+        messages are yielded as soon as they arrive, so messages of different tickets are interleaved. If it's True,
+        tickets are yielded in the order of ``ticket_ids``, with all the messages of a ticket together.
+
+        If ``ordered`` is False, at most ``2 * max_workers`` pages are buffered at any time. If it's True, the messages
+        of up to ``max_workers`` tickets are buffered while waiting for the ticket to yield next, so memory use grows
+        with the number of messages of these tickets. In both cases, closing the generator stops the workers.
+
+        :param ticket_ids: IDs of the tickets. This can be a lazy iterable.
+        :param max_workers: maximum number of concurrent requests. Note that the connection pool keeps 10 connections
+          by default.
+        :param ordered: see above.
+        :param kwargs: keyword arguments passed to ``get_messages``, e.g. ``as_model`` or ``limit`` (which applies to
+          each ticket).
+        """
+        if ordered:
+            return self._get_messages_for_tickets_ordered(ticket_ids, max_workers=max_workers, **kwargs)
+        return self._get_messages_for_tickets_unordered(ticket_ids, max_workers=max_workers, **kwargs)
+
+    def _get_messages_for_tickets_ordered(self, ticket_ids: Iterable[int], *, max_workers: int,
+                                          **kwargs) -> Iterator[tuple[int, Any]]:
+        ticket_ids = iter(ticket_ids)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trengo-messages")
+        futures: deque[tuple[int, Future[list[JSONDict]]]] = deque()
+
+        def submit(ticket_id_: int):
+            futures.append((ticket_id_, executor.submit(lambda: list(self.get_messages(ticket_id_, **kwargs)))))
+
+        try:
+            for ticket_id in ticket_ids:
+                submit(ticket_id)
+                if len(futures) == max_workers:
+                    break
+
+            while futures:
+                ticket_id, future = futures.popleft()
+                messages = future.result()
+                next_ticket_id = next(ticket_ids, None)
+                if next_ticket_id is not None:
+                    submit(next_ticket_id)
+
+                for message in messages:
+                    yield ticket_id, message
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_messages_for_tickets_unordered(self, ticket_ids: Iterable[int], *, max_workers: int,
+                                            as_model=False,
+                                            limit: int | None = None,
+                                            stop_when: Callable[[JSONDict], bool] | None = None,
+                                            **kwargs) -> Iterator[tuple[int, Any]]:
+        ticket_ids = iter(ticket_ids)
+        model = Message if as_model else None
+
+        def ticket_pages(ticket_id_: int) -> Generator[list[Any], None, None]:
+            """Yield the pages of messages of a ticket, applying ``limit``, ``stop_when`` and ``as_model`` like
+            ``get_messages``."""
+            remaining = limit
+            stopped = False
+
+            def should_stop(record: JSONDict) -> bool:
+                nonlocal stopped
+                stopped = stop_when is not None and stop_when(record)
+                return stopped
+
+            if remaining is not None and remaining <= 0:
+                return
+            with closing(self._fetch_pages(f"/tickets/{escape_path(ticket_id_)}/messages", **kwargs)) as pages:
+                for _, records in pages:
+                    page = take_records(records, limit=remaining, stop_when=should_stop)
+                    messages = list(map_records(model.from_dict, page) if model is not None else page)
+                    yield messages
+                    if remaining is not None:
+                        remaining -= len(messages)
+                    if stopped or remaining == 0:
+                        return
+        ticket_ids_lock = threading.Lock()
+        # Each worker puts (ticket ID, page of messages) tuples, an exception if it failed, and None when it's done
+        results: queue.Queue[tuple[int, list[Any]] | BaseException | None] = queue.Queue(maxsize=2 * max_workers)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def work():
+            try:
+                while not stop.is_set():
+                    with ticket_ids_lock:
+                        ticket_id = next(ticket_ids, None)
+                    if ticket_id is None:
+                        return
+
+                    with closing(ticket_pages(ticket_id)) as pages:
+                        for messages in pages:
+                            if stop.is_set():
+                                return
+                            put((ticket_id, messages))
+            except BaseException as ex:
+                put(ex)
+            finally:
+                put(None)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trengo-messages")
+        try:
+            for _ in range(max_workers):
+                executor.submit(work)
+
+            running = max_workers
+            while running:
+                item = results.get()
+                if item is None:
+                    running -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    ticket_id, messages = item
+                    for message in messages:
+                        yield ticket_id, message
+        finally:
+            stop.set()
+            executor.shutdown(wait=False)
+
+    # == Reference data cache ==
+
+    def _get_cached_records(self, endpoint: str, params: dict[str, Any] | None = None, **kwargs) -> CachedRecords:
+        if self.reference_cache is None:
+            return CachedRecords(list(self._fetch_paginated(endpoint, params, **kwargs)))
+
+        key = (endpoint, json.dumps([params, kwargs], sort_keys=True, default=str))
+        records: CachedRecords | None = self.reference_cache.get(key)
+        if records is None:
+            records = CachedRecords(list(self._fetch_paginated(endpoint, params, **kwargs)))
+            self.reference_cache.set(key, records, ttl=self.cache_ttls[endpoint])
+        return records
+
+    def invalidate_cache(self, endpoint: str | None = None):
+        """
+        Invalidate the cached reference data, either for one endpoint (e.g. ``"/labels"``) or for all of them.
+        """
+        if self.reference_cache is None:
+            return
+        if endpoint is None:
+            self.reference_cache.invalidate()
+        else:
+            self.reference_cache.invalidate_where(lambda key: key[0] == endpoint)
+
+    # The lookup methods below use the cache when it's enabled, and index each cached list on the first lookup, so
+    # further lookups are O(1). Without cache, each call fetches the whole list.
+
+    def label_by_id(self, label_id: int) -> JSONDict | None:
+        """Get a label by its ID."""
+        return self._get_cached_records("/labels").get("id", label_id)
+
+    def label_by_name(self, name: str) -> JSONDict | None:
+        """Get a label by its name."""
+        return self._get_cached_records("/labels").get("name", name)
+
+    def team_by_id(self, team_id: int) -> JSONDict | None:
+        """Get a team by its ID."""
+        return self._get_cached_records("/teams").get("id", team_id)
+
+    def team_by_name(self, name: str) -> JSONDict | None:
+        """Get a team by its name."""
+        return self._get_cached_records("/teams").get("name", name)
+
+    def user_by_id(self, user_id: int) -> JSONDict | None:
+        """Get a user by its ID."""
+        return self._get_cached_records("/users").get("id", user_id)
+
+    def user_by_email(self, email: str) -> JSONDict | None:
+        """Get a user by its email. The comparison is case-insensitive."""
+        return self._get_cached_records("/users").get("email", email, case_insensitive=True)
+
+    def ticket_result_by_id(self, ticket_result_id: int) -> JSONDict | None:
+        """Get a ticket result by its ID."""
+        return self._get_cached_records("/ticket_results").get("id", ticket_result_id)
+
+    def contact_group_by_id(self, contact_group_id: int) -> JSONDict | None:
+        """Get a contact group by its ID."""
+        return self._get_cached_records("/contact_groups").get("id", contact_group_id)
+
+    def custom_field_by_id(self, custom_field_id: int) -> JSONDict | None:
+        """Get a custom field by its ID."""
+        return self._get_cached_records("/custom_fields").get("id", custom_field_id)
+
+    # == Bulk operations ==
+    # These run the calls concurrently and report the result of each ticket instead of stopping at the first error.
+    # Use a `RateLimiter` to keep them within the rate limit.
+
+    def bulk_close_tickets(self, ticket_ids: Iterable[int], *,
+                           ticket_result_id: int | None = None,
+                           max_workers=4,
+                           retries=2,
+                           **kwargs) -> BulkReport:
+        """Close many tickets. See `run_bulk` for the ``max_workers`` and ``retries`` arguments."""
+        return run_bulk(lambda ticket_id: self.close_ticket(ticket_id, ticket_result_id=ticket_result_id, **kwargs),
+                        ticket_ids, max_workers=max_workers, retries=retries)
+
+    def bulk_attach_label(self, ticket_ids: Iterable[int], label_id: int, *,
+                          max_workers=4,
+                          retries=2,
+                          **kwargs) -> BulkReport:
+        """Attach a label to many tickets."""
+        return run_bulk(lambda ticket_id: self.attach_ticket_label(ticket_id, label_id, **kwargs),
+                        ticket_ids, max_workers=max_workers, retries=retries)
+
+    def bulk_detach_label(self, ticket_ids: Iterable[int], label_id: int, *,
+                          max_workers=4,
+                          retries=2,
+                          **kwargs) -> BulkReport:
+        """Detach a label from many tickets."""
+        return run_bulk(lambda ticket_id: self.detach_ticket_label(ticket_id, label_id, **kwargs),
+                        ticket_ids, max_workers=max_workers, retries=retries)
+
+    def bulk_assign(self, ticket_ids: Iterable[int], *,
+                    user_id: int | None = None,
+                    team_id: int | None = None,
+                    note: str | None = None,
+                    max_workers=4,
+                    retries=2,
+                    **kwargs) -> BulkReport:
+        """Assign many tickets to a user or a team. Exactly one of ``user_id`` and ``team_id`` must be given."""
+        if (user_id is None) == (team_id is None):
+            raise ValueError("Exactly one of user_id and team_id must be given")
+
+        type_ = "user" if user_id is not None else "team"
+        return run_bulk(lambda ticket_id: self.assign_ticket(ticket_id, type_=type_, user_id=user_id, team_id=team_id,
+                                                             note=note, **kwargs),
+                        ticket_ids, max_workers=max_workers, retries=retries)
+
+    def bulk_mark_tickets_as_spam(self, ticket_ids: Iterable[int], *,
+                                  max_workers=4,
+                                  retries=2,
+                                  **kwargs) -> BulkReport:
+        """Mark many tickets as spam."""
+        return run_bulk(lambda ticket_id: self.mark_ticket_as_spam(ticket_id, **kwargs),
+                        ticket_ids, max_workers=max_workers, retries=retries)
+
+
+def take_records(records: Iterable[JSONDict], *,
+                 limit: int | None = None,
+                 stop_when: Callable[[JSONDict], bool] | None = None) -> Iterator[JSONDict]:
+    """
+    Yield the records until ``limit`` records were yielded or ``stop_when(record)`` is true. Like `map_records`, closing
+    the returned generator closes ``records`` if it's a generator, and so does stopping early.
+    """
+    try:
+        if limit is not None and limit <= 0:
+            return
+        count = 0
+        for record in records:
+            if stop_when is not None and stop_when(record):
+                return
+            yield record
+            count += 1
+            if count == limit:
+                return
+    finally:
+        close = getattr(records, "close", None)
+        if close is not None:
+            close()
+
+
+def get_last_page(meta: JSONDict, end_page: int | None = None) -> int:
+    """Return the last page to fetch, from the ``meta`` of a page and the optional last page requested."""
+    last_page: int = meta["last_page"]
+    return last_page if end_page is None else min(last_page, end_page)
+
+
+def get_token(token: str | None = None) -> str:
+    """Return the given token, or read it from the ``TRENGO_TOKEN`` environment variable if it's ``None``."""
+    if token is None:
+        token = os.environ.get("TRENGO_TOKEN")
+        if token is None:
+            raise RuntimeError("No Trengo token provided, and the environment variable TRENGO_TOKEN is not set")
+    return token
 
 
 def make_params(params: dict[str, Any]):
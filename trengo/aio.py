@@ -0,0 +1,264 @@
+"""
+Asynchronous Trengo client.
+
+This module requires ``httpx``: ``pip install pytrengo[async]``.
+"""
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable
+from typing import Any, Callable
+
+import httpx
+from api_session import JSONDict
+
+from trengo import DEFAULT_BASE_URL, BaseTrengo, get_last_page, get_token
+from trengo.instrumentation import Instrumentation, PageEvent, RequestEvent, normalize_endpoint
+from trengo.ratelimit import RateLimiter
+
+__all__ = ["AsyncTrengo"]
+
+
+class AsyncTrengo(BaseTrengo):
+    """
+    Asynchronous equivalent of `trengo.Trengo`.
+
+    It has the same methods, but they return awaitables and list methods return async iterators:
+
+        async with AsyncTrengo() as client:
+            ticket = await client.create_ticket(channel_id=..., contact_id=...)
+            async for message in client.get_messages(ticket["id"]):
+                ...
+
+    All requests share the connection pool of the underlying ``httpx.AsyncClient``.
+    """
+
+    def __init__(self, *, token: str | None = None, base_url=DEFAULT_BASE_URL,
+                 none_on_404=True,
+                 none_on_empty=False,
+                 rate_limiter: RateLimiter | None = None,
+                 rate_limit_retries=3,
+                 instrumentation: Instrumentation | None = None,
+                 **kwargs):
+        """
+        :param token: API token. If it's not given, it's read from the ``TRENGO_TOKEN`` environment variable.
+        :param base_url: Base URL of the API.
+        :param none_on_404: default for the argument of the same name in ``.get_json_api`` calls.
+        :param none_on_empty: default for the argument of the same name in ``.get_json_api`` calls.
+        :param rate_limiter: optional `RateLimiter` to throttle all the requests. See `Trengo`.
+        :param rate_limit_retries: number of times a request that got a 429 response is retried. See `Trengo`.
+        :param instrumentation: optional instrumentation called after each request and each page. See `Trengo`.
+        :param kwargs: keyword arguments passed to the ``httpx.AsyncClient`` constructor.
+        """
+        token = get_token(token)
+
+        self.base_url = base_url.rstrip("/")
+        self.none_on_404 = none_on_404
+        self.none_on_empty = none_on_empty
+        self.rate_limiter = rate_limiter
+        self.rate_limit_retries = rate_limit_retries
+        self.instrumentation = instrumentation
+        self.client = httpx.AsyncClient(**kwargs)
+        self.client.headers["Authorization"] = f"Bearer {token}"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying connection pool."""
+        await self.client.aclose()
+
+    # noinspection PyMethodMayBeStatic
+    def raise_for_response(self, response: httpx.Response):
+        """
+        Raise an exception if the response is an error. Like in `Trengo`, 4xx errors include the response body.
+        """
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as ex:
+            if response.status_code // 100 == 4:
+                raise httpx.HTTPStatusError(
+                    f"{ex}. Body: {response.text}",
+                    request=ex.request,
+                    response=response,
+                ) from ex.__cause__
+            raise
+
+    async def request_api(self, method: str, path: str, *, throw: bool | None = None, **kwargs) -> httpx.Response:
+        """
+        Send a request to the API.
+
+        :param method: HTTP method
+        :param path: API path. This must start with "/"
+        :param throw: if True, raise an exception if the response is an error.
+        :param kwargs: keyword arguments passed to ``httpx.AsyncClient.request()``
+        :return:
+        """
+        assert path.startswith("/")
+
+        params = kwargs.get("params")
+        if params:
+            # requests drops None params, while httpx sends them as empty strings
+            kwargs["params"] = {name: value for name, value in params.items() if value is not None}
+
+        start_time = time.time()
+        start = time.perf_counter()
+        retries = 0
+        try:
+            while True:
+                if self.rate_limiter is not None:
+                    await asyncio.sleep(self.rate_limiter.reserve())
+
+                r = await self.client.request(method, self.base_url + path, **kwargs)
+                if self.rate_limiter is None:
+                    break
+
+                self.rate_limiter.update(r.status_code, r.headers)
+                if r.status_code != 429 or retries >= self.rate_limit_retries:
+                    break
+                retries += 1
+        except Exception as ex:
+            if self.instrumentation is not None:
+                self.instrumentation.on_request(RequestEvent(
+                    method.upper(), normalize_endpoint(path), path, None, time.perf_counter() - start,
+                    retries=retries, error=ex, start_time=start_time,
+                ))
+            raise
+
+        if self.instrumentation is not None:
+            self.instrumentation.on_request(RequestEvent(
+                method.upper(), normalize_endpoint(path), path, r.status_code, time.perf_counter() - start,
+                request_bytes=int(r.request.headers.get("Content-Length", 0)),
+                response_bytes=r.num_bytes_downloaded,
+                retries=retries,
+                start_time=start_time,
+            ))
+
+        if throw:
+            self.raise_for_response(r)
+        return r
+
+    async def get_json_api(self, path: str, params: dict | None = None, *,
+                           throw=True,
+                           none_on_404: bool | None = None,
+                           none_on_empty: bool | None = None,
+                           **kwargs) -> Any:
+        """
+        GET a JSON endpoint. See ``APISession.get_json_api`` for the meaning of the arguments.
+        """
+        none_on_404 = none_on_404 is True or (none_on_404 is None and self.none_on_404)
+        none_on_empty = none_on_empty is True or (none_on_empty is None and self.none_on_empty)
+
+        r = await self.request_api("GET", path, params=params, throw=False if none_on_404 else throw, **kwargs)
+        if r.status_code == 404 and none_on_404:
+            return None
+        if throw:
+            self.raise_for_response(r)
+
+        if none_on_empty and not r.text:
+            return None
+
+        return r.json()
+
+    async def post_json_api(self, path: str, *, throw=True, **kwargs) -> Any:
+        """POST to a JSON endpoint."""
+        return (await self.request_api("POST", path, throw=throw, **kwargs)).json()
+
+    async def put_json_api(self, path: str, *, throw=True, **kwargs) -> Any:
+        """PUT to a JSON endpoint."""
+        return (await self.request_api("PUT", path, throw=throw, **kwargs)).json()
+
+    async def delete_json_api(self, path: str, *, throw=True, **kwargs) -> Any:
+        """DELETE a JSON endpoint."""
+        return (await self.request_api("DELETE", path, throw=throw, **kwargs)).json()
+
+    async def _get_paginated(self, endpoint: str, params: dict[str, Any] | None = None, *,
+                             model: Any = None,
+                             limit: int | None = None,
+                             stop_when: Callable[[JSONDict], bool] | None = None,
+                             **kwargs) -> AsyncIterator[Any]:
+        """
+        Yield all the records of a paginated endpoint, optionally decoded into a model from `trengo.models`. See
+        `Trengo._get_paginated` for ``limit`` and ``stop_when``.
+        """
+        if limit is not None and limit <= 0:
+            return
+
+        records = self._fetch_paginated(endpoint, params, **kwargs)
+        count = 0
+        try:
+            async for record in records:
+                if stop_when is not None and stop_when(record):
+                    return
+                yield record if model is None else model.from_dict(record)
+                count += 1
+                if count == limit:
+                    return
+        finally:
+            await records.aclose()
+
+    async def _fetch_paginated(self, endpoint: str, params: dict[str, Any] | None = None, *,
+                               start_page: int = 1,
+                               max_pages: int | None = None,
+                               prefetch: int = 0,
+                               **kwargs) -> AsyncGenerator[JSONDict, None]:
+        """
+        Yield all the records of a paginated endpoint. See `Trengo._fetch_pages`; here pages are prefetched in
+        concurrent tasks rather than threads.
+        """
+        if params is None:
+            params = {}
+        if max_pages is not None and max_pages <= 0:
+            return
+        end_page = start_page + max_pages - 1 if max_pages is not None else None
+
+        async def get_page(page_: int) -> JSONDict:
+            payload_ = await self.get_json_api(endpoint, params={**params, "page": page_}, **kwargs)
+            if self.instrumentation is not None:
+                self.instrumentation.on_page(PageEvent(normalize_endpoint(endpoint), page_, len(payload_["data"])))
+            return payload_
+
+        if prefetch <= 0:
+            page = start_page
+            last_page: int | None = None
+            while last_page is None or page <= last_page:
+                payload = await get_page(page)
+                for record in payload["data"]:
+                    yield record
+
+                last_page = get_last_page(payload["meta"], end_page)
+                page += 1
+            return
+
+        payload = await get_page(start_page)
+        for record in payload["data"]:
+            yield record
+
+        pages = iter(range(start_page + 1, get_last_page(payload["meta"], end_page) + 1))
+        tasks: deque[asyncio.Task[JSONDict]] = deque()
+        try:
+            for page in pages:
+                tasks.append(asyncio.ensure_future(get_page(page)))
+                if len(tasks) == prefetch:
+                    break
+
+            while tasks:
+                payload = await tasks.popleft()
+                next_page = next(pages, None)
+                if next_page is not None:
+                    tasks.append(asyncio.ensure_future(get_page(next_page)))
+
+                for record in payload["data"]:
+                    yield record
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _map_result(self, result: Awaitable[Any], func: Callable[[Any], Any]) -> Awaitable[Any]:
+        async def wrapper():
+            return func(await result)
+
+        return wrapper()
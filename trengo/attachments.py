@@ -0,0 +1,168 @@
+"""
+Streaming downloads of message attachments.
+
+    downloader = AttachmentDownloader(trengo_client, "media/")
+    report = downloader.download_ticket(ticket_id)
+
+Files are written in chunks, so memory use doesn't depend on their size, and several files are downloaded in parallel
+over the connection pool of the client. Files that are already present are skipped.
+"""
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import IO, Iterable
+from urllib.parse import unquote, urlsplit
+
+from api_session import JSONDict
+
+from trengo import Trengo
+from trengo.bulk import BulkReport, run_bulk
+
+__all__ = ["AttachmentDownloader", "download_attachment", "attachment_url", "attachment_filename"]
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^\w.\- ]+")
+
+
+def attachment_url(attachment: JSONDict) -> str:
+    """Return the URL of an attachment from a message."""
+    return attachment.get("full_url") or attachment["url"]
+
+
+def attachment_filename(attachment: JSONDict) -> str:
+    """Return a safe filename for an attachment from a message."""
+    name = attachment.get("client_name") or attachment.get("name") or \
+        unquote(urlsplit(attachment_url(attachment)).path)
+    name = os.path.basename(name.replace("\\", "/"))
+    return _UNSAFE_FILENAME_RE.sub("_", name).strip(". ") or "attachment"
+
+
+def _sha256(path: Path, chunk_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_attachment(client: Trengo, url: str, destination: str | os.PathLike | IO[bytes], *,
+                        size: int | None = None,
+                        sha256: str | None = None,
+                        chunk_size=65536,
+                        timeout: float | tuple[float, float] | None = 60) -> int:
+    """
+    Download a file in chunks.
+
+    When the destination is a path and the file already exists, it's skipped if it has the expected ``size`` and
+    ``sha256`` hash; if neither is given, an existing file is always skipped. Files are written under a temporary name
+    and renamed once complete, so an interrupted download never leaves a partial file.
+
+    The API token is only sent if the URL is on the same host as the API.
+
+    :param client: Trengo client whose session is used.
+    :param url: URL of the file.
+    :param destination: path or binary file-like object to write to.
+    :param size: expected size of the file, in bytes, if known.
+    :param sha256: expected SHA-256 hash of the file, as a hex string, if known.
+    :param chunk_size: size of the chunks, in bytes.
+    :param timeout: timeout of the request, passed to ``requests``.
+    :return: the number of bytes downloaded: 0 if the file was skipped.
+    """
+    path: Path | None = None
+    if isinstance(destination, (str, os.PathLike)):
+        path = Path(destination)
+        if path.exists() and (size is None or path.stat().st_size == size) and \
+                (sha256 is None or _sha256(path, chunk_size) == sha256):
+            return 0
+
+    headers: dict[str, str | None] = {}
+    if urlsplit(url).netloc != urlsplit(client.base_url).netloc:
+        # requests drops headers whose value is None, so the session's Authorization header isn't sent
+        headers["Authorization"] = None
+
+    with client.get(url, headers=headers, stream=True, timeout=timeout) as r:  # type: ignore[arg-type]
+        client.raise_for_response(r)
+
+        if path is None:
+            return _write_chunks(r.iter_content(chunk_size), destination)  # type: ignore[arg-type]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".part")
+        try:
+            with open(tmp_path, "wb") as f:
+                written = _write_chunks(r.iter_content(chunk_size), f)
+            if sha256 is not None and _sha256(tmp_path, chunk_size) != sha256:
+                raise ValueError(f"SHA-256 mismatch for {url}")
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    return written
+
+
+def _write_chunks(chunks: Iterable[bytes], file: IO[bytes]) -> int:
+    written = 0
+    for chunk in chunks:
+        file.write(chunk)
+        written += len(chunk)
+    return written
+
+
+class AttachmentDownloader:
+    """
+    Download the attachments of messages in a directory, in parallel.
+
+    Attachments are saved as ``<directory>/<ticket ID>/<message ID>-<filename>``.
+    """
+
+    def __init__(self, client: Trengo, directory: str | os.PathLike, *,
+                 max_workers=4,
+                 retries=2,
+                 chunk_size=65536):
+        """
+        :param client: Trengo client.
+        :param directory: output directory.
+        :param max_workers: maximum number of parallel downloads. Note that the connection pool of the client keeps 10
+          connections by default.
+        :param retries: see `run_bulk`.
+        :param chunk_size: size of the chunks, in bytes.
+        """
+        self.client = client
+        self.directory = Path(directory)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.chunk_size = chunk_size
+
+    def path(self, message: JSONDict, attachment: JSONDict) -> Path:
+        """Return the path of an attachment."""
+        ticket_id = message.get("ticket_id")
+        directory = self.directory / str(ticket_id) if ticket_id is not None else self.directory
+        return directory / f"{message['id']}-{attachment_filename(attachment)}"
+
+    def download_messages(self, messages: Iterable[JSONDict]) -> BulkReport:
+        """
+        Download the attachments of messages.
+
+        :param messages: messages, as returned by `Trengo.get_messages`.
+        :return: a `BulkReport` whose keys are the paths of the files and whose results are the number of bytes
+          downloaded: 0 for files that were already present.
+        """
+        downloads: dict[str, tuple[str, int | None]] = {}
+        for message in messages:
+            for attachment in message.get("attachments") or ():
+                size = attachment.get("size")
+                downloads[str(self.path(message, attachment))] = (
+                    attachment_url(attachment),
+                    size if isinstance(size, int) else None,
+                )
+
+        def download(path: str) -> int:
+            url, size = downloads[path]
+            return download_attachment(self.client, url, path, size=size, chunk_size=self.chunk_size)
+
+        return run_bulk(download, downloads, max_workers=self.max_workers, retries=self.retries)
+
+    def download_ticket(self, ticket_id: int) -> BulkReport:
+        """Download the attachments of all the messages of a ticket. See `download_messages`."""
+        return self.download_messages({**message, "ticket_id": ticket_id}
+                                      for message in self.client.get_messages(ticket_id))
@@ -0,0 +1,84 @@
+"""
+Helpers to run the same API call on many items concurrently.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable
+
+import requests
+
+__all__ = ["BulkReport", "run_bulk", "is_transient_error"]
+
+
+@dataclass
+class BulkReport:
+    """
+    Result of a bulk operation.
+    """
+    # Result of each successful call, by item
+    succeeded: dict[Hashable, Any] = field(default_factory=dict)
+    # Exception raised by the last attempt of each failed call, by item
+    failed: dict[Hashable, BaseException] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True if no call failed."""
+        return not self.failed
+
+    def __len__(self):
+        return len(self.succeeded) + len(self.failed)
+
+
+def is_transient_error(exception: BaseException) -> bool:
+    """
+    Test if a request failed for a reason that may go away if we retry it: connection errors, timeouts, 429 and 5xx
+    responses.
+    """
+    if isinstance(exception, (requests.ConnectionError, requests.Timeout)):
+        return True
+
+    if isinstance(exception, requests.HTTPError) and exception.response is not None:
+        status_code = exception.response.status_code
+        return status_code == 429 or status_code >= 500
+
+    return False
+
+
+def run_bulk(func: Callable[[Any], Any], items: Iterable[Hashable], *,
+             max_workers=4,
+             retries=2,
+             backoff=1.0) -> BulkReport:
+    """
+    Call ``func(item)`` for each item, concurrently, and report the result of each call. A failing call doesn't stop
+    the other ones.
+
+    :param func: function to call on each item.
+    :param items: items. They are used as keys in the report.
+    :param max_workers: maximum number of concurrent calls.
+    :param retries: maximum number of times a call that failed with a transient error (see `is_transient_error`) is
+      retried.
+    :param backoff: delay, in seconds, before the first retry. It's doubled on each subsequent retry.
+    :return: a `BulkReport`.
+    """
+    def call(item):
+        attempt = 0
+        while True:
+            try:
+                return func(item)
+            except Exception as ex:
+                if attempt >= retries or not is_transient_error(ex):
+                    raise
+                time.sleep(backoff * 2 ** attempt)
+                attempt += 1
+
+    report = BulkReport()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trengo-bulk") as executor:
+        futures = {item: executor.submit(call, item) for item in items}
+        for item, future in futures.items():
+            try:
+                report.succeeded[item] = future.result()
+            except Exception as ex:
+                report.failed[item] = ex
+
+    return report
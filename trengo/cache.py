@@ -0,0 +1,143 @@
+"""
+In-memory caching helpers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from api_session import JSONDict
+
+__all__ = ["TTLCache", "CachedRecords", "SingleFlight"]
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after some time.
+    """
+
+    def __init__(self, maxsize=128, ttl: float = 300):
+        """
+        :param maxsize: maximum number of entries. The least recently used entries are evicted first.
+        :param ttl: default time-to-live of the entries, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for ``key`` if it's in the cache and hasn't expired, ``default`` otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """Set the value for ``key``. ``ttl`` overrides the default time-to-live of the cache."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = _MISSING):
+        """Remove ``key`` from the cache, or clear the whole cache if no key is given."""
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Remove all the entries whose key matches the predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+
+class CachedRecords:
+    """
+    List of records with lazily-built indexes.
+    """
+
+    def __init__(self, records: list[JSONDict]):
+        self.records = records
+        self._indexes: dict[tuple[str, bool], dict[Any, JSONDict]] = {}
+
+    def index(self, field: str, *, case_insensitive=False) -> dict[Any, JSONDict]:
+        """
+        Return a dict of the records by the value of one of their fields. It's built on the first call, so each lookup
+        is O(1). Records that don't have the field are ignored.
+        """
+        key = (field, case_insensitive)
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for record in self.records:
+                value = record.get(field)
+                if value is None:
+                    continue
+                if case_insensitive and isinstance(value, str):
+                    value = value.casefold()
+                index.setdefault(value, record)
+            self._indexes[key] = index
+        return index
+
+    def get(self, field: str, value: Any, *, case_insensitive=False) -> JSONDict | None:
+        """Return a shallow copy of the first record with ``field`` equal to ``value``, if any."""
+        if case_insensitive and isinstance(value, str):
+            value = value.casefold()
+        record = self.index(field, case_insensitive=case_insensitive).get(value)
+        return dict(record) if record is not None else None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls: while a call for a key is running, other calls for the same key wait for its result
+    instead of running again.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Call ``func()``, or wait for the result of the running call for ``key``, if any. Exceptions are propagated to
+        all the waiting callers.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = Future()
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = func()
+        except BaseException as ex:
+            call.set_exception(ex)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,142 @@
+"""
+Resolution of contact identifiers (email addresses, phone numbers, ...) to contacts, with a cache.
+"""
+import threading
+from typing import Iterable, Mapping
+
+from api_session import JSONDict
+
+from trengo import Trengo
+from trengo.bulk import BulkReport, run_bulk
+from trengo.cache import SingleFlight, TTLCache
+
+__all__ = ["ContactResolver", "normalize_identifier"]
+
+
+def normalize_identifier(identifier: str) -> str:
+    """Normalize an identifier so that e.g. ``" Jane@Example.com"`` and ``"jane@example.com"`` are the same."""
+    return identifier.strip().casefold()
+
+
+class ContactResolver:
+    """
+    Resolve identifiers to contacts with a bounded in-memory cache, so that most resolutions don't cost any request:
+
+        resolver = ContactResolver(trengo_client)
+        resolver.warm()  # optional: load all the contacts
+        contact = resolver.resolve(channel_id, "jane@example.com")
+
+    On a cache miss, the contact is created with `Trengo.create_contact`, which returns the existing contact if there is
+    one. Concurrent resolutions of the same identifier share a single request.
+
+    Contacts are cached by identifier, regardless of the channel.
+    """
+
+    def __init__(self, client: Trengo, *, maxsize=10_000, ttl: float | None = None):
+        """
+        :param client: Trengo client.
+        :param maxsize: maximum number of cached contacts. The least recently used ones are evicted first.
+        :param ttl: time-to-live of the cached contacts, in seconds. By default, they don't expire.
+        """
+        self.client = client
+        self.cache = TTLCache(maxsize=maxsize, ttl=float("inf") if ttl is None else ttl)
+        # Counters: resolutions served by the cache, and those that needed a request
+        self.hits = 0
+        self.misses = 0
+
+        self._single_flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def add(self, contact: JSONDict):
+        """Add a contact to the cache."""
+        identifier = contact.get("identifier")
+        if identifier:
+            self.cache.set(normalize_identifier(identifier), contact)
+
+    def warm(self, **kwargs) -> int:
+        """
+        Fill the cache with the contacts returned by `Trengo.get_contacts`. Only the ``maxsize`` last ones are kept.
+
+        :param kwargs: keyword arguments passed to ``get_contacts``, e.g. ``term`` or ``prefetch``.
+        :return: the number of contacts loaded.
+        """
+        count = 0
+        for contact in self.client.get_contacts(**kwargs):
+            self.add(contact)
+            count += 1
+        return count
+
+    def get(self, identifier: str) -> JSONDict | None:
+        """Return the cached contact for this identifier, if any. This never sends a request."""
+        return self.cache.get(normalize_identifier(identifier))
+
+    def resolve(self, channel_id: int, identifier: str, *, full_name: str | None = None) -> JSONDict:
+        """
+        Return the contact for this identifier, creating it in the channel if it's not cached.
+
+        :param channel_id: channel to create the contact in, if needed.
+        :param identifier: email address, phone number, etc. of the contact.
+        :param full_name: name of the contact, if it's created.
+        """
+        key = normalize_identifier(identifier)
+        contact = self.cache.get(key)
+        if contact is not None:
+            with self._lock:
+                self.hits += 1
+            return contact
+
+        def create() -> JSONDict:
+            # Another thread may have created it while we were waiting
+            contact_ = self.cache.get(key)
+            if contact_ is None:
+                with self._lock:
+                    self.misses += 1
+                contact_ = self.client.create_contact(channel_id, identifier, full_name=full_name)
+                self.cache.set(key, contact_)
+            return contact_
+
+        return self._single_flight.do(key, create)
+
+    def resolve_id(self, channel_id: int, identifier: str, *, full_name: str | None = None) -> int:
+        """Same as `resolve`, but return only the ID of the contact."""
+        return self.resolve(channel_id, identifier, full_name=full_name)["id"]
+
+    def invalidate(self, identifier: str | None = None):
+        """Remove a contact from the cache, or clear the whole cache if no identifier is given."""
+        if identifier is None:
+            self.cache.invalidate()
+        else:
+            self.cache.invalidate(normalize_identifier(identifier))
+
+    def upsert_contacts(self, channel_id: int, contacts: Iterable[str] | Mapping[str, str | None], *,
+                        max_workers=4,
+                        retries=2) -> BulkReport:
+        """
+        Resolve many identifiers at once: contacts that are cached cost nothing, and only the missing ones are created,
+        concurrently.
+
+        :param channel_id: channel to create the missing contacts in.
+        :param contacts: identifiers, or a dict of names by identifier.
+        :param max_workers: maximum number of concurrent requests.
+        :param retries: see `run_bulk`.
+        :return: a `BulkReport` whose keys are the identifiers and whose results are the contacts.
+        """
+        names = contacts if isinstance(contacts, Mapping) else dict.fromkeys(contacts)
+
+        report = BulkReport()
+        missing = []
+        for identifier in names:
+            contact = self.get(identifier)
+            if contact is None:
+                missing.append(identifier)
+            else:
+                report.succeeded[identifier] = contact
+        with self._lock:
+            self.hits += len(report.succeeded)
+
+        if missing:
+            created = run_bulk(lambda identifier: self.resolve(channel_id, identifier, full_name=names[identifier]),
+                               missing, max_workers=max_workers, retries=retries)
+            report.succeeded.update(created.succeeded)
+            report.failed.update(created.failed)
+        return report
@@ -0,0 +1,368 @@
+"""
+Resumable, bounded-memory export of tickets, messages and contacts to NDJSON, CSV or Parquet files.
+
+Command-line usage (the token is read from the ``TRENGO_TOKEN`` environment variable):
+
+    python -m trengo.export OUTPUT_DIRECTORY [--format {ndjson,csv,parquet}] [--no-messages] [--no-contacts]
+
+Records are written in batches, and a checkpoint is saved after each batch: if the export is interrupted, running it
+again with the same output directory resumes it from the last checkpoint. Parquet files require ``pyarrow``.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Iterable
+
+from api_session import JSONDict
+
+from trengo import Trengo, make_params
+
+__all__ = ["Exporter", "FORMATS", "main"]
+
+FORMATS = ("ndjson", "csv", "parquet")
+
+CHECKPOINT_FILENAME = "checkpoint.json"
+
+logger = logging.getLogger(__name__)
+
+
+def _flatten(record: JSONDict) -> JSONDict:
+    """Serialize the nested values of a record as JSON, for tabular formats."""
+    return {key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in record.items()}
+
+
+class _NDJSONWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, records: list[JSONDict]):
+        self.file.writelines(json.dumps(record) + "\n" for record in records)
+
+    def checkpoint(self) -> int:
+        """Make the written records durable and return the state to restore on resume."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def restore(self, state: int):
+        """Drop what was written after the checkpoint."""
+        self.file.truncate(state)
+        self.file.seek(state)
+
+    def close(self):
+        self.file.close()
+
+
+class _CSVWriter(_NDJSONWriter):
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.fieldnames: list[str] | None = None
+        if path.stat().st_size:
+            with open(path, encoding="utf-8", newline="") as f:
+                self.fieldnames = next(csv.reader(f))
+        self.writer: csv.DictWriter | None = None
+
+    def write(self, records: list[JSONDict]):
+        if not records:
+            return
+        if self.writer is None:
+            if self.fieldnames is None:
+                # The columns are those of the first batch; fields that appear later are ignored
+                self.fieldnames = list(dict.fromkeys(key for record in records for key in record))
+                csv.writer(self.file, lineterminator="\n").writerow(self.fieldnames)
+            self.writer = csv.DictWriter(self.file, self.fieldnames, extrasaction="ignore", lineterminator="\n")
+        self.writer.writerows(_flatten(record) for record in records)
+
+    def restore(self, state: int):
+        super().restore(state)
+        if state == 0:
+            self.fieldnames = None
+            self.writer = None
+
+
+class _BufferedWriter:
+    """Buffer the records written to another writer, and pass them on by batches of at least ``batch_size`` records,
+    or at each checkpoint."""
+
+    def __init__(self, writer, batch_size: int):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.buffer: list[JSONDict] = []
+
+    def write(self, records: list[JSONDict]):
+        self.buffer.extend(records)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.writer.write(self.buffer)
+        self.buffer = []
+
+    def checkpoint(self) -> int:
+        self.flush()
+        return self.writer.checkpoint()
+
+    def restore(self, state: int):
+        self.buffer = []
+        self.writer.restore(state)
+
+    def close(self):
+        # Records buffered since the last checkpoint are dropped: they're exported again on resume
+        self.buffer = []
+        self.writer.close()
+
+
+class _ParquetWriter:
+    """
+    Write each batch in a new ``<name>-<number>.parquet`` file.
+
+    All the files have the schema of the first one, so that they can be read as one dataset: columns that are null in
+    the whole first batch are typed as strings, and fields that only appear in later batches are ignored.
+    """
+
+    def __init__(self, directory: Path, name: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow: pip install 'pytrengo[parquet]'")
+
+        self.directory = directory
+        self.name = name
+        self.parts = len(list(directory.glob(f"{name}-*.parquet")))
+        self.schema: Any = None
+        if self.parts:
+            import pyarrow.parquet
+
+            self.schema = pyarrow.parquet.read_schema(self._part_path(0))
+
+    def _part_path(self, part: int) -> Path:
+        return self.directory / f"{self.name}-{part:06d}.parquet"
+
+    def write(self, records: list[JSONDict]):
+        import pyarrow
+        import pyarrow.parquet
+
+        if not records:
+            return
+        rows = [_flatten(record) for record in records]
+        if self.schema is None:
+            schema = pyarrow.Table.from_pylist(rows).schema
+            self.schema = pyarrow.schema([field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type)
+                                          else field for field in schema])
+
+        # Serialize the values of string columns that have another type, e.g. in a column that was null at first
+        string_fields = [field.name for field in self.schema if pyarrow.types.is_string(field.type)]
+        for row in rows:
+            for name in string_fields:
+                value = row.get(name)
+                if value is not None and not isinstance(value, str):
+                    row[name] = json.dumps(value)
+
+        table = pyarrow.Table.from_pylist(rows, schema=self.schema)
+        pyarrow.parquet.write_table(table, self._part_path(self.parts))
+        self.parts += 1
+
+    def checkpoint(self) -> int:
+        return self.parts
+
+    def restore(self, state: int):
+        while self.parts > state:
+            self.parts -= 1
+            self._part_path(self.parts).unlink(missing_ok=True)
+        if self.parts == 0:
+            self.schema = None
+
+    def close(self):
+        pass
+
+
+class Exporter:
+    """
+    Export tickets with their messages, and contacts, in a directory:
+
+        exporter = Exporter(Trengo(), "export/", format="csv")
+        exporter.export_tickets()
+        exporter.export_contacts()
+
+    This creates one file per entity (``tickets``, ``messages``, ``contacts``), or one file per batch for Parquet, as
+    well as a ``checkpoint.json`` file. Memory use depends on the batch size, not on the size of the export.
+
+    Pages are fetched in the default order of the API, in which new tickets come first, so the pages shift when tickets
+    are created or removed while an export is interrupted. The checkpoint records the ID of the last exported record,
+    and the export resumes right after it, wherever it moved: tickets created in the meantime may be exported twice,
+    but none is skipped. If that record itself was removed, the export resumes from its former position and logs a
+    warning, since records may then be skipped.
+    """
+
+    def __init__(self, client: Trengo, directory: str | os.PathLike, *,
+                 format="ndjson",
+                 batch_size=500,
+                 prefetch=0):
+        """
+        :param client: Trengo client.
+        :param directory: output directory. It's created if needed.
+        :param format: one of ``FORMATS``.
+        :param batch_size: number of records to buffer before writing them and saving a checkpoint.
+        :param prefetch: number of pages to prefetch. See `Trengo._fetch_pages`.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; expected one of {', '.join(FORMATS)}")
+
+        self.client = client
+        self.directory = Path(directory)
+        self.format = format
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_path = self.directory / CHECKPOINT_FILENAME
+        self.state: dict[str, Any] = {}
+        if self.checkpoint_path.exists():
+            self.state = json.loads(self.checkpoint_path.read_text())
+
+    def _save_state(self):
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.state))
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _open_writer(self, name: str):
+        writer: Any
+        if self.format == "parquet":
+            writer = _ParquetWriter(self.directory, name)
+        else:
+            path = self.directory / f"{name}.{self.format}"
+            path.touch()
+            writer = _CSVWriter(path) if self.format == "csv" else _NDJSONWriter(path)
+
+        # Drop what was written after the last checkpoint
+        writer.restore(self.state.get("files", {}).get(name, 0))
+        return writer
+
+    def export_tickets(self, *, messages=True, **params) -> int:
+        """
+        Export the tickets, and their messages unless ``messages`` is False.
+
+        :param messages: if True (the default), also export the messages of each ticket.
+        :param params: filters, as accepted by the API (e.g. ``status="CLOSED"``).
+        :return: the number of tickets exported by this call.
+        """
+        if not messages:
+            return self._export("tickets", "/tickets", params)
+
+        # Messages of consecutive tickets are written together, by batches of batch_size
+        messages_writer = _BufferedWriter(self._open_writer("messages"), self.batch_size)
+        try:
+            def export_messages(ticket: JSONDict):
+                for message in self.client.get_messages(ticket["id"]):
+                    messages_writer.write([message])
+
+            return self._export("tickets", "/tickets", params, on_record=export_messages,
+                                other_writers={"messages": messages_writer})
+        finally:
+            messages_writer.close()
+
+    def export_contacts(self, **params) -> int:
+        """
+        Export the contacts.
+
+        :param params: filters, as accepted by the API (e.g. ``term="..."``).
+        :return: the number of contacts exported by this call.
+        """
+        return self._export("contacts", "/contacts", params)
+
+    def _export(self, name: str, endpoint: str, params: dict[str, Any], *,
+                on_record=None,
+                other_writers: dict[str, Any] | None = None) -> int:
+        position = self.state.get(name, {"page": 1, "index": 0})
+        if position.get("done"):
+            return 0
+
+        writers = {name: self._open_writer(name), **(other_writers or {})}
+        batch: list[JSONDict] = []
+        count = 0
+
+        def checkpoint(done=False):
+            writers[name].write(batch)
+            batch.clear()
+            self.state.setdefault("files", {}).update({key: writer.checkpoint() for key, writer in writers.items()})
+            self.state[name] = {**position, "done": done}
+            self._save_state()
+
+        params = make_params(params)
+        start_page, start_index = self._resume_position(endpoint, params, position)
+        try:
+            pages: Iterable[tuple[int, Iterable[JSONDict]]] = self.client._fetch_pages(
+                endpoint, params, start_page=start_page, prefetch=self.prefetch)
+            # closing() stops the prefetching threads if the export fails
+            with closing(pages):  # type: ignore[type-var]
+                for page, records in pages:
+                    for index, record in enumerate(records):
+                        # Skip what was already exported in the page of the checkpoint
+                        if page == start_page and index < start_index:
+                            continue
+
+                        if on_record is not None:
+                            on_record(record)
+                        batch.append(record)
+                        position = {"page": page, "index": index + 1, "last_id": record.get("id")}
+                        count += 1
+
+                        if len(batch) >= self.batch_size:
+                            checkpoint()
+
+            checkpoint(done=True)
+        finally:
+            writers[name].close()
+
+        return count
+
+    def _resume_position(self, endpoint: str, params: dict[str, Any], position: dict[str, Any]) -> tuple[int, int]:
+        """
+        Return the page and the index in the page of the record that follows the last exported one.
+
+        Creations move that record to a later page, and removals to an earlier one: look for it in the page of the
+        checkpoint and the next one, then in the previous pages.
+        """
+        page, index, last_id = position["page"], position["index"], position.get("last_id")
+        if last_id is None:
+            return page, index
+
+        for candidate in [page, page + 1, *range(page - 1, 0, -1)]:
+            with closing(self.client._fetch_pages(endpoint, params, start_page=candidate, max_pages=1)) as pages:
+                ids = [record.get("id") for _, records in pages for record in records]
+            if last_id in ids:
+                return candidate, ids.index(last_id) + 1
+
+        logger.warning("The last exported record (ID %s) was not found: resuming from page %d, record %d; records may"
+                       " be skipped", last_id, page, index)
+        return page, index
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m trengo.export",
+                                     description="Export Trengo tickets, messages and contacts.")
+    parser.add_argument("directory", help="Output directory. Use the same directory to resume an export.")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--no-messages", action="store_true", help="Don't export the messages of the tickets.")
+    parser.add_argument("--no-contacts", action="store_true", help="Don't export the contacts.")
+    parser.add_argument("--status", help="Only export the tickets with this status.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--prefetch", type=int, default=0, help="Number of pages to fetch ahead.")
+    args = parser.parse_args(argv)
+
+    exporter = Exporter(Trengo(), args.directory, format=args.format, batch_size=args.batch_size,
+                        prefetch=args.prefetch)
+    count = exporter.export_tickets(messages=not args.no_messages, status=args.status)
+    print(f"Exported {count} tickets")
+    if not args.no_contacts:
+        count = exporter.export_contacts()
+        print(f"Exported {count} contacts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Diff-based push of contact and ticket fields: only the values that changed since the last push are sent.
+"""
+import itertools
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable, Mapping
+
+from trengo import Trengo
+from trengo.bulk import run_bulk
+
+__all__ = ["FieldSync", "PushReport"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pushed_values (
+    entity TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (entity, entity_id, field)
+);
+"""
+
+# Fields of `Trengo.update_contact`
+CONTACT_FIELDS = ("full_name", "contact_group_ids")
+
+
+@dataclass
+class PushReport:
+    """
+    Result of a push.
+    """
+    # Number of writes sent successfully
+    sent: int = 0
+    # Number of writes skipped because the value didn't change since the last push
+    skipped: int = 0
+    # Exception raised by each failed write, by ``(entity, entity ID, field)``
+    failed: dict[Hashable, BaseException] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True if no write failed."""
+        return not self.failed
+
+
+class FieldSync:
+    """
+    Push contact and ticket fields to Trengo, keeping a local SQLite snapshot of the last values pushed so that values
+    that didn't change are not sent again:
+
+        with FieldSync(Trengo(rate_limiter=RateLimiter()), "pushed.sqlite") as field_sync:
+            report = field_sync.push_contact_custom_fields({contact_id: {custom_field_id: "Gold"}, ...})
+            print(f"{report.sent} sent, {report.skipped} skipped")
+
+    The snapshot only knows what was pushed from here: if a value is changed in Trengo by someone else, it's not pushed
+    again until it changes locally too. Use `forget` or ``force=True`` to push values again.
+    """
+
+    def __init__(self, client: Trengo, path: str | os.PathLike, *,
+                 max_workers=4,
+                 retries=2,
+                 batch_size=1000):
+        """
+        :param client: Trengo client. Pass it a `RateLimiter` to stay within the rate limit.
+        :param path: path of the SQLite database. It's created if it doesn't exist.
+        :param max_workers: maximum number of concurrent writes.
+        :param retries: see `run_bulk`.
+        :param batch_size: number of writes sent concurrently before saving them in the snapshot.
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.retries = retries
+        self.batch_size = batch_size
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    def forget(self, entity: str | None = None, entity_id: int | None = None):
+        """
+        Remove values from the snapshot, so that they are pushed again: all of them, those of an entity (``"contact"``
+        or ``"ticket"``), or those of one contact or ticket.
+        """
+        with self.connection:
+            if entity is None:
+                self.connection.execute("DELETE FROM pushed_values")
+            elif entity_id is None:
+                self.connection.execute("DELETE FROM pushed_values WHERE entity = ?", (entity,))
+            else:
+                self.connection.execute("DELETE FROM pushed_values WHERE entity = ? AND entity_id = ?",
+                                        (entity, entity_id))
+
+    def push_contact_custom_fields(self, values: Mapping[int, Mapping[int, Any]] | Iterable[tuple[int, Mapping]], *,
+                                   force=False) -> PushReport:
+        """
+        Set the custom fields of contacts that changed since the last push, with `Trengo.set_contact_custom_field`.
+
+        :param values: custom field values by custom field ID, by contact ID. This can be a lazy iterable of
+          ``(contact ID, values)`` tuples.
+        :param force: if True, push all the values, even those that didn't change.
+        """
+        return self._push("contact", values, force=force, send=lambda contact_id, custom_field_id, value:
+                          self.client.set_contact_custom_field(contact_id, int(custom_field_id), value))
+
+    def push_ticket_custom_fields(self, values: Mapping[int, Mapping[int, Any]] | Iterable[tuple[int, Mapping]], *,
+                                  force=False) -> PushReport:
+        """
+        Set the custom fields of tickets that changed since the last push, with `Trengo.set_custom_data`. See
+        `push_contact_custom_fields`.
+        """
+        return self._push("ticket", values, force=force, send=lambda ticket_id, custom_field_id, value:
+                          self.client.set_custom_data(ticket_id, int(custom_field_id), value))
+
+    def push_contacts(self, values: Mapping[int, Mapping[str, Any]] | Iterable[tuple[int, Mapping]], *,
+                      force=False) -> PushReport:
+        """
+        Update the contacts whose ``full_name`` or ``contact_group_ids`` changed since the last push, with
+        `Trengo.update_contact`. Both fields are sent together, so a contact counts as one write.
+
+        :param values: ``{"full_name": ..., "contact_group_ids": [...]}`` dicts by contact ID. This can be a lazy
+          iterable of ``(contact ID, values)`` tuples.
+        :param force: if True, update all the contacts, even those that didn't change.
+        """
+        def attributes(items):
+            for contact_id, contact_values in items:
+                unknown = set(contact_values) - set(CONTACT_FIELDS)
+                if unknown:
+                    raise ValueError(f"Unknown contact fields: {', '.join(sorted(unknown))}")
+                yield contact_id, {"attributes": {name: contact_values.get(name) for name in CONTACT_FIELDS}}
+
+        items = values.items() if isinstance(values, Mapping) else values
+        return self._push("contact", attributes(items), force=force, send=lambda contact_id, _, attributes_:
+                          self.client.update_contact(contact_id, **attributes_))
+
+    def _push(self, entity: str, values: Mapping[int, Mapping] | Iterable[tuple[int, Mapping]], *,
+              force: bool,
+              send: Callable[[int, str, Any], Any]) -> PushReport:
+        items = values.items() if isinstance(values, Mapping) else values
+        writes = ((entity_id, str(field_), value, json.dumps(value, sort_keys=True))
+                  for entity_id, fields in items
+                  for field_, value in fields.items())
+
+        report = PushReport()
+        while batch := list(itertools.islice(writes, self.batch_size)):
+            changed = {}
+            for entity_id, field_, value, serialized in batch:
+                if not force:
+                    row = self.connection.execute(
+                        "SELECT value FROM pushed_values WHERE entity = ? AND entity_id = ? AND field = ?",
+                        (entity, entity_id, field_)).fetchone()
+                    if row is not None and row[0] == serialized:
+                        report.skipped += 1
+                        continue
+                changed[(entity, entity_id, field_)] = (value, serialized)
+
+            bulk_report = run_bulk(lambda key: send(key[1], key[2], changed[key][0]), changed,
+                                   max_workers=self.max_workers, retries=self.retries)
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO pushed_values (entity, entity_id, field, value) VALUES (?, ?, ?, ?)",
+                    [(*key, serialized) for key, (_, serialized) in changed.items() if key in bulk_report.succeeded])
+            report.sent += len(bulk_report.succeeded)
+            report.failed.update(bulk_report.failed)
+
+        return report
@@ -0,0 +1,260 @@
+"""
+Local mirror of help centers in a SQLite database, with a full-text index of the articles.
+"""
+import html
+import json
+import os
+import re
+import sqlite3
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable
+
+from api_session import JSONDict
+
+from trengo import Trengo
+
+__all__ = ["HelpCenterMirror"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS help_centers (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    help_center_id INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY,
+    help_center_id INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    help_center_id INTEGER NOT NULL,
+    category_id INTEGER,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_category_id ON articles (category_id);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_text USING fts5 (
+    article_id UNINDEXED, locale UNINDEXED, title, content, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Used when SQLite is compiled without FTS5: searches are then done with LIKE
+_FALLBACK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles_text (
+    article_id INTEGER NOT NULL,
+    locale TEXT,
+    title TEXT,
+    content TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_text_article_id ON articles_text (article_id);
+"""
+
+_TAG_RE = re.compile(r"<[^>]*>")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _strip_html(text: str | None) -> str:
+    return html.unescape(_TAG_RE.sub(" ", text or ""))
+
+
+def _article_texts(article: JSONDict) -> list[tuple[str | None, str, str]]:
+    """Return the ``(locale, title, content)`` of each translation of an article."""
+    translations = article.get("translations") or [article]
+    return [(translation.get("locale"),
+             _strip_html(translation.get("title")),
+             _strip_html(translation.get("content") or translation.get("body")))
+            for translation in translations]
+
+
+class HelpCenterMirror:
+    """
+    Keep a local copy of help centers, with their categories, blocks and articles, and search the articles:
+
+        with HelpCenterMirror(Trengo(), "help_center.sqlite") as mirror:
+            mirror.sync()
+            for article in mirror.search("refund policy"):
+                ...
+
+    Each sync lists the articles and only fetches those that are new or whose ``updated_at`` changed. Articles that
+    were deleted are removed.
+
+    Searches use SQLite's FTS5 full-text index, ranked by relevance, or a slower ``LIKE`` search if SQLite was compiled
+    without FTS5.
+    """
+
+    def __init__(self, client: Trengo, path: str | os.PathLike, *, max_workers=4):
+        """
+        :param client: Trengo client.
+        :param path: path of the SQLite database. It's created if it doesn't exist.
+        :param max_workers: maximum number of articles fetched concurrently.
+        """
+        self.client = client
+        self.max_workers = max_workers
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+        try:
+            self.connection.executescript(_FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            self.connection.executescript(_FALLBACK_SCHEMA)
+            self.full_text = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    # == Sync ==
+
+    def sync(self, help_center_ids: Iterable[int] | None = None) -> dict[str, int]:
+        """
+        Update the local copy.
+
+        :param help_center_ids: IDs of the help centers to sync. Default to all of them.
+        :return: the number of articles ``"fetched"``, ``"unchanged"`` and ``"deleted"``.
+        """
+        if help_center_ids is None:
+            help_centers = list(self.client.get_help_centers())
+            with self.connection:
+                self.connection.execute("DELETE FROM help_centers")
+                self.connection.executemany("INSERT INTO help_centers (id, data) VALUES (?, ?)",
+                                            [(help_center["id"], json.dumps(help_center))
+                                             for help_center in help_centers])
+            help_center_ids = [help_center["id"] for help_center in help_centers]
+
+        counts = {"fetched": 0, "unchanged": 0, "deleted": 0}
+        for help_center_id in help_center_ids:
+            for key, count in self._sync_help_center(help_center_id).items():
+                counts[key] += count
+        return counts
+
+    def _sync_help_center(self, help_center_id: int) -> dict[str, int]:
+        categories = list(self.client.get_help_center_categories(help_center_id))
+        blocks = list(self.client.get_help_center_blocks(help_center_id))
+        listed_articles = list(self.client.get_help_center_articles(help_center_id))
+
+        known = dict(self.connection.execute("SELECT id, updated_at FROM articles WHERE help_center_id = ?",
+                                             (help_center_id,)).fetchall())
+        changed_ids = [article["id"] for article in listed_articles
+                       if article["id"] not in known or article.get("updated_at") != known[article["id"]]
+                       or article.get("updated_at") is None]
+        deleted_ids = set(known) - {article["id"] for article in listed_articles}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="trengo-help-center") as executor:
+            articles = [article for article in executor.map(
+                lambda article_id: self.client.get_help_center_article(help_center_id, article_id), changed_ids)
+                if article is not None]
+
+        with self.connection:
+            for table, records in (("categories", categories), ("blocks", blocks)):
+                self.connection.execute(f"DELETE FROM {table} WHERE help_center_id = ?", (help_center_id,))
+                self.connection.executemany(
+                    f"INSERT OR REPLACE INTO {table} (id, help_center_id, data) VALUES (?, ?, ?)",
+                    [(record["id"], help_center_id, json.dumps(record)) for record in records])
+
+            for article_id in deleted_ids:
+                self._delete_article(article_id)
+            for article in articles:
+                self._store_article(help_center_id, article)
+
+        return {"fetched": len(articles), "unchanged": len(listed_articles) - len(changed_ids),
+                "deleted": len(deleted_ids)}
+
+    def _delete_article(self, article_id: int):
+        self.connection.execute("DELETE FROM articles WHERE id = ?", (article_id,))
+        self.connection.execute("DELETE FROM articles_text WHERE article_id = ?", (article_id,))
+
+    def _store_article(self, help_center_id: int, article: JSONDict):
+        self._delete_article(article["id"])
+        self.connection.execute(
+            "INSERT INTO articles (id, help_center_id, category_id, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+            (article["id"], help_center_id, article.get("category_id"), article.get("updated_at"),
+             json.dumps(article)))
+        self.connection.executemany(
+            "INSERT INTO articles_text (article_id, locale, title, content) VALUES (?, ?, ?, ?)",
+            [(article["id"], locale, title, content) for locale, title, content in _article_texts(article)])
+
+    # == Reads ==
+
+    def get_help_centers(self) -> list[JSONDict]:
+        """Return the help centers of the local copy."""
+        return [json.loads(data) for (data,) in self.connection.execute("SELECT data FROM help_centers ORDER BY id")]
+
+    def get_categories(self, help_center_id: int) -> list[JSONDict]:
+        """Return the categories of a help center."""
+        return [json.loads(data) for (data,) in self.connection.execute(
+            "SELECT data FROM categories WHERE help_center_id = ? ORDER BY id", (help_center_id,))]
+
+    def get_blocks(self, help_center_id: int) -> list[JSONDict]:
+        """Return the blocks of a help center."""
+        return [json.loads(data) for (data,) in self.connection.execute(
+            "SELECT data FROM blocks WHERE help_center_id = ? ORDER BY id", (help_center_id,))]
+
+    def get_article(self, article_id: int) -> JSONDict | None:
+        """Return an article of the local copy."""
+        row = self.connection.execute("SELECT data FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_articles(self, *, help_center_id: int | None = None, category_id: int | None = None) -> Iterator[JSONDict]:
+        """Yield the articles of the local copy, optionally only those of a help center or category."""
+        conditions: list[str] = []
+        params: list[Any] = []
+        if help_center_id is not None:
+            conditions.append("help_center_id = ?")
+            params.append(help_center_id)
+        if category_id is not None:
+            conditions.append("category_id = ?")
+            params.append(category_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        for (data,) in self.connection.execute(f"SELECT data FROM articles {where} ORDER BY id", params):
+            yield json.loads(data)
+
+    def search(self, query: str, *, limit=10, locale: str | None = None) -> list[JSONDict]:
+        """
+        Search the articles. All the words of the query must appear in the title or the content of an article; the last
+        word may be incomplete.
+
+        :param query: words to search.
+        :param limit: maximum number of articles to return.
+        :param locale: only search the translations in this locale.
+        :return: the articles, most relevant first.
+        """
+        words = _WORD_RE.findall(query)
+        if not words:
+            return []
+
+        locale_condition = " AND locale = ?" if locale is not None else ""
+        locale_params = [locale] if locale is not None else []
+        if self.full_text:
+            match = " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+            rows = self.connection.execute(
+                "SELECT a.data FROM articles a JOIN ("
+                "  SELECT article_id, MIN(rank) AS rank FROM articles_text"
+                f"  WHERE articles_text MATCH ?{locale_condition} GROUP BY article_id"
+                ") t ON t.article_id = a.id ORDER BY t.rank LIMIT ?",
+                [match, *locale_params, limit])
+        else:
+            conditions = " AND ".join(["(title LIKE ? OR content LIKE ?)"] * len(words))
+            params = [pattern for word in words for pattern in (f"%{word}%", f"%{word}%")]
+            rows = self.connection.execute(
+                "SELECT data FROM articles WHERE id IN ("
+                f"  SELECT article_id FROM articles_text WHERE {conditions}{locale_condition}"
+                ") ORDER BY id LIMIT ?",
+                [*params, *locale_params, limit])
+
+        return [json.loads(data) for (data,) in rows]
@@ -0,0 +1,238 @@
+"""
+Instrumentation hooks: per-endpoint metrics and tracing of the requests and pages.
+
+Pass an `Instrumentation` instance to the client:
+
+    metrics = MetricsCollector()
+    client = Trengo(instrumentation=metrics)
+    ...
+    print(metrics.summary())
+
+`PrometheusInstrumentation` and `OpenTelemetryInstrumentation` export the same data to ``prometheus_client`` and
+OpenTelemetry, respectively. They require the corresponding libraries.
+"""
+import bisect
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+__all__ = [
+    "RequestEvent", "PageEvent", "Instrumentation", "MetricsCollector", "EndpointMetrics",
+    "PrometheusInstrumentation", "OpenTelemetryInstrumentation", "normalize_endpoint",
+]
+
+_ID_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def normalize_endpoint(path: str) -> str:
+    """
+    Replace the IDs in an API path with placeholders, so that paths of the same endpoint can be grouped together:
+    ``/tickets/123/messages`` becomes ``/tickets/{id}/messages``.
+    """
+    return _ID_SEGMENT_RE.sub("/{id}", path.partition("?")[0])
+
+
+@dataclass(slots=True)
+class RequestEvent:
+    method: str
+    # Normalized path, e.g. "/tickets/{id}/messages"
+    endpoint: str
+    path: str
+    status_code: int | None
+    # Time spent in the call, including rate limiting and retries, in seconds
+    duration: float
+    request_bytes: int | None = None
+    response_bytes: int | None = None
+    retries: int = 0
+    error: BaseException | None = None
+    # time.time() at the start of the call
+    start_time: float = field(default_factory=time.time)
+
+
+@dataclass(slots=True)
+class PageEvent:
+    endpoint: str
+    page: int
+    records: int
+
+
+class Instrumentation:
+    """
+    Base class of the instrumentations. The hooks are called synchronously, from the thread that made the request, so
+    they should be fast.
+    """
+
+    def on_request(self, event: RequestEvent):
+        """Called after each API call."""
+
+    def on_page(self, event: PageEvent):
+        """Called after each page of a paginated endpoint."""
+
+
+class EndpointMetrics:
+    """Metrics of one endpoint."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.pages = 0
+        self.records = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.total_duration = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a latency quantile from the histogram: return the upper bound of the bucket that contains it."""
+        if not self.requests:
+            return None
+        rank = q * self.requests
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "pages": self.pages,
+            "records": self.records,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "total_duration": self.total_duration,
+            "latency_buckets": dict(zip(LATENCY_BUCKETS, self.latency_buckets)),
+        }
+
+
+class MetricsCollector(Instrumentation):
+    """
+    Collect in-process metrics, by method and normalized endpoint: counts of requests, errors, retries, pages and
+    records, bytes transferred, time spent, and latency histograms.
+    """
+
+    def __init__(self):
+        self.endpoints: dict[tuple[str, str], EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, method: str, endpoint: str) -> EndpointMetrics:
+        key = (method, endpoint)
+        metrics = self.endpoints.get(key)
+        if metrics is None:
+            metrics = self.endpoints.setdefault(key, EndpointMetrics())
+        return metrics
+
+    def on_request(self, event: RequestEvent):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, event.duration)
+        with self._lock:
+            metrics = self._get(event.method, event.endpoint)
+            metrics.requests += 1
+            metrics.retries += event.retries
+            if event.error is not None or (event.status_code is not None and event.status_code >= 400):
+                metrics.errors += 1
+            metrics.request_bytes += event.request_bytes or 0
+            metrics.response_bytes += event.response_bytes or 0
+            metrics.total_duration += event.duration
+            metrics.latency_buckets[bucket] += 1
+
+    def on_page(self, event: PageEvent):
+        with self._lock:
+            metrics = self._get("GET", event.endpoint)
+            metrics.pages += 1
+            metrics.records += event.records
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return the metrics as a dict indexed by ``"<METHOD> <endpoint>"``."""
+        with self._lock:
+            return {f"{method} {endpoint}": metrics.as_dict()
+                    for (method, endpoint), metrics in self.endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+
+    def summary(self) -> str:
+        """Return a human-readable table of the metrics, sorted by total time spent."""
+        with self._lock:
+            items = sorted(self.endpoints.items(), key=lambda item: item[1].total_duration, reverse=True)
+            lines = [f"{'endpoint':<45} {'requests':>8} {'errors':>6} {'retries':>7} {'pages':>6} "
+                     f"{'total (s)':>9} {'p50 (s)':>7} {'p99 (s)':>7} {'MB in':>8}"]
+            for (method, endpoint), metrics in items:
+                p50 = metrics.quantile(0.5)
+                p99 = metrics.quantile(0.99)
+                lines.append(f"{method + ' ' + endpoint:<45} {metrics.requests:>8} {metrics.errors:>6} "
+                             f"{metrics.retries:>7} {metrics.pages:>6} {metrics.total_duration:>9.2f} "
+                             f"{p50 if p50 is not None else '-':>7} {p99 if p99 is not None else '-':>7} "
+                             f"{metrics.response_bytes / 1e6:>8.2f}")
+        return "\n".join(lines)
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Export the metrics to ``prometheus_client``.
+    """
+
+    def __init__(self, namespace="trengo", registry=None):
+        from prometheus_client import REGISTRY, Counter, Histogram
+
+        if registry is None:
+            registry = REGISTRY
+
+        labels = ["method", "endpoint"]
+        self.requests = Counter("requests", "API requests", labels + ["status"], namespace=namespace,
+                                registry=registry)
+        self.retries = Counter("retries", "Retried API requests", labels, namespace=namespace, registry=registry)
+        self.response_bytes = Counter("response_bytes", "Bytes received", labels, namespace=namespace,
+                                      registry=registry)
+        self.latency = Histogram("request_duration_seconds", "Duration of the API requests", labels,
+                                 namespace=namespace, registry=registry, buckets=LATENCY_BUCKETS)
+        self.pages = Counter("pages", "Pages fetched", ["endpoint"], namespace=namespace, registry=registry)
+        self.records = Counter("records", "Records fetched", ["endpoint"], namespace=namespace, registry=registry)
+
+    def on_request(self, event: RequestEvent):
+        status = str(event.status_code) if event.status_code is not None else "error"
+        self.requests.labels(event.method, event.endpoint, status).inc()
+        if event.retries:
+            self.retries.labels(event.method, event.endpoint).inc(event.retries)
+        if event.response_bytes:
+            self.response_bytes.labels(event.method, event.endpoint).inc(event.response_bytes)
+        self.latency.labels(event.method, event.endpoint).observe(event.duration)
+
+    def on_page(self, event: PageEvent):
+        self.pages.labels(event.endpoint).inc()
+        self.records.labels(event.endpoint).inc(event.records)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Create an OpenTelemetry span for each API call.
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            from opentelemetry import trace
+
+            tracer = trace.get_tracer("trengo")
+        self.tracer = tracer
+
+    def on_request(self, event: RequestEvent):
+        start_time = int(event.start_time * 1e9)
+        span = self.tracer.start_span(f"{event.method} {event.endpoint}", start_time=start_time, attributes={
+            "http.request.method": event.method,
+            "url.path": event.path,
+            "trengo.endpoint": event.endpoint,
+            "trengo.retries": event.retries,
+            **({"http.response.status_code": event.status_code} if event.status_code is not None else {}),
+        })
+        if event.error is not None:
+            span.record_exception(event.error)
+        span.end(end_time=start_time + int(event.duration * 1e9))
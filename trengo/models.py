@@ -0,0 +1,173 @@
+"""
+Compact typed models for the most common records.
+
+They only keep the most useful fields, in ``__slots__`` instead of a dict, with parsed dates. Nested records are kept as
+received and only decoded into models when accessed. Use ``as_model=True`` on the methods that support it:
+
+    for ticket in trengo_client.get_tickets(as_model=True):
+        print(ticket.id, ticket.created_at.year, ticket.contact.name)
+"""
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterable
+
+from api_session import JSONDict
+
+__all__ = ["Contact", "Message", "Profile", "Ticket", "parse_datetime", "map_records"]
+
+
+def parse_datetime(value: str | None) -> datetime | None:
+    """Parse a date from the API, e.g. ``"2024-09-12 10:22:33"``, ``"2024-09-12T10:22:33+02:00"`` or
+    ``"2024-09-12T10:22:33.000000Z"``."""
+    if not value:
+        return None
+    # datetime.fromisoformat doesn't accept the "Z" suffix before Python 3.11
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def map_records(func, records: Iterable[JSONDict]) -> Iterator[Any]:
+    """Apply ``func`` to each record. Closing the returned generator closes ``records`` if it's a generator."""
+    try:
+        for record in records:
+            yield func(record)
+    finally:
+        close = getattr(records, "close", None)
+        if close is not None:
+            close()
+
+
+@dataclass(slots=True)
+class Contact:
+    id: int
+    name: str | None = None
+    full_name: str | None = None
+    email: str | None = None
+    phone: str | None = None
+    identifier: str | None = None
+    created_at: datetime | None = None
+    custom_field_data: JSONDict | None = None
+
+    @classmethod
+    def from_dict(cls, data: JSONDict) -> "Contact":
+        return cls(
+            id=data["id"],
+            name=data.get("name"),
+            full_name=data.get("full_name"),
+            email=data.get("email"),
+            phone=data.get("phone"),
+            identifier=data.get("identifier"),
+            created_at=parse_datetime(data.get("created_at")),
+            custom_field_data=data.get("custom_field_data") or None,
+        )
+
+
+@dataclass(slots=True)
+class Profile:
+    id: int
+    name: str | None = None
+    created_at: datetime | None = None
+    _contacts: list[JSONDict] | list[Contact] | None = field(default=None, repr=False)
+
+    @property
+    def contacts(self) -> list[Contact]:
+        """Contacts of the profile, if they were included in the response."""
+        if not self._contacts:
+            return []
+        if isinstance(self._contacts[0], dict):
+            self._contacts = [Contact.from_dict(contact) for contact in self._contacts]  # type: ignore[arg-type]
+        return self._contacts  # type: ignore[return-value]
+
+    @classmethod
+    def from_dict(cls, data: JSONDict) -> "Profile":
+        return cls(
+            id=data["id"],
+            name=data.get("name"),
+            created_at=parse_datetime(data.get("created_at")),
+            _contacts=data.get("contacts"),
+        )
+
+
+@dataclass(slots=True)
+class Message:
+    id: int
+    ticket_id: int | None = None
+    type: str | None = None
+    message: str | None = None
+    subject: str | None = None
+    created_at: datetime | None = None
+    attachments: list[JSONDict] | None = None
+    _contact: JSONDict | Contact | None = field(default=None, repr=False)
+
+    @property
+    def contact(self) -> Contact | None:
+        """Contact of the message, if any."""
+        if isinstance(self._contact, dict):
+            self._contact = Contact.from_dict(self._contact)
+        return self._contact
+
+    @classmethod
+    def from_dict(cls, data: JSONDict) -> "Message":
+        return cls(
+            id=data["id"],
+            ticket_id=data.get("ticket_id"),
+            type=data.get("type"),
+            message=data.get("message"),
+            subject=data.get("subject"),
+            created_at=parse_datetime(data.get("created_at")),
+            attachments=data.get("attachments") or None,
+            _contact=data.get("contact"),
+        )
+
+
+@dataclass(slots=True)
+class Ticket:
+    id: int
+    status: str | None = None
+    subject: str | None = None
+    channel_id: int | None = None
+    contact_id: int | None = None
+    user_id: int | None = None
+    team_id: int | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    closed_at: datetime | None = None
+    label_ids: tuple[int, ...] = ()
+    _contact: JSONDict | Contact | None = field(default=None, repr=False)
+    _latest_message: JSONDict | Message | None = field(default=None, repr=False)
+
+    @property
+    def contact(self) -> Contact | None:
+        """Contact of the ticket, if it was included in the response."""
+        if isinstance(self._contact, dict):
+            self._contact = Contact.from_dict(self._contact)
+        return self._contact
+
+    @property
+    def latest_message(self) -> Message | None:
+        """Latest message of the ticket, if it was included in the response."""
+        if isinstance(self._latest_message, dict):
+            self._latest_message = Message.from_dict(self._latest_message)
+        return self._latest_message
+
+    @classmethod
+    def from_dict(cls, data: JSONDict) -> "Ticket":
+        contact = data.get("contact")
+        channel = data.get("channel")
+        return cls(
+            id=data["id"],
+            status=data.get("status"),
+            subject=data.get("subject"),
+            channel_id=data.get("channel_id") or (channel["id"] if channel else None),
+            contact_id=data.get("contact_id") or (contact["id"] if contact else None),
+            user_id=data.get("user_id"),
+            team_id=data.get("team_id"),
+            created_at=parse_datetime(data.get("created_at")),
+            updated_at=parse_datetime(data.get("updated_at")),
+            closed_at=parse_datetime(data.get("closed_at")),
+            label_ids=tuple(label["id"] for label in data.get("labels") or ()),
+            _contact=contact,
+            _latest_message=data.get("latest_message"),
+        )
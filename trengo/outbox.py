@@ -0,0 +1,333 @@
+"""
+Durable outbox for outbound messages: sends are stored in a local SQLite database and sent by background workers, with
+retries.
+
+    with Outbox(Trengo(rate_limiter=RateLimiter()), "outbox.sqlite", workers=4) as outbox:
+        handle = outbox.send_whatsapp_template("+33600000000", hsm_id=123, idempotency_key="campaign-42-contact-1")
+        ...
+        print(handle.status().status)
+
+Enqueuing returns immediately. If the process stops, the sends that were not done yet are resumed by the next
+`Outbox` opened on the same database. Sends that were in progress during a crash are sent again once their lease
+expires (see ``lease_timeout``): delivery is at-least-once.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from trengo import Trengo
+from trengo.bulk import is_transient_error
+
+__all__ = ["Outbox", "OutboxHandle", "OutboxItem", "PENDING", "SENDING", "SENT", "FAILED"]
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# Methods of the client that can be called through the outbox
+METHODS = ("send_ticket_message", "send_ticket_media_message", "send_whatsapp_template",
+           "store_custom_channel_message")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    method TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, next_attempt_at);
+"""
+
+
+@dataclass(slots=True)
+class OutboxItem:
+    idempotency_key: str
+    method: str
+    kwargs: dict[str, Any]
+    # One of PENDING, SENDING, SENT, FAILED
+    status: str
+    attempts: int
+    # Response of the API, once sent
+    result: Any = None
+    # Error of the last attempt, if any
+    error: str | None = None
+
+
+class OutboxHandle:
+    """
+    Handle on an enqueued send.
+    """
+
+    def __init__(self, outbox: "Outbox", idempotency_key: str):
+        self.outbox = outbox
+        self.idempotency_key = idempotency_key
+
+    def __repr__(self):
+        return f"<OutboxHandle {self.idempotency_key!r}>"
+
+    def status(self) -> OutboxItem:
+        """Return the current state of the send."""
+        item = self.outbox.get(self.idempotency_key)
+        assert item is not None
+        return item
+
+    def wait(self, timeout: float | None = None, poll_interval: float = 0.1) -> OutboxItem:
+        """
+        Wait until the send is done or failed, and return its state.
+
+        :raise TimeoutError: if it's still not done after ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            item = self.status()
+            if item.status in (SENT, FAILED):
+                return item
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"{self.idempotency_key!r} is still {item.status}")
+            time.sleep(poll_interval)
+
+
+class Outbox:
+    """
+    Durable queue of sends, drained by background worker threads.
+
+    Sends that fail with a transient error (see `is_transient_error`) are retried with an exponential backoff; other
+    errors fail the send immediately. Pass a client with a `RateLimiter` to stay under Trengo's rate limit.
+    """
+
+    def __init__(self, client: Trengo, path: str | os.PathLike, *,
+                 workers=2,
+                 max_attempts=5,
+                 backoff: float = 2.0,
+                 poll_interval: float = 1.0,
+                 lease_timeout: float = 600):
+        """
+        :param client: Trengo client.
+        :param path: path of the SQLite database. It's created if it doesn't exist.
+        :param workers: number of worker threads.
+        :param max_attempts: maximum number of attempts of each send.
+        :param backoff: delay, in seconds, before the first retry. It's doubled on each subsequent retry.
+        :param poll_interval: how often idle workers check the database for sends to retry, in seconds.
+        :param lease_timeout: time after which a send that is still in progress is considered abandoned, e.g. because
+          its process crashed, and is sent again, in seconds. It must be longer than any send, since several processes
+          can use the same database: a send in progress in another process is left alone until then.
+        """
+        self.client = client
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(_SCHEMA)
+
+        self._lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """Start the worker threads."""
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"trengo-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the worker threads once they're done with their current send. Pending sends stay in the database."""
+        self._stopping.set()
+        self._wake_up.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def close(self):
+        """Stop the workers and close the database."""
+        self.stop()
+        self.connection.close()
+
+    # == Enqueuing ==
+
+    def enqueue(self, method: str, *, idempotency_key: str | None = None, **kwargs) -> OutboxHandle:
+        """
+        Store a send in the outbox and return immediately.
+
+        :param method: name of the client method to call, one of ``METHODS``.
+        :param idempotency_key: unique key of the send. Enqueuing again a send with the same key does nothing and
+          returns a handle on the first one. By default, a random key is generated.
+        :param kwargs: keyword arguments of the method. They must be JSON-serializable.
+        :return: a handle to follow the send.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unsupported method {method!r}; expected one of {', '.join(METHODS)}")
+        if idempotency_key is None:
+            idempotency_key = str(uuid.uuid4())
+
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO outbox"
+                " (idempotency_key, method, kwargs, status, next_attempt_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (idempotency_key, method, json.dumps(kwargs), PENDING, now, now, now))
+        self._wake_up.set()
+        return OutboxHandle(self, idempotency_key)
+
+    def send_ticket_message(self, ticket_id: int, message: str, *, idempotency_key: str | None = None,
+                            **kwargs) -> OutboxHandle:
+        """Enqueue a `Trengo.send_ticket_message` call."""
+        return self.enqueue("send_ticket_message", idempotency_key=idempotency_key,
+                            ticket_id=ticket_id, message=message, **kwargs)
+
+    def send_ticket_media_message(self, ticket_id: int, *, idempotency_key: str | None = None,
+                                  **kwargs) -> OutboxHandle:
+        """Enqueue a `Trengo.send_ticket_media_message` call."""
+        return self.enqueue("send_ticket_media_message", idempotency_key=idempotency_key, ticket_id=ticket_id,
+                            **kwargs)
+
+    def send_whatsapp_template(self, recipient_phone_number: str, *, idempotency_key: str | None = None,
+                               **kwargs) -> OutboxHandle:
+        """Enqueue a `Trengo.send_whatsapp_template` call."""
+        return self.enqueue("send_whatsapp_template", idempotency_key=idempotency_key,
+                            recipient_phone_number=recipient_phone_number, **kwargs)
+
+    def store_custom_channel_message(self, channel: str, *, idempotency_key: str | None = None,
+                                     **kwargs) -> OutboxHandle:
+        """Enqueue a `Trengo.store_custom_channel_message` call."""
+        return self.enqueue("store_custom_channel_message", idempotency_key=idempotency_key, channel=channel,
+                            **kwargs)
+
+    # == Status ==
+
+    def get(self, idempotency_key: str) -> OutboxItem | None:
+        """Return the state of a send, if it exists."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT idempotency_key, method, kwargs, status, attempts, result, error FROM outbox"
+                " WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+        if row is None:
+            return None
+        key, method, kwargs, status, attempts, result, error = row
+        return OutboxItem(key, method, json.loads(kwargs), status, attempts,
+                          json.loads(result) if result is not None else None, error)
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of sends by status."""
+        with self._lock:
+            return dict(self.connection.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def recover(self, *, all_sends=False) -> int:
+        """
+        Put the sends whose lease expired back in the queue, and return their number. Workers do it on their own as
+        they claim sends; call this to do it right away.
+
+        :param all_sends: if True, also put back the sends that are in progress and whose lease didn't expire. Only do
+          this when no other process uses the database, or these sends may be done twice.
+        """
+        now = time.time()
+        claimed_before = now if all_sends else now - self.lease_timeout
+        with self._lock, self.connection:
+            count = self.connection.execute(
+                "UPDATE outbox SET status = ?, updated_at = ? WHERE status = ? AND updated_at <= ?",
+                (PENDING, now, SENDING, claimed_before)).rowcount
+        self._wake_up.set()
+        return count
+
+    def retry_failed(self) -> int:
+        """Put the failed sends back in the queue, and return their number."""
+        with self._lock, self.connection:
+            count = self.connection.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE status = ?",
+                (PENDING, time.time(), time.time(), FAILED)).rowcount
+        self._wake_up.set()
+        return count
+
+    # == Sending ==
+
+    def _claim(self) -> tuple[int, str, dict[str, Any], int] | None:
+        """Mark the next due send, or the next send whose lease expired, as in progress and return it."""
+        while True:
+            now = time.time()
+            with self._lock, self.connection:
+                # A send in progress is leased until updated_at + lease_timeout
+                row = self.connection.execute(
+                    "SELECT id, method, kwargs, attempts, status, updated_at FROM outbox"
+                    " WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND updated_at <= ?)"
+                    " ORDER BY next_attempt_at, id LIMIT 1",
+                    (PENDING, now, SENDING, now - self.lease_timeout)).fetchone()
+                if row is None:
+                    return None
+                id_, method, kwargs, attempts, status, updated_at = row
+                # Another process may have claimed it since the SELECT: only claim it if it didn't change
+                claimed = self.connection.execute(
+                    "UPDATE outbox SET status = ?, updated_at = ? WHERE id = ? AND status = ? AND updated_at = ?",
+                    (SENDING, time.time(), id_, status, updated_at)).rowcount
+            if claimed:
+                return id_, method, json.loads(kwargs), attempts
+
+    def _update(self, id_: int, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self.connection:
+            self.connection.execute(f"UPDATE outbox SET {assignments}, updated_at = ? WHERE id = ?",
+                                    (*fields.values(), time.time(), id_))
+
+    def process_one(self) -> bool:
+        """Send the next due send, if any, in the current thread. Return False if there was none."""
+        claimed = self._claim()
+        if claimed is None:
+            return False
+
+        id_, method, kwargs, attempts = claimed
+        attempts += 1
+        try:
+            result = getattr(self.client, method)(**kwargs)
+        except Exception as ex:
+            if attempts < self.max_attempts and is_transient_error(ex):
+                delay = self.backoff * 2 ** (attempts - 1)
+                logger.warning("Send %d failed (attempt %d), retrying in %.1fs: %s", id_, attempts, delay, ex)
+                self._update(id_, status=PENDING, attempts=attempts, next_attempt_at=time.time() + delay,
+                             error=str(ex))
+            else:
+                logger.error("Send %d failed (attempt %d): %s", id_, attempts, ex)
+                self._update(id_, status=FAILED, attempts=attempts, error=str(ex))
+        else:
+            self._update(id_, status=SENT, attempts=attempts, result=json.dumps(result), error=None)
+        return True
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_one()
+            except Exception:
+                logger.exception("Error in the outbox worker")
+                processed = False
+
+            if not processed:
+                self._wake_up.wait(self.poll_interval)
+                self._wake_up.clear()
@@ -0,0 +1,177 @@
+"""
+Adaptive polling of tickets, for when webhooks can't be used.
+"""
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import closing
+from typing import Any, Callable
+
+from api_session import JSONDict
+
+from trengo import Trengo
+
+__all__ = ["TicketPoller"]
+
+
+class TicketPoller:
+    """
+    Poll the tickets and emit those that are new or were updated, with as few requests as possible:
+
+        poller = TicketPoller(Trengo(), status="OPEN", callback=handle_ticket)
+        poller.run()  # until poller.stop() is called
+
+        # or
+        for ticket in TicketPoller(Trengo(), status="OPEN"):
+            ...
+
+    Each round first compares the ticket aggregates (counts by status) with those of the previous round, in one small
+    request. Only when they changed, or every ``full_check_interval`` seconds, it lists the tickets most recently
+    updated first and stops at the first one that was already seen: when nothing changed, this is a single request.
+
+    The interval between rounds adapts to the activity: it's reset to ``min_interval`` when something changed, and
+    multiplied by ``backoff`` after each quiet round, up to ``max_interval``.
+
+    Changes that don't affect the counts, like a new message on an open ticket, are only seen by the periodic check:
+    use ``use_aggregates=False`` to list the tickets on every round instead.
+    """
+
+    def __init__(self, client: Trengo, *,
+                 callback: Callable[[JSONDict], Any] | None = None,
+                 since: str | None = None,
+                 min_interval: float = 15,
+                 max_interval: float = 300,
+                 backoff: float = 2.0,
+                 use_aggregates=True,
+                 full_check_interval: float = 300,
+                 sort="-updated_at",
+                 updated_field="updated_at",
+                 **ticket_params):
+        """
+        :param client: Trengo client.
+        :param callback: optional function called with each new or updated ticket.
+        :param since: only emit the tickets updated at or after this date (``YYYY-MM-DD HH:MM:SS``). By default, the
+          tickets that exist when the poller starts are not emitted.
+        :param min_interval: minimum delay between two rounds, in seconds.
+        :param max_interval: maximum delay between two rounds, in seconds.
+        :param backoff: factor applied to the delay after each round where nothing changed.
+        :param use_aggregates: if True, only list the tickets when the ticket aggregates changed, or every
+          ``full_check_interval`` seconds.
+        :param full_check_interval: maximum delay between two listings of the tickets when using the aggregates, in
+          seconds.
+        :param sort: value of the ``sort`` parameter that orders the tickets by descending update date.
+        :param updated_field: ticket field that holds its update date.
+        :param ticket_params: keyword arguments passed to ``get_tickets``, e.g. ``status`` or ``channels``.
+        """
+        self.client = client
+        self.callback = callback
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.use_aggregates = use_aggregates
+        self.full_check_interval = full_check_interval
+        self.sort = sort
+        self.updated_field = updated_field
+        self.ticket_params = ticket_params
+
+        # Current delay between two rounds
+        self.interval = min_interval
+        # Number of rounds, and of rounds that listed the tickets
+        self.rounds = 0
+        self.listings = 0
+
+        # Most recent update date seen, and the IDs of the tickets updated at that date
+        self.high_water_mark = since
+        self._seen_at_mark: set[int] = set()
+        self._aggregates: Any = None
+        self._last_listing = 0.0
+        self._stopping = threading.Event()
+
+    def __iter__(self) -> Iterator[JSONDict]:
+        """Poll until `stop` is called, and yield the new and updated tickets."""
+        self._stopping.clear()
+        while True:
+            yield from self.poll()
+            if self._stopping.wait(self.interval):
+                return
+
+    def run(self):
+        """Poll until `stop` is called, calling the callback with the new and updated tickets."""
+        for _ in self:
+            pass
+
+    def stop(self):
+        """Stop `run` or the iteration after the current round."""
+        self._stopping.set()
+
+    def poll(self) -> list[JSONDict]:
+        """
+        Run one round: check whether something changed, and if so fetch the new and updated tickets.
+
+        :return: the new and updated tickets, most recently updated first. The callback, if any, is also called with
+          each of them.
+        """
+        self.rounds += 1
+        if self.high_water_mark is None:
+            self._start()
+            return []
+
+        changed = not self.use_aggregates or time.monotonic() - self._last_listing >= self.full_check_interval
+        if self.use_aggregates:
+            aggregates = self.client.get_ticket_aggregates()
+            if aggregates != self._aggregates:
+                self._aggregates = aggregates
+                changed = True
+
+        tickets = self._list_changes() if changed else []
+
+        if tickets:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+        if self.callback is not None:
+            for ticket in tickets:
+                self.callback(ticket)
+        return tickets
+
+    def _start(self):
+        """Record the current state without emitting anything."""
+        if self.use_aggregates:
+            self._aggregates = self.client.get_ticket_aggregates()
+
+        with closing(self.client.get_tickets(sort=self.sort, limit=1, **self.ticket_params)) as tickets:
+            for ticket in tickets:
+                self.high_water_mark = ticket.get(self.updated_field)
+                self._seen_at_mark = {ticket["id"]}
+        if self.high_water_mark is None:
+            # No ticket yet: everything that comes later is new
+            self.high_water_mark = ""
+        self._last_listing = time.monotonic()
+        self.listings += 1
+
+    def _list_changes(self) -> list[JSONDict]:
+        high_water_mark = self.high_water_mark or ""
+        changes: list[JSONDict] = []
+        with closing(self.client.get_tickets(
+                sort=self.sort,
+                stop_when=lambda ticket: (ticket.get(self.updated_field) or "") < high_water_mark,
+                **self.ticket_params,
+        )) as tickets:
+            for ticket in tickets:
+                updated_at = ticket.get(self.updated_field) or ""
+                if updated_at == high_water_mark and ticket["id"] in self._seen_at_mark:
+                    continue
+                changes.append(ticket)
+
+        self._last_listing = time.monotonic()
+        self.listings += 1
+
+        if changes:
+            new_high_water_mark = max(ticket.get(self.updated_field) or "" for ticket in changes)
+            if new_high_water_mark > high_water_mark:
+                self.high_water_mark = new_high_water_mark
+                self._seen_at_mark = set()
+            self._seen_at_mark.update(ticket["id"] for ticket in changes
+                                      if (ticket.get(self.updated_field) or "") == self.high_water_mark)
+        return changes
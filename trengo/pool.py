@@ -0,0 +1,142 @@
+"""
+Pool of clients that use different tokens on the same workspace, to spread the requests over several rate limits.
+"""
+import threading
+import time
+
+from trengo import Trengo
+from trengo.ratelimit import parse_retry_after
+
+__all__ = ["TrengoPool"]
+
+# Options of the `Trengo` constructor that apply to how each client sends its requests: they must be set on the clients
+CLIENT_OPTIONS = ("rate_limiter", "rate_limit_retries", "pool_maxsize", "keep_alive", "compression", "http2",
+                  "max_retries", "user_agent")
+
+
+class TrengoPool(Trengo):
+    """
+    Client that sends each request through one of several `Trengo` clients:
+
+        pool = TrengoPool([
+            Trengo(token=token, rate_limiter=RateLimiter(), rate_limit_retries=0)
+            for token in tokens
+        ])
+        for ticket in pool.get_tickets(prefetch=8):
+            ...
+
+    It has all the methods of `Trengo`. Reads go to the client with the most remaining quota, according to its
+    `RateLimiter` if it has one, and otherwise to the one with the fewest requests in flight. A read that gets a 429
+    response is sent again through another client. Writes go to the first client, unless ``balance_writes`` is True.
+
+    All the tokens must have access to the same workspace. Give the clients ``rate_limit_retries=0`` so that a 429
+    response fails over to another client immediately instead of waiting.
+    """
+
+    def __init__(self, clients: list[Trengo], *, balance_writes=False, **kwargs):
+        """
+        :param clients: clients to send the requests through. The first one is the primary one, used for the writes.
+        :param balance_writes: if True, balance the writes like the reads. Note that a write that gets a 429 response
+          is not sent again through another client.
+        :param kwargs: keyword arguments passed to the ``Trengo`` constructor, e.g. ``coalesce_requests``,
+          ``instrumentation``, ``timeout``, ``timeouts`` or ``read_only``. The instrumentation sees one request per
+          call, with the failovers counted as retries; the timeouts are passed to the clients. Options of the transport
+          and the rate limiting, listed in ``CLIENT_OPTIONS``, must be set on the clients instead.
+        """
+        if not clients:
+            raise ValueError("A pool needs at least one client")
+        client_options = sorted(set(kwargs) & set(CLIENT_OPTIONS))
+        if client_options:
+            raise ValueError(f"Set {', '.join(client_options)} on the clients of the pool instead")
+
+        primary = clients[0]
+        super().__init__(token=str(primary.headers["Authorization"]).removeprefix("Bearer "),
+                         base_url=primary.base_url, **kwargs)
+        self.clients = clients
+        self.balance_writes = balance_writes
+
+        self._in_flight = [0] * len(clients)
+        # time.monotonic() until which each client is blocked after a 429 response, for those without a rate limiter
+        self._blocked_until = [0.0] * len(clients)
+        self._lock = threading.Lock()
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        super().close()
+
+    def _score(self, index: int, now: float) -> tuple[float, float]:
+        client = self.clients[index]
+        if client.rate_limiter is not None:
+            remaining = client.rate_limiter.remaining
+        else:
+            remaining = 0.0 if self._blocked_until[index] > now else float("inf")
+        return remaining, -self._in_flight[index]
+
+    def _pick(self, excluded: set[int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            index = max((i for i in range(len(self.clients)) if i not in excluded),
+                        key=lambda i: self._score(i, now))
+            self._in_flight[index] += 1
+        return index
+
+    def request_api(self, method: str, path: str, *args, throw: bool | None = None, bypass_read_only=False,
+                    **kwargs):
+        # The clients send the requests, so the checks and the default timeout of the pool are applied here
+        if self.offline:
+            raise AssertionError(f"Can't perform {method!r} action in offline mode!")
+        if self.read_only and not bypass_read_only and method.upper() not in self.READ_METHODS:
+            raise AssertionError(f"Can't perform {method!r} action in read-only mode!")
+        if "timeout" not in kwargs:
+            timeout = self._default_timeout(path)
+            if timeout is None:
+                timeout = self.timeout
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+
+        if self.coalesce_cache is not None and method.upper() != "GET":
+            self.coalesce_cache.invalidate()
+
+        balanced = method.upper() == "GET" or self.balance_writes
+        tried: set[int] = set()
+        start_time = time.time()
+        start = time.perf_counter()
+        attempts = 0
+        while True:
+            attempts += 1
+            if balanced:
+                index = self._pick(tried)
+            else:
+                index = 0
+                with self._lock:
+                    self._in_flight[0] += 1
+
+            try:
+                r = self.clients[index].request_api(method, path, *args, throw=False, bypass_read_only=bypass_read_only,
+                                                    **kwargs)
+            except Exception as ex:
+                self._record_request(method, path, None, start=start, start_time=start_time, retries=attempts - 1,
+                                     error=ex)
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight[index] -= 1
+
+            if r.status_code != 429:
+                break
+
+            retry_after = parse_retry_after(r.headers.get("Retry-After"))
+            with self._lock:
+                self._blocked_until[index] = time.monotonic() + (retry_after if retry_after is not None else 1)
+
+            tried.add(index)
+            if method.upper() != "GET" or len(tried) == len(self.clients):
+                break
+            r.close()
+
+        self._record_request(method, path, r, start=start, start_time=start_time, retries=attempts - 1,
+                             stream=bool(kwargs.get("stream")))
+        if throw:
+            self.raise_for_response(r)
+        return r
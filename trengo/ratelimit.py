@@ -0,0 +1,125 @@
+"""
+Client-side rate limiting.
+"""
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+
+__all__ = ["RateLimiter"]
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket that keeps a client under Trengo's rate limit.
+
+    Each request takes a token; tokens are refilled continuously at ``limit / period`` per second. The bucket is
+    adjusted on the fly from the ``X-RateLimit-Limit``, ``X-RateLimit-Remaining``, ``X-RateLimit-Reset`` and
+    ``Retry-After`` response headers, so the configured limit is only a starting point.
+
+    The same instance can be shared by several clients that use the same token, including across threads.
+    """
+
+    def __init__(self, limit: int = 120, period: float = 60):
+        """
+        :param limit: number of requests allowed per period. Trengo's documented default is 120 per minute.
+        :param period: period, in seconds.
+        """
+        self.limit = limit
+        self.period = period
+        self.tokens = float(limit)
+        self.blocked_until = 0.0
+        # Total time, in seconds, callers were asked to wait, and number of requests that had to wait
+        self.throttled_time = 0.0
+        self.throttled_requests = 0
+
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> float:
+        """Number of requests that can be made right now without waiting."""
+        with self._lock:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                return 0.0
+            self._refill(now)
+            return max(0.0, self.tokens)
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.tokens = min(float(self.limit), self.tokens + elapsed * self.limit / self.period)
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how long, in seconds, the caller must wait before sending its request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+
+            delay = max(0.0, -self.tokens * self.period / self.limit, self.blocked_until - now)
+            if delay > 0:
+                self.throttled_time += delay
+                self.throttled_requests += 1
+            return delay
+
+    def acquire(self):
+        """Block until a request can be sent."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, status_code: int, headers: Mapping[str, str]):
+        """
+        Adjust the bucket from the status code and the headers of a response.
+        """
+        limit = _parse_number(headers.get("X-RateLimit-Limit"))
+        remaining = _parse_number(headers.get("X-RateLimit-Remaining"))
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        reset = _parse_number(headers.get("X-RateLimit-Reset"))
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if limit is not None and limit > 0:
+                self.limit = int(limit)
+            if remaining is not None:
+                # The server knows better, but don't give back tokens already reserved by in-flight requests
+                self.tokens = min(self.tokens, remaining)
+
+            if retry_after is None and reset is not None and (status_code == 429 or remaining == 0):
+                # Either a UNIX timestamp or a number of seconds
+                retry_after = reset - time.time() if reset > 1_000_000_000 else reset
+            if retry_after is None and status_code == 429:
+                retry_after = self.period / self.limit
+
+            if retry_after is not None and retry_after > 0:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+def _parse_number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if value is None:
+        return None
+
+    seconds = _parse_number(value)
+    if seconds is not None:
+        return seconds
+
+    # HTTP-date
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
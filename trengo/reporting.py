@@ -0,0 +1,125 @@
+"""
+Reporting metrics over many time windows and segments.
+"""
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from trengo import Trengo
+
+__all__ = ["ReportingCache", "get_reporting_table", "split_windows"]
+
+
+def split_windows(start: datetime, end: datetime, window: timedelta) -> list[tuple[datetime, datetime]]:
+    """Split ``[start, end)`` in consecutive windows of size ``window``. The last one may be shorter."""
+    if window <= timedelta(0):
+        raise ValueError("The window must be positive")
+
+    windows = []
+    while start < end:
+        windows.append((start, min(start + window, end)))
+        start += window
+    return windows
+
+
+class ReportingCache:
+    """
+    On-disk cache of reporting metrics, with one JSON file per query.
+    """
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, query: dict[str, Any]) -> Path:
+        key = hashlib.sha256(json.dumps(query, sort_keys=True, default=str).encode()).hexdigest()
+        return self.directory / f"{key}.json"
+
+    def get(self, query: dict[str, Any]) -> dict[str, int | float] | None:
+        path = self._path(query)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def set(self, query: dict[str, Any], result: dict[str, int | float]):
+        path = self._path(query)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(result))
+        os.replace(tmp_path, path)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def get_reporting_table(client: Trengo, metrics: Iterable[str], *,
+                        start_date: datetime,
+                        end_date: datetime,
+                        window: timedelta | None = timedelta(days=1),
+                        split_by: dict[str, Iterable[int]] | None = None,
+                        max_workers=4,
+                        cache: ReportingCache | str | os.PathLike | None = None,
+                        now: datetime | None = None,
+                        **kwargs) -> list[dict[str, Any]]:
+    """
+    Get reporting metrics for each time window and each segment, concurrently.
+
+    For example, daily metrics for each of two teams over a year cost 730 requests, but the results for the windows that
+    are over are cached: the next call only re-queries today's windows.
+
+        rows = get_reporting_table(client, ["*"],
+                                   start_date=datetime(2024, 1, 1), end_date=datetime(2025, 1, 1),
+                                   split_by={"team_ids": [1, 2]},
+                                   cache="reporting-cache/")
+        pandas.DataFrame(rows)
+
+    :param client: Trengo client.
+    :param metrics: see `Trengo.get_reporting_metrics`.
+    :param start_date: start of the first window. Naive dates are assumed to be in UTC.
+    :param end_date: end of the last window.
+    :param window: size of the windows. Use ``None`` for a single window.
+    :param split_by: query each ID separately for each of these filters, e.g. ``{"team_ids": [1, 2, 3]}``. With
+      several filters, all the combinations are queried.
+    :param max_workers: maximum number of concurrent requests.
+    :param cache: optional `ReportingCache`, or directory for one, to store the results of the windows that are over.
+    :param now: current date, used to know which windows are over. Default to the current date.
+    :param kwargs: other filters passed to ``get_reporting_metrics``, e.g. ``channel_ids`` or ``direction``.
+    :return: a list of rows. Each row has the ``start_date`` and ``end_date`` of its window, a column for each
+      ``split_by`` filter (e.g. ``team_id`` for ``team_ids``), and one column per metric.
+    """
+    metrics = list(metrics)
+    start_date = _as_utc(start_date)
+    end_date = _as_utc(end_date)
+    now = _as_utc(now) if now is not None else datetime.now(timezone.utc)
+    if cache is not None and not isinstance(cache, ReportingCache):
+        cache = ReportingCache(cache)
+
+    windows = split_windows(start_date, end_date, window) if window else [(start_date, end_date)]
+    split_by = split_by or {}
+    split_names = list(split_by)
+    segments = list(itertools.product(*(list(ids) for ids in split_by.values())))
+
+    def get_row(window_: tuple[datetime, datetime], segment: tuple[int, ...]) -> dict[str, Any]:
+        window_start, window_end = window_
+        filters = {**kwargs, **{name: [id_] for name, id_ in zip(split_names, segment)}}
+        row: dict[str, Any] = {"start_date": window_start, "end_date": window_end}
+        row.update({name.removesuffix("s"): id_ for name, id_ in zip(split_names, segment)})
+
+        query = {"metrics": metrics, "start_date": window_start, "end_date": window_end, **filters}
+        is_over = window_end <= now
+        result = cache.get(query) if cache is not None and is_over else None
+        if result is None:
+            result = client.get_reporting_metrics(metrics, start_date=window_start, end_date=window_end, **filters)
+            if cache is not None and is_over:
+                cache.set(query, result)
+
+        row.update(result)
+        return row
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trengo-reporting") as executor:
+        return list(executor.map(lambda args: get_row(*args), itertools.product(windows, segments)))
@@ -0,0 +1,144 @@
+"""
+Incremental decoding of paginated responses.
+"""
+import codecs
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from api_session import JSONDict
+
+__all__ = ["PageStream"]
+
+_WHITESPACE = " \t\n\r"
+
+
+class PageStream:
+    """
+    Decode a paginated response body (``{"data": [...], "meta": {...}, ...}``) incrementally.
+
+    Iterating over it yields the records of the ``data`` array as soon as each one is decoded; the other top-level keys
+    are available as attributes once the iteration is over. At any time, only one record and the current chunk are
+    held in memory:
+
+        page = PageStream(response.iter_content(65536))
+        for record in page:
+            ...
+        last_page = page.meta["last_page"]
+    """
+
+    def __init__(self, chunks: Iterable[bytes], *, data_key="data", encoding="utf-8"):
+        """
+        :param chunks: chunks of the response body.
+        :param data_key: top-level key of the array of records.
+        :param encoding: encoding of the response body.
+        """
+        self.data_key = data_key
+        # Top-level keys other than the data one, e.g. "meta" and "links"
+        self.fields: JSONDict = {}
+        # Number of records decoded so far
+        self.count = 0
+
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    @property
+    def meta(self) -> JSONDict:
+        return self.fields["meta"]
+
+    def __iter__(self) -> Iterator[JSONDict]:
+        self._expect("{")
+        while True:
+            char = self._peek()
+            if char == "}":
+                self._position += 1
+                return
+            if char == ",":
+                self._position += 1
+                continue
+
+            key = self._decode_value()
+            self._expect(":")
+
+            if key == self.data_key and self._peek() == "[":
+                yield from self._iter_array()
+            else:
+                self.fields[key] = self._decode_value()
+
+    def _iter_array(self) -> Iterator[Any]:
+        self._expect("[")
+        while True:
+            char = self._peek()
+            if char == "]":
+                self._position += 1
+                return
+            if char == ",":
+                self._position += 1
+                continue
+
+            yield self._decode_value()
+            self.count += 1
+
+    def _read(self) -> bool:
+        """Read the next chunk into the buffer. Return False at the end of the stream."""
+        if self._eof:
+            return False
+
+        # Drop what we already consumed
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._decoder.decode(b"", final=True)
+            return False
+
+        self._buffer += self._decoder.decode(chunk)
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character, without consuming it."""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                raise json.JSONDecodeError("Unexpected end of data", self._buffer, self._position)
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self._buffer, self._position)
+        self._position += 1
+
+    def _decode_value(self) -> Any:
+        self._peek()
+        while True:
+            # Read at least twice as much data before each new attempt, so that a large value is decoded in a
+            # logarithmic number of attempts
+            target_size = 2 * (len(self._buffer) - self._position)
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._read_at_least(target_size):
+                    raise
+                continue
+
+            # A number at the end of the buffer may be truncated
+            if end == len(self._buffer) and self._read():
+                continue
+
+            self._position = end
+            return value
+
+    def _read_at_least(self, size: int) -> bool:
+        if not self._read():
+            return False
+        while len(self._buffer) - self._position < size and self._read():
+            pass
+        return True
@@ -0,0 +1,143 @@
+"""
+Incremental synchronization of tickets into a local SQLite database.
+"""
+import json
+import os
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing
+
+from api_session import JSONDict
+
+from trengo import Trengo
+
+__all__ = ["TicketSync"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_ticket_id ON messages (ticket_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class TicketSync:
+    """
+    Keep a local SQLite copy of the tickets and their messages.
+
+    Tickets are fetched most recently updated first, and each sync stops paginating as soon as it reaches a ticket that
+    was last updated before the previous sync. A sync thus costs as many requests as the number of tickets that
+    changed, not the whole history:
+
+        with TicketSync(Trengo(), "tickets.sqlite") as ticket_sync:
+            ticket_sync.sync()
+            for ticket in ticket_sync.get_tickets():
+                ...
+    """
+
+    def __init__(self, client: Trengo, path: str | os.PathLike, *,
+                 sort="-updated_at",
+                 updated_field="updated_at",
+                 sync_messages=True):
+        """
+        :param client: Trengo client.
+        :param path: path of the SQLite database. It's created if it doesn't exist.
+        :param sort: value of the ``sort`` parameter that orders the tickets by descending update date.
+        :param updated_field: ticket field that holds its update date.
+        :param sync_messages: if True (the default), also (re-)fetch the messages of each updated ticket.
+        """
+        self.client = client
+        self.sort = sort
+        self.updated_field = updated_field
+        self.sync_messages = sync_messages
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    @property
+    def high_water_mark(self) -> str | None:
+        """Most recent update date seen by the last complete sync, if any."""
+        row = self.connection.execute("SELECT value FROM sync_state WHERE key = 'high_water_mark'").fetchone()
+        return row[0] if row else None
+
+    def sync(self, **kwargs) -> int:
+        """
+        Fetch the tickets that changed since the last sync, as well as their messages, and store them.
+
+        :param kwargs: keyword arguments passed to ``get_tickets``, e.g. ``prefetch``.
+        :return: the number of tickets that were stored.
+        """
+        high_water_mark = self.high_water_mark
+        new_high_water_mark = high_water_mark
+        count = 0
+
+        # closing() cancels the prefetched pages, if any, when we stop early
+        with closing(self.client.get_tickets(sort=self.sort, **kwargs)) as tickets:
+            for ticket in tickets:
+                updated_at = ticket.get(self.updated_field)
+                # Tickets updated at the exact same time as the high-water mark are re-synced, in case some of them
+                # weren't there yet during the last sync
+                if high_water_mark is not None and updated_at is not None and updated_at < high_water_mark:
+                    break
+
+                self._store_ticket(ticket)
+                if updated_at is not None and (new_high_water_mark is None or updated_at > new_high_water_mark):
+                    new_high_water_mark = updated_at
+                count += 1
+
+        # Only move the high-water mark once all the changes were stored: since we go from the most recent tickets to
+        # the oldest ones, an interrupted sync must start over from the previous mark.
+        if new_high_water_mark is not None:
+            self.connection.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('high_water_mark', ?)",
+                                    (new_high_water_mark,))
+        self.connection.commit()
+        return count
+
+    def _store_ticket(self, ticket: JSONDict):
+        messages = list(self.client.get_messages(ticket["id"])) if self.sync_messages else None
+
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO tickets (id, updated_at, data) VALUES (?, ?, ?)",
+                                    (ticket["id"], ticket.get(self.updated_field), json.dumps(ticket)))
+            if messages is not None:
+                self.connection.execute("DELETE FROM messages WHERE ticket_id = ?", (ticket["id"],))
+                self.connection.executemany("INSERT OR REPLACE INTO messages (id, ticket_id, data) VALUES (?, ?, ?)",
+                                            [(message["id"], ticket["id"], json.dumps(message))
+                                             for message in messages])
+
+    def get_ticket(self, ticket_id: int) -> JSONDict | None:
+        """Get a ticket from the local database."""
+        row = self.connection.execute("SELECT data FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_tickets(self) -> Iterator[JSONDict]:
+        """Yield all the tickets of the local database, most recently updated first."""
+        for (data,) in self.connection.execute("SELECT data FROM tickets ORDER BY updated_at DESC, id DESC"):
+            yield json.loads(data)
+
+    def get_messages(self, ticket_id: int) -> Iterator[JSONDict]:
+        """Yield all the messages of a ticket from the local database."""
+        for (data,) in self.connection.execute("SELECT data FROM messages WHERE ticket_id = ? ORDER BY id",
+                                               (ticket_id,)):
+            yield json.loads(data)
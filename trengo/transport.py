@@ -0,0 +1,141 @@
+"""
+Transport options of `Trengo`: timeouts by endpoint, and an HTTP/2 transport adapter for ``requests`` built on
+``httpx``.
+"""
+from typing import Any, Mapping
+
+from requests import ConnectionError, ConnectTimeout, PreparedRequest, ReadTimeout, Response, Timeout
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from trengo.instrumentation import normalize_endpoint
+
+__all__ = ["HTTPXAdapter", "endpoint_timeout"]
+
+TimeoutValue = float | tuple[float, float] | None
+
+
+def _matches(prefix: str, path: str) -> bool:
+    prefix = prefix.rstrip("/")
+    return path == prefix or path.startswith(prefix + "/")
+
+
+def endpoint_timeout(timeouts: Mapping[str, TimeoutValue], path: str) -> Any:
+    """
+    Return the timeout of the longest prefix of ``path`` in ``timeouts``, or ``None`` if there's none.
+
+    Prefixes can be literal (``"/tickets"``) or use the ``{id}`` placeholder of `normalize_endpoint`
+    (``"/tickets/{id}/messages"``). A prefix matches whole path segments: ``"/ticket"`` doesn't match ``"/tickets"``.
+    """
+    normalized = normalize_endpoint(path)
+    for prefix in sorted(timeouts, key=len, reverse=True):
+        if _matches(prefix, path) or _matches(prefix, normalized):
+            return timeouts[prefix]
+    return None
+
+
+class _ResponseStream:
+    """File-like object over the decoded body of an ``httpx`` response, used as the ``raw`` of a ``requests``
+    response."""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = bytearray()
+
+    def read(self, amt: int | None = None) -> bytes:
+        import httpx
+
+        try:
+            while amt is None or len(self._buffer) < amt:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+        except httpx.TimeoutException as ex:
+            raise ReadTimeout(ex) from ex
+        except httpx.TransportError as ex:
+            raise ConnectionError(ex) from ex
+
+        if amt is None:
+            amt = len(self._buffer)
+        data = bytes(self._buffer[:amt])
+        del self._buffer[:amt]
+        return data
+
+    def close(self):
+        self._response.close()
+
+
+class HTTPXAdapter(BaseAdapter):
+    """
+    Transport adapter that sends the requests of a ``requests`` session with ``httpx``, which supports HTTP/2:
+
+        session.mount("https://", HTTPXAdapter(http2=True))
+
+    HTTP/2 multiplexes the requests over a single connection per host, which saves connection setups and compresses
+    the headers. It needs the ``h2`` package: ``pip install 'pytrengo[http2]'``.
+
+    The ``verify``, ``cert`` and ``proxies`` options of the session are not used; configure them on the ``httpx``
+    client instead. Response bodies are decoded by ``httpx``, so the ``Accept-Encoding`` header is the one of the
+    ``httpx`` client unless it's ``identity``.
+    """
+
+    def __init__(self, client=None, *, http2=True, pool_maxsize=10, keep_alive=True):
+        """
+        :param client: ``httpx.Client`` to use. If it's given, the other parameters are ignored.
+        :param http2: if True, use HTTP/2 when the server supports it.
+        :param pool_maxsize: maximum number of connections.
+        :param keep_alive: if False, don't reuse the connections.
+        """
+        super().__init__()
+        if client is None:
+            import httpx
+
+            client = httpx.Client(http2=http2, limits=httpx.Limits(
+                max_connections=pool_maxsize,
+                max_keepalive_connections=pool_maxsize if keep_alive else 0,
+            ))
+        self.client = client
+
+    def send(self, request: PreparedRequest, stream=False, timeout: Any = None, verify=True, cert=None,
+             proxies=None) -> Response:
+        import httpx
+
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            httpx_timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        else:
+            httpx_timeout = httpx.Timeout(timeout)
+
+        headers = dict(request.headers)
+        if headers.get("Accept-Encoding") != "identity":
+            # Let httpx advertise the encodings it can decode
+            headers.pop("Accept-Encoding", None)
+
+        assert request.method is not None and request.url is not None
+        httpx_request = self.client.build_request(request.method, request.url, headers=headers,
+                                                  content=request.body, timeout=httpx_timeout)
+        try:
+            r = self.client.send(httpx_request, stream=True)
+        except httpx.ConnectTimeout as ex:
+            raise ConnectTimeout(ex, request=request) from ex
+        except httpx.TimeoutException as ex:
+            raise Timeout(ex, request=request) from ex
+        except httpx.TransportError as ex:
+            raise ConnectionError(ex, request=request) from ex
+
+        response = Response()
+        response.status_code = r.status_code
+        response.headers = CaseInsensitiveDict(r.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = r.reason_phrase
+        response.url = str(r.url)
+        response.request = request
+        response.raw = _ResponseStream(r)
+        response.connection = self  # type: ignore[assignment]
+        return response
+
+    def close(self):
+        self.client.close()
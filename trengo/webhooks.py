@@ -0,0 +1,257 @@
+"""
+Webhook receiver: a WSGI application that verifies and parses Trengo webhooks, and dispatches them to handlers running
+in a pool of worker threads.
+
+    def handle(event: WebhookEvent):
+        print(event.type, event.ticket_id)
+
+    dispatcher = WebhookDispatcher(handle, workers=4)
+    app = WebhookApp(dispatcher, secret="...")
+    with dispatcher:
+        make_server("", 8000, app).serve_forever()
+
+Register the webhooks with a URL that ends with the event type (e.g. ``https://example.com/trengo/INBOUND``, see
+`Trengo.create_webhook`) so that `WebhookEvent.type` is set.
+
+When the queue is full, the application answers with a ``503`` so that Trengo retries the delivery later.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from socketserver import ThreadingMixIn
+from typing import Any, Callable, Iterable
+from urllib.parse import parse_qsl
+from wsgiref.simple_server import WSGIServer, make_server as _make_server
+
+from api_session import JSONDict
+
+__all__ = ["WebhookEvent", "WebhookDispatcher", "WebhookApp", "verify_signature", "parse_event", "make_server"]
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "Trengo-Signature"
+
+
+def verify_signature(body: bytes, signature_header: str, secret: str, *, tolerance: float | None = 300) -> bool:
+    """
+    Verify the signature of a webhook.
+
+    :param body: raw request body.
+    :param signature_header: value of the ``Trengo-Signature`` header, i.e. ``<timestamp>;<signature>``.
+    :param secret: signing secret of the webhook.
+    :param tolerance: maximum age of the webhook, in seconds, to prevent replay attacks. Use ``None`` to disable.
+    :return: True if the signature is valid.
+    """
+    timestamp, _, signature = signature_header.partition(";")
+    if not timestamp or not signature:
+        return False
+
+    if tolerance is not None:
+        try:
+            if abs(time.time() - float(timestamp)) > tolerance:
+                return False
+        except ValueError:
+            return False
+
+    expected = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _parse_int(value: Any) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True)
+class WebhookEvent:
+    type: str | None
+    ticket_id: int | None = None
+    message_id: int | None = None
+    contact_id: int | None = None
+    channel_id: int | None = None
+    user_id: int | None = None
+    # All the fields sent by Trengo
+    payload: JSONDict = field(default_factory=dict, repr=False)
+    received_at: float = field(default_factory=time.time)
+
+
+def parse_event(body: bytes, content_type: str = "application/x-www-form-urlencoded",
+                type_: str | None = None) -> WebhookEvent:
+    """
+    Parse the body of a webhook. Trengo sends form-encoded payloads, but JSON payloads are supported too.
+
+    :param body: raw request body.
+    :param content_type: value of the ``Content-Type`` header.
+    :param type_: type of the event. If it's not given, it's read from the ``type`` or ``event`` field, if any.
+    :raise ValueError: if the body is not valid JSON or a JSON object.
+    """
+    payload: JSONDict
+    if content_type.startswith("application/json"):
+        payload = json.loads(body) if body else {}
+        if not isinstance(payload, dict):
+            raise ValueError(f"Expected a JSON object, got {type(payload).__name__}")
+    else:
+        payload = dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+
+    return WebhookEvent(
+        type=type_ or payload.get("type") or payload.get("event"),
+        ticket_id=_parse_int(payload.get("ticket_id")),
+        message_id=_parse_int(payload.get("message_id")),
+        contact_id=_parse_int(payload.get("contact_id")),
+        channel_id=_parse_int(payload.get("channel_id")),
+        user_id=_parse_int(payload.get("user_id")),
+        payload=payload,
+    )
+
+
+class WebhookDispatcher:
+    """
+    Bounded queue of events consumed by a pool of worker threads.
+
+    Exceptions raised by the handler are logged and don't stop the workers.
+    """
+
+    def __init__(self, handler: Callable[[WebhookEvent], Any], *,
+                 workers=4,
+                 queue_size=10_000,
+                 put_timeout: float = 0.5):
+        """
+        :param handler: function called with each event.
+        :param workers: number of worker threads.
+        :param queue_size: maximum number of events waiting for a worker.
+        :param put_timeout: how long to wait for room in the queue before rejecting an event.
+        """
+        self.handler = handler
+        self.workers = workers
+        self.put_timeout = put_timeout
+        self.queue: queue.Queue[WebhookEvent | None] = queue.Queue(maxsize=queue_size)
+        # Counters: processed events, events whose handler raised, and events rejected because the queue was full
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Start the worker threads."""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"trengo-webhooks-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Process the events left in the queue, then stop the worker threads."""
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def submit(self, event: WebhookEvent) -> bool:
+        """
+        Add an event to the queue. Return False if it's still full after ``put_timeout`` seconds.
+        """
+        try:
+            self.queue.put(event, timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        return True
+
+    def _work(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+
+            try:
+                self.handler(event)
+            except Exception:
+                logger.exception("Error while handling webhook event %r", event)
+                with self._lock:
+                    self.failed += 1
+            else:
+                with self._lock:
+                    self.processed += 1
+
+
+class WebhookApp:
+    """
+    WSGI application that receives the webhooks and submits them to a `WebhookDispatcher`.
+    """
+
+    def __init__(self, dispatcher: WebhookDispatcher, *, secret: str | None = None,
+                 signature_tolerance: float | None = 300,
+                 type_from_path=True):
+        """
+        :param dispatcher: dispatcher to submit the events to. It must be started separately.
+        :param secret: signing secret of the webhooks. If it's not given, signatures are not verified.
+        :param signature_tolerance: see `verify_signature`.
+        :param type_from_path: if True (the default), use the last segment of the URL path as the event type.
+        """
+        self.dispatcher = dispatcher
+        self.secret = secret
+        self.signature_tolerance = signature_tolerance
+        self.type_from_path = type_from_path
+
+    def __call__(self, environ: dict[str, Any], start_response) -> Iterable[bytes]:
+        if environ["REQUEST_METHOD"] != "POST":
+            return self._respond(start_response, "405 Method Not Allowed")
+
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return self._respond(start_response, "400 Bad Request")
+        body = environ["wsgi.input"].read(length) if length else b""
+
+        if self.secret is not None:
+            signature = environ.get("HTTP_" + SIGNATURE_HEADER.upper().replace("-", "_"), "")
+            if not verify_signature(body, signature, self.secret, tolerance=self.signature_tolerance):
+                return self._respond(start_response, "401 Unauthorized")
+
+        type_ = None
+        if self.type_from_path:
+            type_ = environ.get("PATH_INFO", "").rstrip("/").rpartition("/")[2] or None
+
+        try:
+            event = parse_event(body, environ.get("CONTENT_TYPE") or "", type_)
+        except ValueError:
+            return self._respond(start_response, "400 Bad Request")
+
+        if not self.dispatcher.submit(event):
+            return self._respond(start_response, "503 Service Unavailable")
+
+        return self._respond(start_response, "200 OK")
+
+    @staticmethod
+    def _respond(start_response, status: str) -> list[bytes]:
+        start_response(status, [("Content-Type", "text/plain"), ("Content-Length", "0")])
+        return []
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def make_server(host: str, port: int, app: WebhookApp) -> WSGIServer:
+    """
+    Create a small multi-threaded HTTP server for the application, using ``wsgiref``. For production, you may prefer to
+    run `WebhookApp` with a WSGI server such as gunicorn.
+    """
+    return _make_server(host, port, app, server_class=_ThreadingWSGIServer)